@@ -0,0 +1,300 @@
+import os
+import bz2
+import time
+import zlib
+import shutil
+import zipfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+METHODS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+# Members larger than this are not compressed whole in a worker process, to
+# keep memory bounded: deflate members are compressed in LARGE_CHUNK pieces on
+# the pool, bzip2/lzma members (zipfile reads only one stream of those per
+# member) are streamed by zipfile on the writer thread
+LARGE_MEMBER = 64 * 1024 * 1024
+
+# Piece of a large deflate member compressed by one worker
+LARGE_CHUNK = 16 * 1024 * 1024
+
+# Buffer used when streaming member data in and out of archives
+COPY_BUFFER = 1024 * 1024
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+# In-flight marker of a large deflate member, compressed in pieces when it is written
+LARGE = object()
+
+
+def _compressor(method, level):
+    """Compressor producing exactly the member data zipfile itself would write"""
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(level if level is not None else zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    if method == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Compressor(level or 9)
+    if method == zipfile.ZIP_LZMA:
+        return zipfile.LZMACompressor()
+    return None
+
+
+def _compress_member(path, method, level):
+    """Worker process: read and compress one file; returns (data, crc, size)"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    compressor = _compressor(method, level)
+    data = compressor.compress(raw) + compressor.flush() if compressor else raw
+    return data, zlib.crc32(raw), len(raw)
+
+
+def _deflate_chunk(path, offset, length, level, last):
+    """
+    Worker process: deflate `length` bytes of a file from offset;
+    returns (data, crc, size). Each piece is its own stream ending on a
+    byte boundary (a sync flush), so the pieces concatenate into one
+    valid deflate stream, as pigz does; only the last one is final.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        raw = f.read(length)
+    compressor = _compressor(zipfile.ZIP_DEFLATED, level)
+    data = compressor.compress(raw) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, zlib.crc32(raw), len(raw)
+
+
+def _gf2_times(matrix, vector):
+    total = 0
+    for row in matrix:
+        if not vector:
+            break
+        if vector & 1:
+            total ^= row
+        vector >>= 1
+    return total
+
+
+def _gf2_square(matrix):
+    return [_gf2_times(matrix, row) for row in matrix]
+
+
+def crc32_combine(crc1, crc2, len2):
+    """CRC-32 of A + B from crc32(A), crc32(B) and len(B) (zlib's crc32_combine)"""
+    if len2 <= 0:
+        return crc1
+    odd = [0xEDB88320] + [1 << i for i in range(31)]  # one zero bit appended
+    even = _gf2_square(odd)  # two zero bits
+    odd = _gf2_square(even)  # four zero bits
+    # Append len2 zero bytes to crc1, squaring the operator once per bit of len2
+    while len2:
+        even = _gf2_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_square(even)
+        if len2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        len2 >>= 1
+    return crc1 ^ crc2
+
+
+def _mb(n):
+    return n / (1024 ** 2)
+
+
+class ZipArchiver:
+    """
+    Parallel zip/unzip. Files are compressed concurrently on a process pool
+    and appended to the archive in order as they finish; extraction runs
+    members on a thread pool (zlib, bz2 and lzma release the GIL), each
+    streaming through a bounded buffer.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+
+    # -------- Creating --------
+    @staticmethod
+    def collect(paths, recursive, base=None):
+        """
+        Expand arguments to member paths, relative to base (a session's
+        cwd) like the arguments themselves; directories need recursive=True
+        """
+        members = []
+        skipped = []
+        for path in paths:
+            full = os.path.join(base, path) if base else path
+            if not os.path.isdir(full):
+                members.append(path)
+                continue
+            if not recursive:
+                skipped.append(path)
+                continue
+            for root, dirs, files in os.walk(full):
+                dirs.sort()
+                root = path + root[len(full):]
+                members.append(root)  # keeps empty directories
+                members.extend(os.path.join(root, name) for name in sorted(files))
+        return members, skipped
+
+    def create(self, archive, members, method=zipfile.ZIP_DEFLATED, level=None, base=None):
+        """Write members into archive (both relative to base), yielding progress lines as it goes"""
+        started = time.monotonic()
+        last_report = started
+        total_in = total_out = 0
+        done = 0
+
+        if method == zipfile.ZIP_BZIP2 and level is not None:
+            level = max(level, 1)  # bzip2 has no level 0; one value for the pool and for zipfile
+        path = os.path.join(base, archive) if base else archive
+        with zipfile.ZipFile(path, "w", method, compresslevel=level) as zf, \
+                ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # In-flight compressions, written in submission order; bounded so
+            # finished-but-unwritten members cannot pile up in memory
+            inflight = deque()
+            limit = self.workers * 2
+
+            def deflate_pieces(source):
+                """A large member's pieces, compressed on the pool at most `limit` at a time, in order"""
+                size = os.path.getsize(source)
+                pending = deque()
+                for offset in range(0, size, LARGE_CHUNK):
+                    last = offset + LARGE_CHUNK >= size
+                    pending.append(pool.submit(_deflate_chunk, source, offset, LARGE_CHUNK, level, last))
+                    if len(pending) >= limit:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+
+            def write_head():
+                nonlocal total_in, total_out, done
+                path, future = inflight.popleft()
+                source = os.path.join(base, path) if base else path
+                if future is LARGE:
+                    info = self.write_compressed(zf, source, method, deflate_pieces(source), arcname=path)
+                elif future is None:
+                    zf.write(source, path)  # directory, stored or large bzip2/lzma file: zipfile streams it
+                    info = zf.filelist[-1]
+                else:
+                    info = self.write_compressed(zf, source, method, [future.result()], arcname=path)
+                total_in += info.file_size
+                total_out += info.compress_size
+                done += 1
+
+            for path in members:
+                source = os.path.join(base, path) if base else path
+                if os.path.isdir(source) or method == zipfile.ZIP_STORED:
+                    inflight.append((path, None))
+                elif os.path.getsize(source) > LARGE_MEMBER:
+                    inflight.append((path, LARGE if method == zipfile.ZIP_DEFLATED else None))
+                else:
+                    inflight.append((path, pool.submit(_compress_member, source, method, level)))
+                # Block only when the window is full; otherwise write whatever is ready
+                while inflight and (len(inflight) >= limit or inflight[0][1] in (None, LARGE) or inflight[0][1].done()):
+                    write_head()
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    yield self.progress("zip", done, len(members), total_in, now - started)
+            while inflight:
+                write_head()
+
+        elapsed = time.monotonic() - started
+        ratio = total_out / total_in * 100 if total_in else 100.0
+        yield (f"Created archive: {archive} ({done} entries, {_mb(total_in):.1f} MB → "
+               f"{_mb(total_out):.1f} MB, {ratio:.0f}%, {_mb(total_in) / elapsed if elapsed else 0:.1f} MB/s)")
+
+    @staticmethod
+    def write_compressed(zf, path, method, pieces, arcname=None):
+        """
+        Append a member compressed elsewhere: `pieces` are (data, crc, raw
+        size) in order. ZipFile.open(zinfo, "w") does the bookkeeping,
+        writing the data as a stored member; the entry is then relabelled
+        with the real method, CRC and size, in the central directory (the
+        ZipInfo) and in the local header, which keeps its length.
+        """
+        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        zinfo.compress_type = zipfile.ZIP_STORED  # zipfile writes the bytes as they are
+        zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT  # zipfile's own rule
+        crc = size = 0
+        with zf.open(zinfo, "w", force_zip64=zip64) as member:
+            for data, piece_crc, piece_size in pieces:
+                member.write(data)
+                crc = crc32_combine(crc, piece_crc, piece_size)
+                size += piece_size
+        zinfo.compress_type, zinfo.CRC, zinfo.file_size = method, crc, size
+        if method == zipfile.ZIP_LZMA:
+            zinfo.flag_bits |= 0x02  # LZMA stream carries an end-of-stream marker
+
+        end = zf.fp.tell()
+        zf.fp.seek(zinfo.header_offset)
+        zf.fp.write(zinfo.FileHeader(zip64))
+        zf.fp.seek(end)
+        return zinfo
+
+    # -------- Extracting --------
+    def extract(self, archive, dest=".", base=None):
+        """Extract all members concurrently (paths relative to base), yielding progress lines"""
+        started = time.monotonic()
+        name, archive = archive, os.path.join(base, archive) if base else archive
+        dest_root = os.path.realpath(os.path.join(base, dest) if base else dest)
+        local = threading.local()
+        handles = []
+        handles_lock = threading.Lock()
+
+        def target_path(name):
+            target = os.path.realpath(os.path.join(dest_root, name))
+            if target != dest_root and not target.startswith(dest_root + os.sep):
+                raise ValueError(f"refusing to extract outside destination: {name}")
+            return target
+
+        def extract_member(info):
+            # ZipFile handles share one file position, so each thread opens its own
+            if not hasattr(local, "zf"):
+                local.zf = zipfile.ZipFile(archive)
+                with handles_lock:
+                    handles.append(local.zf)
+            target = target_path(info.filename)
+            with local.zf.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER)
+            return info.file_size
+
+        with zipfile.ZipFile(archive) as zf:
+            infos = zf.infolist()
+        files = [i for i in infos if not i.is_dir()]
+        for info in infos:
+            directory = target_path(info.filename) if info.is_dir() else os.path.dirname(target_path(info.filename))
+            os.makedirs(directory, exist_ok=True)
+
+        total = 0
+        done = 0
+        last_report = started
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for future in as_completed([pool.submit(extract_member, info) for info in files]):
+                    total += future.result()
+                    done += 1
+                    now = time.monotonic()
+                    if now - last_report >= PROGRESS_INTERVAL:
+                        last_report = now
+                        yield self.progress("unzip", done, len(files), total, now - started)
+        finally:
+            for handle in handles:
+                handle.close()
+
+        elapsed = time.monotonic() - started
+        yield (f"Extracted: {name} ({done} files, {_mb(total):.1f} MB, "
+               f"{_mb(total) / elapsed if elapsed else 0:.1f} MB/s)")
+
+    @staticmethod
+    def progress(name, done, count, nbytes, elapsed):
+        return f"{name}: {done}/{count} entries, {_mb(nbytes):.1f} MB, {_mb(nbytes) / elapsed if elapsed else 0:.1f} MB/s"
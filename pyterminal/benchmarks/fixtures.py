@@ -0,0 +1,102 @@
+"""
+Synthetic inputs for the benchmarks, generated deterministically so two
+runs (and a run and its baseline) see identical data.
+"""
+import os
+import random
+
+SEED = 2025
+
+EXTENSIONS = (".py", ".txt", ".log", ".json", ".md", ".c", ".h", "")
+
+# ANSI colours the way `ls` and the shell's own builtins emit them
+COLORS = ("\x1b[34m", "\x1b[32m", "\x1b[36m", "\x1b[31m", "\x1b[33m")
+RESET = "\x1b[0m"
+
+
+def make_tree(root, dirs=200, files_per_dir=50, depth=3):
+    """
+    Create `dirs` directories nested up to `depth` levels under root, each
+    holding `files_per_dir` empty files; returns the number of entries made.
+    """
+    rng = random.Random(SEED)
+    made = [root]
+    created = 0
+    for d in range(dirs):
+        parents = [p for p in made if p.count(os.sep) - root.count(os.sep) < depth]
+        directory = os.path.join(rng.choice(parents), f"dir_{d:04d}")
+        os.makedirs(directory)
+        made.append(directory)
+        created += 1
+        for f in range(files_per_dir):
+            name = f"file_{f:04d}_{rng.randrange(10 ** 6):06d}{rng.choice(EXTENSIONS)}"
+            open(os.path.join(directory, name), "w").close()
+            created += 1
+    return created
+
+
+def make_flat_dir(path, entries=5000):
+    """One directory with many entries (a node_modules or build output stand-in)"""
+    os.makedirs(path)
+    rng = random.Random(SEED)
+    for i in range(entries):
+        name = f"{rng.choice('abcdefghij')}{i:05d}{rng.choice(EXTENSIONS)}"
+        if i % 10 == 0:
+            os.mkdir(os.path.join(path, name))
+        else:
+            open(os.path.join(path, name), "w").close()
+
+
+def make_text_file(path, size):
+    """A log-like text file of about `size` bytes"""
+    rng = random.Random(SEED)
+    words = ["error", "warning", "info", "request", "user", "GET", "POST", "timeout", "ok", "/api/v1/items"]
+    line_count = 0
+    written = 0
+    with open(path, "w") as f:
+        while written < size:
+            line = f"{line_count:08d} " + " ".join(rng.choice(words) for _ in range(12)) + "\n"
+            f.write(line)
+            written += len(line)
+            line_count += 1
+    return written
+
+
+def ansi_output(size):
+    """About `size` bytes of coloured listing output, as a command would write it"""
+    rng = random.Random(SEED)
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f"{rng.choice(COLORS)}entry_{i:07d}{RESET}  {rng.randrange(10 ** 9):>10}  plain text tail\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines).encode()
+
+
+# Everyday command lines: quoting, chaining, redirections, background jobs
+COMMAND_SAMPLES = (
+    "ls -la",
+    "cd ..",
+    "echo \"a|b\" 'c && d'",
+    "ps | grep python | wc -l",
+    "make build && make test || echo failed; echo done",
+    "find . -name '*.py' -type f | sort > files.txt 2>&1",
+    "tail -n 100 app.log | grep -i error >> errors.txt &",
+    "cat a\\ b.txt < input.txt | tr a-z A-Z",
+)
+
+
+def long_pipeline(stages):
+    """`stages` piped commands with quoting and redirections sprinkled in"""
+    parts = ["cat 'input file.txt'"]
+    for i in range(1, stages):
+        if i % 5 == 0:
+            parts.append(f"grep -v \"pattern {i}\"")
+        elif i % 3 == 0:
+            parts.append(f"sed 's/a{i}/b/g'")
+        else:
+            parts.append("tr a-z A-Z")
+    return " | ".join(parts) + " > out.txt 2>&1"
@@ -0,0 +1,142 @@
+"""
+Measurement and baseline helpers shared by the benchmark scripts.
+
+A benchmark is an `op(i)` callable timed once per sample. Each result
+holds latency percentiles, throughput in the benchmark's own unit
+(lines, bytes, files, ...) and the peak Python heap of one extra traced
+run, so timings never pay for tracemalloc.
+"""
+import gc
+import json
+import time
+import platform
+import tracemalloc
+
+from profiler import percentile  # the same nearest-rank percentile `stats` reports
+
+# Fractional slowdown (of p50 latency) or heap growth tolerated before a result counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Heap growth below this many bytes is noise, whatever the percentage
+MEMORY_SLACK = 64 * 1024
+
+
+def measure(op, repeat, warmup=1, units=1, unit="op"):
+    """Time `repeat` calls of op(i) after `warmup` untimed ones; returns a result dict"""
+    for i in range(warmup):
+        op(i)
+
+    samples = []
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()  # collections land on random samples otherwise
+    try:
+        for i in range(repeat):
+            started = time.perf_counter()
+            op(i)
+            samples.append(time.perf_counter() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        op(repeat)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(samples)
+    samples.sort()
+    return {
+        "runs": repeat,
+        "unit": unit,
+        "throughput": units * repeat / total if total else float("inf"),
+        "p50": percentile(samples, 0.5),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+        "max": samples[-1],
+        "peak_bytes": peak,
+    }
+
+
+def format_duration(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
+
+
+def format_rate(value, unit):
+    if unit == "byte":
+        return f"{value / (1024 ** 2):,.1f} MiB/s"
+    return f"{value:,.0f} {unit}s/s"
+
+
+def format_result(name, result):
+    return (
+        f"{name:<30} {format_rate(result['throughput'], result['unit']):>18} "
+        f"{format_duration(result['p50']):>10} {format_duration(result['p95']):>10} "
+        f"{format_duration(result['p99']):>10} {result['peak_bytes'] / 1024:>10,.0f}"
+    )
+
+
+HEADER = f"{'BENCHMARK':<30} {'THROUGHPUT':>18} {'P50':>10} {'P95':>10} {'P99':>10} {'PEAK KiB':>10}"
+
+
+# -------- Baselines --------
+def environment():
+    """Where the numbers came from; a baseline only means something on the same setup"""
+    return {"python": platform.python_version(), "machine": platform.machine(), "host": platform.node()}
+
+
+def save_baseline(path, results, quick=False):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "quick": quick, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def size_mismatch(baseline, quick):
+    """
+    Why results of a --quick (or full) run can't be held against this
+    baseline, or None: fixture sizes and run counts differ between the two
+    """
+    stored = baseline.get("quick")
+    if stored == quick:
+        return None
+    recorded = "an unrecorded size" if stored is None else "--quick" if stored else "a full run"
+    return f"baseline is from {recorded}, this was {'--quick' if quick else 'a full run'}"
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Lines describing each benchmark against the baseline, and the names
+    that regressed: p50 latency or peak heap more than `tolerance` above
+    the stored value. Benchmarks missing on either side, or run in a
+    different mode (e.g. GUI with and without a display), are skipped.
+    """
+    lines = []
+    regressed = []
+    stored = baseline.get("results", {})
+    for name, result in results.items():
+        old = stored.get(name)
+        if old is None or old.get("mode") != result.get("mode"):
+            lines.append(f"{name:<30} (no comparable baseline)")
+            continue
+        speed = result["p50"] / old["p50"] - 1 if old["p50"] else 0.0
+        growth = result["peak_bytes"] - old["peak_bytes"]
+        slower = speed > tolerance
+        heavier = growth > MEMORY_SLACK and growth > old["peak_bytes"] * tolerance
+        verdict = "REGRESSION" if slower or heavier else "ok"
+        lines.append(
+            f"{name:<30} p50 {speed:+7.1%}  peak {growth / 1024:+9,.0f} KiB  {verdict}"
+        )
+        if slower or heavier:
+            regressed.append(name)
+    return lines, regressed
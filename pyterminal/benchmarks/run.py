@@ -0,0 +1,328 @@
+"""
+Benchmark suite for the shell's hot paths: parsing, pipeline execution,
+tab completion, `find`, the text builtins, record pipelines, and GUI
+output rendering.
+
+    python benchmarks/run.py                  run everything, compare with baseline.json if present
+    python benchmarks/run.py --save           run and store the results as the new baseline
+    python benchmarks/run.py -k parser,gui    only benchmarks whose name starts with one of these
+    python benchmarks/run.py --quick          smaller inputs and fewer runs (smoke test)
+
+Inputs (directory trees, large outputs, long pipelines) are generated in
+a temporary directory. Pipelines use coreutils (`tr`), so it runs
+on Linux and macOS without network access. Exits 1 when any benchmark is
+more than --tolerance slower (p50) or heavier (peak heap) than the baseline,
+and 2 without comparing when the baseline was saved with(out) --quick and
+this run wasn't.
+"""
+import os
+import sys
+import queue
+import codecs
+import tempfile
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import harness  # noqa: E402
+import fixtures  # noqa: E402
+import parser as command_parser  # noqa: E402  (pyterminal/parser.py, not the stdlib module)
+from executor import CommandExecutor  # noqa: E402
+from completer import AutoCompleter  # noqa: E402
+from jobs import JobTable  # noqa: E402
+import finder  # noqa: E402
+
+BASELINE = os.path.join(HERE, "baseline.json")
+
+
+class CountingSink:
+    """Executor output target that only counts bytes, so the terminal isn't what gets measured"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def __call__(self, chunk):
+        self.bytes += len(chunk)
+
+
+# -------- Parser --------
+def bench_parser(ctx):
+    lines = [f"{fixtures.long_pipeline(4)} ; echo {i}" for i in range(ctx.scale(2000))]
+    lines += [f"make build && make test || echo 'failed {i}'; ls -la > out_{i}.txt 2>&1 &" for i in range(len(lines))]
+    parse = command_parser._parse.__wrapped__  # bypass the LRU cache
+    yield "parser.mixed", lambda i: parse(lines[i % len(lines)]), len(lines), 1, "line"
+
+    # Unique suffixes keep every line a cache miss in real use too
+    samples = fixtures.COMMAND_SAMPLES
+    typed = [f"{samples[i % len(samples)]} ; echo {i}" for i in range(ctx.scale(20000))]
+    yield "parser.samples", lambda i: parse(typed[i % len(typed)]), len(typed), 1, "line"
+
+    long_lines = [fixtures.long_pipeline(64) + f" ; echo {i}" for i in range(ctx.scale(200))]
+    yield "parser.long_pipeline", lambda i: parse(long_lines[i % len(long_lines)]), len(long_lines), 64, "stage"
+
+    warm = lines[:50]
+    for line in warm:
+        command_parser.CommandParser.parse(line)
+    yield "parser.cached", lambda i: command_parser.CommandParser.parse(warm[i % 50]), len(lines), 1, "line"
+
+
+# -------- Executor --------
+def bench_executor(ctx):
+    sink = CountingSink()
+    executor = CommandExecutor(output=sink)
+    run = executor._execute_pipe_chain
+
+    if ctx.wanted("executor.large_output"):
+        big = ctx.path("big.log")
+        size = fixtures.make_text_file(big, ctx.scale(32 * 1024 * 1024))
+        yield "executor.large_output", lambda i: run([["cat", big]]), ctx.runs(10), size, "byte"
+
+    if ctx.wanted("executor.long_pipeline"):
+        medium = ctx.path("medium.log")
+        size = fixtures.make_text_file(medium, ctx.scale(4 * 1024 * 1024))
+        chain = [["cat", medium]] + [["tr", "a", "a"]] * 15
+        yield "executor.long_pipeline", lambda i: run(chain), ctx.runs(10), size, "byte"
+
+    # Builtin feeding an external command: output crosses the pump thread and a pipe
+    if ctx.wanted("executor.builtin_to_external"):
+        listing = ctx.flat_dir()
+        yield ("executor.builtin_to_external", lambda i: run([["ls", "-1", listing], ["tr", "a", "a"]]),
+               ctx.runs(20), 1, "run")
+
+    yield "executor.spawn", lambda i: run([["true"]]), ctx.runs(100), 1, "run"
+
+
+# -------- Text builtins --------
+def bench_text(ctx):
+    if not ctx.wanted("text."):
+        return
+    sink = CountingSink()
+    run = CommandExecutor(output=sink)._execute_pipe_chain
+    log = ctx.path("text.log")
+    size = fixtures.make_text_file(log, ctx.scale(64 * 1024 * 1024))
+    yield "text.grep", lambda i: run([["grep", "-c", "timeout ok POST", log]]), ctx.runs(10), size, "byte"
+    yield "text.grep_stdin", lambda i: run([["cat", log], ["grep", "-c", "timeout ok POST"]]), ctx.runs(10), size, "byte"
+    yield "text.wc", lambda i: run([["wc", log]]), ctx.runs(10), size, "byte"
+    yield "text.tail", lambda i: run([["tail", "-n", "1000", log]]), ctx.runs(100), 1, "run"
+
+
+# -------- Completer --------
+def bench_completer(ctx):
+    if not ctx.wanted("completer."):
+        return
+    executor = CommandExecutor(output=CountingSink())
+    completer = AutoCompleter(list(executor.builtins), lister=executor.lister)
+    listing = ctx.flat_dir()
+    prefixes = [os.path.join(listing, p) for p in ("a", "b0", "c001", "j", "d0", "x", "e00")]
+    yield ("completer.path", lambda i: completer.candidates(prefixes[i % len(prefixes)]),
+           ctx.runs(2000), 1, "completion")
+
+    words = ["g", "py", "l", "mk", "z", "un", "c"]
+    yield ("completer.command", lambda i: completer.candidates(words[i % len(words)], command_position=True),
+           ctx.runs(2000), 1, "completion")
+
+
+# -------- Find --------
+def bench_find(ctx):
+    if not ctx.wanted("find."):
+        return
+    root, entries = ctx.tree()
+    executor = CommandExecutor(output=CountingSink())
+    executor._finder = finder.FileFinder(index_path=ctx.path("find.index"))
+    run = executor._execute_pipe_chain
+    yield "find.scan", lambda i: run([["find", root, "-name", "*.py"]]), ctx.runs(10), entries, "path"
+    yield "find.index", lambda i: run([["find", root, "-name", "*.py", "-I"]]), ctx.runs(10), entries, "path"
+
+
+# -------- Record pipelines --------
+def bench_records(ctx):
+    if not ctx.wanted("records."):
+        return
+    root, entries = ctx.tree()
+    run = CommandExecutor(output=CountingSink())._execute_pipe_chain
+    yield ("records.find_where", lambda i: run([["find", root, "-name", "*"], ["where", "size", "gt", "1K"], ["count"]]),
+           ctx.runs(10), entries, "path")
+    listing = ctx.flat_dir()
+    yield ("records.ls_sort", lambda i: run([["ls", listing], ["sort", "size", "-r"], ["head", "10"]]),
+           ctx.runs(10), 1, "run")
+
+
+# -------- GUI --------
+class HeadlessText:
+    """
+    The parts of a Tk Text widget that flush_pending uses, keeping only a
+    line count; with no display this still measures the Python side of
+    rendering (decoding, ANSI parsing, coalescing, scrollback trimming).
+    """
+
+    def __init__(self):
+        self.lines = 0
+
+    def config(self, **_):
+        pass
+
+    def insert(self, index, *args):
+        self.lines += sum(text.count("\n") for text in args[::2])
+
+    def index(self, index):
+        return f"{self.lines + 1}.0"
+
+    def delete(self, start, end=None):
+        if end is None:
+            self.lines = 0
+        else:
+            self.lines -= int(end.split(".")[0]) - 1
+
+    def see(self, index):
+        pass
+
+
+def make_gui(gui_module):
+    """A TerminalSession (one GUI tab) with its rendering state only; (session, mode)"""
+    session = gui_module.TerminalSession.__new__(gui_module.TerminalSession)
+    try:
+        root = gui_module.tk.Tk()
+        root.withdraw()
+        session.output_area = gui_module.tk.Text(root)
+        mode = "tk"
+    except gui_module.tk.TclError:
+        session.output_area = HeadlessText()
+        mode = "headless"
+    session.scrollback = 10000
+    session.ansi = gui_module.AnsiParser()
+    session.pending = []
+    session.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    session.output_queue = queue.Queue()
+    session.executor = type("Executor", (), {"jobs": JobTable()})()
+    return session, mode
+
+
+def bench_gui(ctx):
+    if not ctx.wanted("gui."):
+        return
+    try:
+        import gui as gui_module
+    except ImportError as e:  # tkinter not built into this Python
+        print(f"skipping gui benchmarks: {e}", file=sys.stderr)
+        return
+    session, mode = make_gui(gui_module)
+    ctx.modes["gui"] = mode
+
+    output = fixtures.ansi_output(ctx.scale(4 * 1024 * 1024))
+    chunks = [output[i:i + 64 * 1024] for i in range(0, len(output), 64 * 1024)]
+
+    def render(i):
+        for chunk in chunks:
+            session.output_queue.put(chunk)
+        while not session.output_queue.empty():
+            session.render()
+
+    yield "gui.render", render, ctx.runs(10), len(output), "byte"
+
+    def write_lines(i):
+        for n in range(200):
+            session.write_output(f"$ command number {n} \x1b[32mok\x1b[0m", "prompt")
+        session.flush_pending()
+
+    yield "gui.write_output", write_lines, ctx.runs(200), 200, "line"
+
+
+SUITES = (bench_parser, bench_executor, bench_text, bench_completer, bench_find, bench_records, bench_gui)
+
+
+class Context:
+    """Fixture directory and sizing shared by the suites; fixtures are built on first use"""
+
+    def __init__(self, directory, quick, selected=()):
+        self.directory = directory
+        self.quick = quick
+        self.selected = selected
+        self.modes = {}
+        self._tree = None
+        self._flat = None
+
+    def wanted(self, name):
+        """Whether a benchmark (or, for a prefix like "gui.", any in that group) was selected"""
+        return not self.selected or any(name.startswith(key) or key.startswith(name) for key in self.selected)
+
+    def scale(self, n):
+        return max(1, n // 16) if self.quick else n
+
+    def runs(self, n):
+        return max(3, n // 5) if self.quick else n
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def tree(self):
+        if self._tree is None:
+            root = self.path("tree")
+            os.mkdir(root)
+            dirs = 30 if self.quick else 400
+            self._tree = (root, fixtures.make_tree(root, dirs=dirs, files_per_dir=50))
+        return self._tree
+
+    def flat_dir(self):
+        if self._flat is None:
+            self._flat = self.path("flat")
+            fixtures.make_flat_dir(self._flat, 500 if self.quick else 5000)
+        return self._flat
+
+
+def run_suites(ctx):
+    results = {}
+    print(harness.HEADER)
+    for suite in SUITES:
+        for name, op, repeat, units, unit in suite(ctx):
+            if not ctx.wanted(name):
+                continue
+            result = harness.measure(op, repeat, warmup=max(1, repeat // 10), units=units, unit=unit)
+            result["mode"] = ctx.modes.get(name.split(".")[0], "default")
+            results[name] = result
+            print(harness.format_result(name, result), flush=True)
+    return results
+
+
+def main():
+    args = argparse.ArgumentParser(description="pyterminal benchmark suite")
+    args.add_argument("-k", dest="select", default="", help="comma-separated name prefixes, e.g. parser,executor.spawn")
+    args.add_argument("--quick", action="store_true", help="small inputs and few runs")
+    args.add_argument("--save", action="store_true", help="store the results as the baseline")
+    args.add_argument("--baseline", default=BASELINE, help="baseline file (default: benchmarks/baseline.json)")
+    args.add_argument("--tolerance", type=float, default=harness.DEFAULT_TOLERANCE,
+                      help="allowed fractional slowdown / heap growth (default 0.25)")
+    options = args.parse_args()
+    selected = [key for key in options.select.split(",") if key]
+
+    with tempfile.TemporaryDirectory(prefix="pyterminal-bench-") as directory:
+        results = run_suites(Context(directory, options.quick, selected))
+
+    if options.save:
+        harness.save_baseline(options.baseline, results, options.quick)
+        print(f"\nbaseline saved to {options.baseline}")
+        return 0
+    if not os.path.exists(options.baseline):
+        print(f"\nno baseline at {options.baseline}; run with --save to create one")
+        return 0
+
+    baseline = harness.load_baseline(options.baseline)
+    mismatch = harness.size_mismatch(baseline, options.quick)
+    if mismatch:
+        print(f"\nnot compared: {mismatch}; rerun the same way, or --save a new baseline")
+        return 2
+    if baseline.get("environment") != harness.environment():
+        print("\nnote: baseline was recorded on a different machine or Python")
+    lines, regressed = harness.compare(results, baseline, options.tolerance)
+    print()
+    for line in lines:
+        print(line)
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) beyond {options.tolerance:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
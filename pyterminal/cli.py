@@ -1,65 +1,223 @@
 import os
+import sys
+import time
+import codecs
+import shutil
+import threading
 import readline
 
 from parser import CommandParser
 from executor import CommandExecutor
 from completer import AutoCompleter
 
-from colorama import Fore, Style
+# Prompt colours as plain SGR codes (what colorama's Fore/Style hold), so
+# drawing the first prompt doesn't import colorama
+GREEN, CYAN, YELLOW, RESET = "\x1b[32m", "\x1b[36m", "\x1b[33m", "\x1b[0m"
+
+# First line libedit (macOS readline) writes to its history files
+LIBEDIT_HEADER = "_HiStOrY_V2_"
+
+# Most recent history entries loaded into readline for Up/Down
+HISTORY_PRELOAD = 1000
+
+# Ctrl-R submits the line prefixed with this character, which starts the fuzzy search
+SEARCH_MARKER = "\x12"
+
+# Candidates shown under the fuzzy search line
+SEARCH_ROWS = 8
 
 class CommandLineInterface:
     def __init__(self):
         self.running = True
-        self.prompt = self._build_prompt()
+        self._warned_jobs = False
         self.executor = CommandExecutor()
 
         # --- NEW: history + autocomplete ---
+        # Old flat history file, imported into the history database once
         self.history_file = os.path.expanduser("~/.pyterminal_history")
+        self.store = None
         self._setup_history()
+
+        self.prompt = self._build_prompt()
         self._setup_autocomplete()
 
     def _build_prompt(self):
         user = os.getenv("USERNAME") or os.getenv("USER") or "user"
-        cwd = os.getcwd()
-        return f"{Fore.GREEN}{user}{Style.RESET_ALL}@{Fore.CYAN}pyterminal{Style.RESET_ALL}:{Fore.YELLOW}{cwd}{Style.RESET_ALL}$ "
+        cwd = self.executor.cwd
+        return f"{GREEN}{user}{RESET}@{CYAN}pyterminal{RESET}:{YELLOW}{cwd}{RESET}$ "
 
     # -------- History --------
     def _setup_history(self):
+        # The database is opened on a background thread while the completer
+        # is set up; readline itself is only touched from the main thread,
+        # right before the first prompt
+        self._history_lines = []
+        self._history_error = None
+        self._history_loaded = False
+        self._history_loader = threading.Thread(target=self._read_history, daemon=True)
+        self._history_loader.start()
+
+    def _read_history(self):
         try:
-            readline.read_history_file(self.history_file)
-        except FileNotFoundError:
-            open(self.history_file, "wb").close()
+            store = self.executor.history
+            if store.empty() and os.path.exists(self.history_file):
+                store.import_lines(self._read_flat_history(), os.path.getmtime(self.history_file))
+            self._history_lines = [entry[0] for entry in store.recent(HISTORY_PRELOAD)]
+            self.store = store
+        except Exception as e:
+            self._history_error = e
+
+    def _read_flat_history(self):
+        with open(self.history_file, encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+        if lines and lines[0] == LIBEDIT_HEADER:
+            lines = [line.replace("\\040", " ") for line in lines[1:]]
+        return lines
+
+    def _load_history(self):
+        if self._history_loaded:
+            return
+        self._history_loader.join()
+        if self._history_error is not None:
+            print(f"pyterminal: history disabled: {self._history_error}")
+        for line in self._history_lines:
+            readline.add_history(line)
+        self._history_lines = []
+        self._history_loaded = True
 
-    def _save_history(self):
-        readline.write_history_file(self.history_file)
+    def _record(self, command_input, started, cwd, status):
+        if self.store is not None:
+            self.store.record(command_input, started, time.time() - started, cwd, status)
+
+    # -------- Fuzzy history search (Ctrl-R) --------
+    def _search_history(self, query):
+        """Incremental fuzzy search over the shared history; returns the chosen command or None"""
+        if self.store is None:
+            return None
+        try:
+            import termios
+            import tty
+        except ImportError:
+            # No raw terminal mode (Windows): list the matches instead
+            for command in self.store.search(query, SEARCH_ROWS):
+                print(command)
+            return None
+
+        fd = sys.stdin.fileno()
+        saved = termios.tcgetattr(fd)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        rows = max(1, min(SEARCH_ROWS, shutil.get_terminal_size().lines - 2))
+        selected = 0
+        matches = []
+        # Draw over the line readline just submitted
+        sys.stdout.write("\x1b[A")
+        try:
+            tty.setraw(fd)
+            while True:
+                matches = self.store.search(query, rows)
+                selected = min(selected, max(0, len(matches) - 1))
+                self._draw_search(query, matches, selected)
+                key = os.read(fd, 64)
+                if key in (b"\r", b"\n"):
+                    return matches[selected] if matches else None
+                if key in (b"\x03", b"\x07", b"\x1b"):  # Ctrl-C, Ctrl-G, Esc
+                    return None
+                if key in (b"\x7f", b"\x08"):
+                    query = query[:-1]
+                    selected = 0
+                elif key in (b"\x1b[A", b"\x1bOA", b"\x10"):  # Up, Ctrl-P
+                    selected = max(0, selected - 1)
+                elif key in (b"\x1b[B", b"\x1bOB", b"\x0e", b"\x12"):  # Down, Ctrl-N, Ctrl-R
+                    selected += 1
+                elif not key.startswith(b"\x1b"):
+                    text = "".join(c for c in decoder.decode(key) if c.isprintable())
+                    if text:
+                        query += text
+                        selected = 0
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+            sys.stdout.write("\r\x1b[J")
+            sys.stdout.flush()
+
+    @staticmethod
+    def _draw_search(query, matches, selected):
+        width = shutil.get_terminal_size().columns
+        header = f"(fuzzy search) {query}"[:width - 1]
+        out = ["\r\x1b[J", header]
+        for i, command in enumerate(matches):
+            text = command[:width - 3]
+            out.append(f"\r\n\x1b[7m> {text}{RESET}" if i == selected else f"\r\n  {text}")
+        if matches:
+            out.append(f"\x1b[{len(matches)}A")
+        out.append(f"\r\x1b[{len(header)}C" if header else "\r")
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
 
     # -------- Autocomplete --------
     def _setup_autocomplete(self):
-        completer = AutoCompleter(list(self.executor.builtins.keys()))
+        completer = AutoCompleter(
+            list(self.executor.builtins.keys()), lister=self.executor.lister,
+            cwd=lambda: self.executor.cwd, environ=self.executor.env,
+        )
         readline.set_completer(completer.complete)
+        # Only whitespace and shell operators split words, so "src/ma" completes as a path
+        readline.set_completer_delims(" \t\n;|&<>")
         readline.parse_and_bind("tab: complete")
+        # Ctrl-R submits the line as SEARCH_MARKER + text, which run() turns into a fuzzy search
+        readline.parse_and_bind(r'"\C-r": "\C-a\C-v\C-r\C-m"')
 
     def run(self):
         while self.running:
             try:
+                self._load_history()
+                for text in self.executor.jobs.notifications():
+                    print(text)
                 command_input = input(self.prompt).strip()
+                readline.set_startup_hook(None)
                 if not command_input:
                     continue
 
+                if command_input.startswith(SEARCH_MARKER):
+                    readline.remove_history_item(readline.get_current_history_length() - 1)
+                    chosen = self._search_history(command_input[len(SEARCH_MARKER):])
+                    if chosen:
+                        # Put the pick on the next prompt for editing
+                        readline.set_startup_hook(lambda: readline.insert_text(chosen))
+                    continue
+
                 if command_input.lower() in ["exit", "quit"]:
+                    if self.executor.jobs.running() and not self._warned_jobs:
+                        # Like bash: the second exit in a row kills them
+                        print("There are running jobs (see 'jobs'); exit again to stop them.")
+                        self._warned_jobs = True
+                        continue
                     print("Exiting PyTerminal... Goodbye!")
-                    self._save_history()
-                    self.running = False
+                    self._quit()
                     continue
 
-                parsed_commands = CommandParser.parse(command_input)
-                self.executor.execute(parsed_commands)
+                started = time.time()
+                cwd = self.executor.cwd
+                try:
+                    parsed_commands = CommandParser.parse(command_input)
+                except ValueError as e:
+                    print(f"pyterminal: {e}")
+                    self._record(command_input, started, cwd, 2)
+                    continue
+                status = self.executor.execute(parsed_commands)
+                self._record(command_input, started, cwd, status)
+                self._warned_jobs = False
 
                 self.prompt = self._build_prompt()
 
             except (EOFError, KeyboardInterrupt):
                 print("\nExiting PyTerminal... Goodbye!")
-                self._save_history()
-                self.running = False
+                self._quit()
+
+    def _quit(self):
+        self._history_loader.join()
+        if self.store is not None:
+            self.store.close()
+        self.executor.jobs.shutdown()
+        self.running = False
 
 
@@ -0,0 +1,126 @@
+"""
+Thin client for `main.py serve`: sends command lines over the server's
+Unix socket and streams back their output and exit status. It imports
+nothing from the shell itself, so a call costs little more than
+interpreter startup.
+"""
+import os
+import sys
+import signal
+import socket
+import struct
+
+# Frame: kind (1 byte) + payload length (4 bytes, big-endian) + payload
+HEADER = struct.Struct(">cI")
+
+# Client → server
+HELLO = b"H"      # cwd and NAME=value environment, NUL-separated; once per connection
+RUN = b"R"        # one command line (UTF-8)
+INTERRUPT = b"I"  # Ctrl-C: cancel the running command
+
+# Server → client
+OUTPUT = b"O"     # command output bytes
+ERROR = b"E"      # message for stderr (e.g. a parse error)
+STATUS = b"S"     # exit status of the command (ASCII integer); ends its reply
+
+
+def socket_path():
+    """$PYTERMINAL_SOCKET, else a per-user path in the runtime dir or home"""
+    if os.environ.get("PYTERMINAL_SOCKET"):
+        return os.environ["PYTERMINAL_SOCKET"]
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "pyterminal.sock")
+    return os.path.expanduser("~/.pyterminal.sock")
+
+
+def write_frame(sock, kind, payload=b""):
+    sock.sendall(HEADER.pack(kind, len(payload)) + payload)
+
+
+def _read_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return bytes(data)
+
+
+def read_frame(sock):
+    """(kind, payload); raises EOFError when the peer closed the connection"""
+    kind, size = HEADER.unpack(_read_exact(sock, HEADER.size))
+    return kind, _read_exact(sock, size) if size else b""
+
+
+class Client:
+    """One session on the server: cwd and environment carry over between run() calls"""
+
+    def __init__(self, path=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path or socket_path())
+        # NUL can't occur in paths or the environment; json would cost more to import than the rest
+        hello = [os.fsencode(os.getcwd())] + [os.fsencode(f"{k}={v}") for k, v in os.environ.items()]
+        write_frame(self.sock, HELLO, b"\0".join(hello))
+
+    def run(self, line, stdout=None, stderr=None):
+        """Run one command line, writing its output as it arrives; returns the exit status"""
+        stdout = stdout or sys.stdout.buffer
+        stderr = stderr or sys.stderr
+        write_frame(self.sock, RUN, line.encode())
+        # Ctrl-C is forwarded rather than raised, which could cut a frame in half;
+        # the server cancels the command and still answers with its status (130)
+        try:
+            previous = signal.signal(signal.SIGINT, lambda *_: write_frame(self.sock, INTERRUPT))
+        except ValueError:
+            previous = None  # not the main thread
+        try:
+            while True:
+                kind, payload = read_frame(self.sock)
+                if kind == OUTPUT:
+                    stdout.write(payload)
+                    stdout.flush()
+                elif kind == ERROR:
+                    stderr.write(payload.decode(errors="replace") + "\n")
+                elif kind == STATUS:
+                    return int(payload)
+        finally:
+            if previous is not None:
+                signal.signal(signal.SIGINT, previous)
+
+    def close(self):
+        self.sock.close()
+
+
+def main(args):
+    """`main.py client [-s socket] <command | ->`: `-` runs lines from stdin in one session"""
+    path = None
+    if len(args) > 2 and args[0] in ("-s", "--socket"):
+        path, args = args[1], args[2:]
+    if len(args) != 1:
+        print("Usage: main.py client [-s socket] <command | ->", file=sys.stderr)
+        return 2
+    try:
+        client = Client(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"pyterminal: no server at {path or socket_path()}; start one with `python main.py serve`",
+              file=sys.stderr)
+        return 2
+    status = 0
+    try:
+        lines = sys.stdin if args[0] == "-" else [args[0]]
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                status = client.run(line)
+    except EOFError:
+        print("pyterminal: server closed the connection", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # Reader went away (e.g. `main.py client cmd | head`)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 141
+    finally:
+        client.close()
+    return status
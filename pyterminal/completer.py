@@ -1,22 +1,126 @@
 import os
 import readline
+from bisect import bisect_left
+
+from lister import DirectoryLister
+
+# Characters that start a new command, so the next word completes as a command
+COMMAND_SEPARATORS = "|;&"
+
+
+def prefix_range(sorted_items, prefix, key=lambda item: item):
+    """Slice of a sorted list whose keys start with prefix (two binary searches)"""
+    lo = bisect_left(sorted_items, prefix, key=key)
+    hi = bisect_left(sorted_items, prefix + "\U0010ffff", key=key)
+    return sorted_items[lo:hi]
+
 
 class AutoCompleter:
-    def __init__(self, commands):
-        self.commands = commands
+    """
+    readline completer. Candidates are computed once per TAB press (state 0)
+    and served from that list for the following states. Commands come from
+    a sorted index of builtins plus executables on $PATH, rebuilt only when
+    a $PATH directory's mtime changes; paths come from the lister's
+    mtime-keyed directory cache, so each lookup is a binary search.
+    `cwd` (a callable) and `environ` are the session's, so relative paths
+    and $PATH follow `cd` and `export` without touching the process.
+    """
+
+    def __init__(self, commands, lister=None, cwd=os.getcwd, environ=os.environ):
+        self.builtins = list(commands)
+        self.lister = lister or DirectoryLister()
+        self.cwd = cwd
+        self.environ = environ
+        self._path_dirs = {}  # $PATH dir -> (mtime_ns, [executable names])
+        self._commands = sorted(set(self.builtins))
+        self._path_signature = None
+        self._matches = []
 
     def complete(self, text, state):
         """Tab completion logic"""
-        # List of suggestions (commands + files/dirs)
-        options = [cmd for cmd in self.commands if cmd.startswith(text)]
-
-        # Add filesystem matches
-        options.extend(f for f in os.listdir('.') if f.startswith(text))
-
-        # Remove duplicates
-        options = sorted(set(options))
+        if state == 0:
+            line = readline.get_line_buffer()
+            begidx = readline.get_begidx()
+            self._matches = self.candidates(text, self.is_command_position(line[:begidx]))
 
         # Return the state-th option, or None if out of range
-        if state < len(options):
-            return options[state]
+        if state < len(self._matches):
+            return self._matches[state]
         return None
+
+    @staticmethod
+    def is_command_position(before):
+        """True when the word being completed is the first word of a command"""
+        before = before.rstrip()
+        return not before or before[-1] in COMMAND_SEPARATORS
+
+    def candidates(self, text, command_position=False):
+        matches = self.complete_path(text)
+        # Commands only make sense for the first word, and never for a path
+        if command_position and os.sep not in text and "/" not in text:
+            matches = prefix_range(self.commands(), text) + matches
+            matches = sorted(set(matches))
+        return matches
+
+    # -------- Paths --------
+    def complete_path(self, text):
+        """Complete nested paths such as src/ma → src/main.py, src/maps/"""
+        head, base = os.path.split(text)
+        directory = os.path.join(self.cwd(), os.path.expanduser(head))
+        try:
+            entries = self.lister.entries(directory)
+        except OSError:
+            return []
+
+        matches = []
+        for name, is_dir in prefix_range(entries, base, key=lambda e: e[0]):
+            # Like most shells, hidden entries only complete from a "." prefix
+            if name.startswith(".") and not base.startswith("."):
+                continue
+            matches.append(os.path.join(head, name) + ("/" if is_dir else ""))
+        return matches
+
+    # -------- Commands --------
+    def commands(self):
+        """Sorted builtins + $PATH executables, refreshed when $PATH dirs change"""
+        signature = []
+        for directory in self.environ.get("PATH", "").split(os.pathsep):
+            try:
+                signature.append((directory, os.stat(directory).st_mtime_ns))
+            except OSError:
+                continue
+        if signature == self._path_signature:
+            return self._commands
+
+        names = set(self.builtins)
+        for directory, mtime in signature:
+            cached = self._path_dirs.get(directory)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, self.scan_executables(directory))
+                self._path_dirs[directory] = cached
+            names.update(cached[1])
+
+        self._commands = sorted(names)
+        self._path_signature = signature
+        return self._commands
+
+    def scan_executables(self, directory):
+        pathext = [e.lower() for e in self.environ.get("PATHEXT", "").split(os.pathsep) if e]
+        names = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if os.name == "nt":
+                        root, ext = os.path.splitext(entry.name)
+                        if ext.lower() in pathext:
+                            names.append(root)
+                    elif os.access(entry.path, os.X_OK):
+                        names.append(entry.name)
+        except OSError:
+            pass
+        return names
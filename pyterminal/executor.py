@@ -1,297 +1,1682 @@
 import os
-import psutil
-import zipfile
-import subprocess
+import re
+import sys
+import signal
+import shutil
+import threading
+
+from lazy import lazy_import
+from lister import DirectoryLister
+from jobs import JobTable, describe_pipeline
+
+# Imported on first use: most sessions never run top/zip/find, and these
+# account for most of the startup time
+subprocess = lazy_import("subprocess")
+psutil = lazy_import("psutil")
+finder = lazy_import("finder")
+monitor = lazy_import("monitor")
+archiver = lazy_import("archiver")
+fileops = lazy_import("fileops")
+textops = lazy_import("textops")
+colorama = lazy_import("colorama")
+startup = lazy_import("startup")
+history = lazy_import("history")
+profiler = lazy_import("profiler")
+records = lazy_import("records")
+
+# Home the cursor and clear the screen, for builtins that redraw in place
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+# Pipeline output is forwarded in chunks of at most this many bytes
+CHUNK_SIZE = 64 * 1024
+
+# os.open flags per redirection operator (O_BINARY: no newline translation on Windows)
+REDIRECT_FLAGS = {
+    "<": os.O_RDONLY | getattr(os, "O_BINARY", 0),
+    ">": os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+    ">>": os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0),
+}
+# (fd, target) pairs accepted for n>&m: stdout and stderr only
+DUPS = {(1, 2), (2, 1), (1, 1), (2, 2)}
+
+# Stages that take records when ps/ls/find (or another of them) feed them;
+# ps, ls and find emit records only when one of these comes next
+RECORD_STAGES = {"where", "select", "sort", "head", "count"}
+
+# Flags the text builtins implement: (switch letters, which may be bundled;
+# options taking a count). Any other flag (grep -E, cat -n, tail -n +2)
+# hands the command to the system program of the same name.
+TEXT_FLAGS = {
+    "cat": ("", ()),
+    "head": ("", ("-n", "-c")),
+    "tail": ("f", ("-n", "-c")),
+    "wc": ("lwc", ()),
+    "grep": ("ivcnlF", ("-j",)),
+}
+
+# Input of a stage whose predecessor sent its output elsewhere (`a > f | b`): empty
+NO_INPUT = object()
+
+
+def write_stdout(chunk):
+    """Default output sink: write raw bytes to the terminal as they arrive"""
+    sys.stdout.flush()  # keep ordering with anything already print()ed
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is not None:
+        buffer.write(chunk)
+        buffer.flush()
+    else:
+        sys.stdout.write(chunk.decode(errors="replace"))
+
+
+def _line(text):
+    """Encode one line of builtin output"""
+    return (text + "\n").encode()
+
+
+def _error(text):
+    """Encode one line of builtin error output, which the stage writes to its stderr"""
+    return records.Error(_line(text))
+
+
+def parse_options(args, options, switches=()):
+    """
+    Split builtin args into (values, flags, positional). `options` maps each
+    option taking a value to its default; `switches` are boolean flags.
+    Raises ValueError when an option is missing its value.
+    """
+    values = dict(options)
+    flags = set()
+    positional = []
+    it = iter(args)
+    for arg in it:
+        if arg in values:
+            value = next(it, None)
+            if value is None:
+                raise ValueError(f"option {arg} requires a value")
+            values[arg] = value
+        elif arg in switches:
+            flags.add(arg)
+        else:
+            positional.append(arg)
+    return values, flags, positional
+
+
+def unsupported_flag(cmd, args):
+    """The first argument of a text builtin that it doesn't implement, or None"""
+    letters, counted = TEXT_FLAGS[cmd]
+    it = iter(args)
+    for arg in it:
+        if arg in counted:
+            value = next(it, None)
+            if value is None or not value.isdigit():
+                return arg if value is None else f"{arg} {value}"
+        elif arg.startswith("-"):
+            if cmd in ("head", "tail") and arg[1:].isdigit():
+                continue  # -20 for -n 20
+            if len(arg) < 2 or arg[1] == "-" or not set(arg[1:]) <= set(letters):
+                return arg
+    return None
+
+
+def _assignment(arg):
+    name, sep, _ = arg.partition("=")
+    return bool(sep) and name.isidentifier()
+
+
+def needs_external(cmd, args):
+    """Whether the arguments ask for more than the builtin of that name does (grep -E, env NAME=1 cmd)"""
+    if cmd in TEXT_FLAGS:
+        return unsupported_flag(cmd, args) is not None
+    if cmd == "env":
+        return not all(_assignment(arg) for arg in args)
+    return False
+
+
+def split_flags(args, letters):
+    """Expand bundled short flags (-rf → -r -f) when every letter is one of `letters`"""
+    expanded = []
+    for arg in args:
+        if len(arg) > 2 and arg[0] == "-" and arg[1] != "-" and set(arg[1:]) <= set(letters):
+            expanded.extend("-" + letter for letter in arg[1:])
+        else:
+            expanded.append(arg)
+    return expanded
+
+
+def read_chunks(pipe):
+    """Turn the readable end of an OS pipe into an iterator of byte chunks"""
+    try:
+        fd = pipe.fileno()
+        while True:
+            chunk = os.read(fd, CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        pipe.close()
+
+
+class BuiltinStage:
+    """
+    In-process pipe stage. Builtins receive their stdin as an iterator of
+    byte chunks (or None) and may be generators yielding byte chunks; the
+    generator's return value is the exit status. A stage emitting records
+    for a consumer that wants bytes is created with render=True.
+
+    Error lines are records.Error chunks. They go to the stage's stderr:
+    `errors` is a callable taking them, or a binary file the stage writes
+    them to and closes when it ends. With errors=None (`2>&1`) they stay
+    in the output, where record stages downstream pass them on.
+    """
+
+    def __init__(self, func, name, args, stdin=None, kwargs=None, render=False, errors=None):
+        self.func = func
+        self.name = name
+        self.args = args
+        self.stdin = stdin
+        self.kwargs = kwargs or {}
+        self.render = render
+        self.errors = errors
+        self.status = 0
+        self.profile = None  # StageProfile while profiling
+
+    def __iter__(self):
+        try:
+            result = self.func(self.args, self.stdin, **self.kwargs)
+            if hasattr(result, "__next__"):
+                if self.render:
+                    result = records.render(result)
+                result = yield from self._split(result)
+            self.status = result or 0
+        except Exception as e:
+            self.status = 1
+            yield from self._split(iter([records.Error(_line(f"{self.name}: {e}"))]))
+        finally:
+            close = getattr(self.errors, "close", None)
+            if close is not None:
+                close()
+
+    def _split(self, chunks):
+        """Pass output on and error lines to stderr; returns the generator's return value"""
+        if self.errors is None:
+            return (yield from chunks)
+        write = getattr(self.errors, "write", self.errors)
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration as stop:
+                return stop.value
+            # Plain output is bytes itself; only a subclass can be an error line
+            if type(chunk) is not bytes and isinstance(chunk, records.Error):
+                try:
+                    write(chunk)
+                except OSError:
+                    pass  # e.g. `2>` into a pipe nobody reads
+            else:
+                yield chunk
 
-from colorama import Fore, Style, init
-init(autoreset=True)
 
 class CommandExecutor:
-    def __init__(self):
+    def __init__(self, output=None, cwd=None, env=None, color=None):
+        # Callable receiving each chunk of pipeline output (bytes)
+        self.output = output or write_stdout
+        # Whether that output reaches a screen, where ls may colour names; by
+        # default only when it is a terminal (not `main.py -c ls > file`)
+        self.color = sys.stdout.isatty() if color is None else color
+
+        # This session's working directory and environment. The process-wide
+        # os.chdir/os.environ are never touched, so several sessions (GUI tabs,
+        # jobs) can run side by side; children get them through Popen.
+        self.cwd = os.path.abspath(cwd or os.getcwd())
+        self.env = dict(os.environ if env is None else env)
+        self.env["PWD"] = self.cwd
+
+        # Shared so the filename index and listing cache stay warm between calls;
+        # the finder, the metrics history and the history store are created on
+        # first use. A job's executor asks the shell's (its parent) for them, so
+        # whichever uses one first creates it for both.
+        self._finder = None
+        self.lister = DirectoryLister()
+        self._metrics = None
+        self._history = None
+        self._shared_lock = threading.Lock()
+        self._parent = None
+        self.jobs = JobTable()
+        # Set on a job's private executor: its processes get their own session
+        # and no terminal stdin, so Ctrl-C and typing reach only the foreground
+        self.background = False
+        # Opt-in profiling: every pipeline is measured and appended to this log
+        self.profile_log = None
+        if os.environ.get("PYTERMINAL_PROFILE"):
+            path = os.environ["PYTERMINAL_PROFILE"]
+            self.profile_log = profiler.ProfileLog(None if path == "1" else path)
+
+        # Running processes, so another thread can cancel the pipeline
+        self._lock = threading.Lock()
+        self._running = set()
+        self._cancelled = threading.Event()
+
         self.builtins = {
             "cd": self.change_directory,
+            "export": self.export_variables,
+            "unset": self.unset_variables,
+            "env": self.show_environment,
             "pwd": self.print_working_directory,
             "ls": self.list_directory,
             "echo": self.echo,
+            "tee": self.tee,
+            "cat": self.cat,
+            "head": self.head,
+            "tail": self.tail,
+            "wc": self.word_count,
+            "grep": self.grep,
+            "where": self.where,
+            "select": self.select,
+            "count": self.count_records,
             "cpu": self.cpu_usage,
             "mem": self.memory_usage,
+            "metrics": self.metrics_sampler,
             "ps": self.list_processes,
+            "top": self.top,
             "kill": self.kill_process,
+            "jobs": self.list_jobs,
+            "fg": self.foreground,
+            "bg": self.background_job,
+            "wait": self.wait_jobs,
+            "history": self.show_history,
+            "time": self.time_usage,
+            "profile": self.profile_mode,
+            "stats": self.profile_stats,
             "touch": self.touch,
             "mkdir": self.make_directory,
             "rm": self.remove_file,
             "rmdir": self.remove_directory,
+            "cp": self.copy_files,
+            "mv": self.move_files,
             "find": self.find_files,
             "zip": self.zip_files,
             "unzip": self.unzip_file,
             "clear": self.clear_screen,
+            "startup": self.startup_report,
             "help": self.help_menu
         }
 
+        # Builtins that format differently when their output feeds another
+        # stage; they are called with piped=True/False
+        self.pipe_aware = {"ls", "top"}
+
+        # Builtins that emit records instead of text when a record stage
+        # follows or --json/--csv is given; they are called with as_records=True/False
+        self.record_sources = {"ps", "ls", "find"}
+
+        # Record versions of commands that otherwise keep their text meaning
+        # (sort is the system sort unless it is fed records)
+        self.record_stages = {"sort": self.sort_records, "head": self.head_records}
+
         # Command descriptions for 'help'
         self.command_help = {
             "cd": "Change directory",
+            "export": "Set session environment variables for commands run from here: export NAME=value ...",
+            "unset": "Remove session environment variables: unset NAME ...",
+            "env": "List the session environment; env NAME=value cmd runs cmd with NAME set",
             "pwd": "Print working directory",
-            "ls": "List files in directory",
+            "ls": "List files in directory (-l long, -a all, -S size, -t time, -r reverse, -R recursive, -1 one per line)",
             "echo": "Print text to terminal",
-            "cpu": "Show CPU usage",
-            "mem": "Show memory usage",
-            "ps": "List running processes",
-            "kill": "Terminate process by PID",
-            "touch": "Create empty file",
-            "mkdir": "Create directory",
-            "rm": "Remove file (or use -r for dir)",
-            "rmdir": "Remove empty directory",
-            "find": "Find files/directories",
-            "zip": "Create zip archive",
-            "unzip": "Extract zip archive",
+            "tee": "Copy piped input to files and to the output (-a appends): cmd | tee out.log",
+            "cat": "Print files, memory-mapped (or pass piped input through)",
+            "head": "First lines of files or piped input (-n lines, -c bytes, -20 shorthand), or first records: ps | head 5",
+            "tail": "Last lines, found from the end of the file (-n lines, -c bytes, -f follow)",
+            "wc": "Count lines, words and bytes (-l, -w, -c)",
+            "grep": "Search with a regex (-i, -v, -c, -n, -l, -F fixed, -j workers for many files)",
+            "where": "Filter records from ps/ls/find: ps | where cpu gt 5, ls | where 'size > 10M' (== != < <= > >= =~)",
+            "select": "Choose the fields to print: ps | select pid name rss (--json/--csv on any record stage)",
+            "sort": "Sort records by fields (-r descending): ps | sort rss -r; text input goes to the system sort",
+            "count": "Count records: find . -name '*.py' | count",
+            "cpu": "Show CPU usage (--per-core, -w secs for min/avg/max, --export csv|json)",
+            "mem": "Show memory usage (-w secs for min/avg/max, --export csv|json)",
+            "metrics": "Background metrics sampler: start [-i secs] [-k samples] | stop | status",
+            "ps": "List running processes (fields for where/sort/select: pid name status user ppid cpu mem rss vms threads started cmd)",
+            "top": "Live process monitor (-d secs, -n count, -s cpu|mem|pid|name, -f name, -u user, -m rows)",
+            "kill": "Terminate process by PID or %job (-STOP / -CONT / -KILL / -<signal>)",
+            "jobs": "List background jobs (started with 'cmd &')",
+            "fg": "Show a job's output and wait for it in the foreground (fg [%n])",
+            "bg": "Continue a stopped job in the background (bg [%n])",
+            "wait": "Wait for background jobs to finish (wait [%n ...])",
+            "history": "Show recent commands (-n count) or fuzzy-search them: history search <text>",
+            "time": "Time a pipeline: time [-v] <command> (-v: per-stage spawn/CPU/RSS/bytes)",
+            "profile": "Record every pipeline's timings to a JSON-lines log: profile on [file] | off | status",
+            "stats": "Wall-time percentiles per program from the profile log (-f file) [program]",
+            "touch": "Create files or update their times (globs, --dry-run)",
+            "mkdir": "Create directories with parents (globs, --dry-run)",
+            "rm": "Remove files; -r for directories, -f ignores missing (globs, parallel, --dry-run)",
+            "rmdir": "Remove empty directories",
+            "cp": "Copy files; -r for directories (parallel, in-kernel copies, --dry-run)",
+            "mv": "Move or rename files and directories (--dry-run)",
+            "find": "Find files/directories (-name, -iname, -regex, -type f|d, -I to use index; records: name path type size modified mode ext)",
+            "zip": "Create zip archive (-r recurse, -m deflate|lzma|bzip2|store, -0..-9 level, -j workers)",
+            "unzip": "Extract zip archive (-d dir, -j workers)",
             "clear": "Clear the terminal screen",
+            "startup": "Measure shell startup against its budget (-n runs, -b budget ms)",
             "help": "Show available commands"
         }
 
+    @property
+    def finder(self):
+        if self._parent is not None:
+            return self._parent.finder
+        with self._shared_lock:
+            if self._finder is None:
+                self._finder = finder.FileFinder()
+            return self._finder
+
+    @property
+    def metrics(self):
+        # Background metrics history for cpu/mem; idle until `metrics start`
+        if self._parent is not None:
+            return self._parent.metrics
+        with self._shared_lock:
+            if self._metrics is None:
+                self._metrics = monitor.MetricsSampler()
+            return self._metrics
+
+    @property
+    def history(self):
+        # Shared command history; opened by the CLI's loader thread at startup
+        if self._parent is not None:
+            return self._parent.history
+        with self._shared_lock:
+            if self._history is None:
+                self._history = history.HistoryStore()
+            return self._history
+
     def execute(self, parsed_commands):
-        """Executes a list of parsed commands (with chaining + pipes)."""
+        """Executes parsed command lists (sequences, && / ||, pipes)."""
         last_status = 0  # track success/failure
+        self._cancelled.clear()
 
-        for command in parsed_commands:
-            pipe_chain = command["pipe_chain"]
-            must_succeed = command["must_succeed"]
-
-            if must_succeed and last_status != 0:
-                # Skip if previous failed
+        for and_or in parsed_commands:
+            if and_or.background:
+                job = self._start_job(and_or)
+                self.output(_line(f"[{job.number}] {job.text}"))
+                last_status = 0
                 continue
+            for op, pipeline in and_or.items:
+                if self._cancelled.is_set():
+                    return 130
+                # a && b runs b only after success, a || b only after failure
+                if op == "&&" and last_status != 0 or op == "||" and last_status == 0:
+                    continue
+                last_status = self._execute_pipeline(pipeline)
+        return last_status
 
-            last_status = self._execute_pipe_chain(pipe_chain)
+    def cancel(self):
+        """Kill the running pipeline; safe to call from any thread (e.g. a GUI Ctrl-C)."""
+        self._cancelled.set()
+        with self._lock:
+            processes = list(self._running)
+        for proc in processes:
+            if proc.poll() is None:
+                proc.kill()
 
-    def _execute_pipe_chain(self, pipe_chain):
-        """Handles piping between commands."""
-        prev_proc = None
-        processes = []
+    def send_signal(self, sig):
+        """Signal every running process of the current pipeline"""
+        with self._lock:
+            processes = list(self._running)
+        for proc in processes:
+            if proc.poll() is None:
+                proc.send_signal(sig)
 
-        for i, cmd_parts in enumerate(pipe_chain):
-            cmd = cmd_parts[0]
-            args = cmd_parts[1:]
+    def _start_job(self, and_or):
+        # A job starts with a copy of the shell's cwd and environment, like a subshell
+        executor = CommandExecutor(cwd=self.cwd, env=self.env, color=self.color)
+        executor.background = True
+        # Share the caches and the job table with the shell; the finder, metrics
+        # and history come from the shell even if neither has used them yet
+        executor._parent, executor.lister, executor.jobs = self, self.lister, self.jobs
+        executor.profile_log = self.profile_log
+        return self.jobs.start(and_or, executor)
 
-            # Builtin commands only work standalone (not in middle of pipe)
-            if cmd in self.builtins and len(pipe_chain) == 1:
-                self.builtins[cmd](args)
-                return 0
+    def _execute_pipeline(self, pipeline):
+        # `time` prefixes the whole pipeline, as in POSIX shells
+        argv = pipeline.commands[0].argv
+        timed = argv[0] == "time" and len(argv) > 1 and argv[1:] != ("-v",)
+        verbose = False
+        if timed:
+            words = argv[1:]
+            verbose = words[0] == "-v"
+            first = pipeline.commands[0]._replace(argv=words[1:] if verbose else words)
+            pipeline = pipeline._replace(commands=(first,) + pipeline.commands[1:])
 
-            try:
-                if prev_proc is None:
-                    proc = subprocess.Popen(
-                        cmd_parts, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-                    )
-                else:
-                    proc = subprocess.Popen(
-                        cmd_parts, stdin=prev_proc.stdout,
-                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        profile = None
+        if timed or self.profile_log is not None:
+            profile = profiler.PipelineProfile(describe_pipeline(pipeline))
+        status = self._execute_pipe_chain(
+            [list(command.argv) for command in pipeline.commands], profile,
+            [command.redirects for command in pipeline.commands]
+        )
+        if profile is not None:
+            record = profile.finish(status)
+            if self.profile_log is not None:
+                self.profile_log.write(record)
+            if timed:
+                report = profiler.format_time(record)
+                if verbose:
+                    report += profiler.format_stages(record)
+                self.output(report.encode())
+        return status
+
+    def _execute_pipe_chain(self, pipe_chain, profile=None, redirects=None):
+        """Connects builtin and external stages, streaming output as it is produced."""
+        redirects = redirects or [()] * len(pipe_chain)
+        plans = self._plan(pipe_chain)
+        if not any(redirects) and all(func is not None for func, _, _ in plans):
+            return self._execute_builtin_chain(pipe_chain, plans, profile)
+
+        processes = []
+        pumps = []
+        last_stage = None  # BuiltinStage or Popen whose status the pipeline returns
+        stage_profile = None  # of the previous stage, while profiling
+
+        # stdout of the last stage and stderr of every stage share one pipe,
+        # so the kernel keeps them interleaved in the order they were written.
+        read_fd, write_fd = os.pipe()
+        try:
+            # None, NO_INPUT, a BuiltinStage, or the stdout pipe of the previous process
+            upstream = None
+            for i, cmd_parts in enumerate(pipe_chain):
+                cmd = cmd_parts[0]
+                last = i == len(pipe_chain) - 1
+                stdin = upstream
+                if upstream is NO_INPUT or upstream is None and self.background:
+                    stdin = subprocess.DEVNULL
+                elif isinstance(upstream, BuiltinStage) and plans[i][0] is None:
+                    stdin = subprocess.PIPE
+                try:
+                    streams, opened = self._open_redirects(
+                        redirects[i], {0: stdin, 1: write_fd if last else subprocess.PIPE, 2: write_fd}
                     )
+                except (OSError, ValueError) as e:
+                    self.output(_line(f"pyterminal: {e}"))
+                    self._abort(processes)
+                    self._discard(upstream, pumps)
+                    return 1
+                if streams[0] is not stdin:
+                    # `< file` replaces whatever the previous stage writes
+                    self._discard(upstream, pumps)
+                    upstream = None
+
+                try:
+                    if plans[i][0] is not None:
+                        if upstream is NO_INPUT:
+                            upstream = iter(())
+                        elif upstream is not None and not isinstance(upstream, BuiltinStage):
+                            upstream = read_chunks(upstream)
+                            if profile is not None:
+                                upstream = profile.count(stage_profile, upstream)
+                        elif streams[0] is not stdin:
+                            upstream = read_chunks(open(os.dup(streams[0]), "rb"))
+                        plan = plans[i]
+                        if streams[1] != write_fd and plan[1] and "piped" in plan[1]:
+                            # `ls > file` is written for a program too: no columns or colour
+                            plan = (plan[0], dict(plan[1], piped=True), plan[2])
+                        stage = self._builtin_stage(cmd_parts, upstream, plan, profile, self._error_file(streams))
+                        stage_profile, last_stage = stage.profile, stage
+                        if streams[1] == subprocess.PIPE and not last:
+                            upstream = stage
+                        else:
+                            # Last stage, `> file` or `>&2`. Terminal output goes into the shared
+                            # pipe to keep ordering; files get buffered writes
+                            target = streams[1]
+                            pumps.append(self._pump(
+                                self._measured(stage, profile), open(os.dup(target), "wb"), flush=target == write_fd
+                            ))
+                            upstream = NO_INPUT
+                        continue
+
+                    if profile is not None:
+                        stage_profile = profile.stage(cmd, "external")
+                    fed_by_builtin = streams[0] is subprocess.PIPE
+                    try:
+                        proc = subprocess.Popen(
+                            cmd_parts,
+                            stdin=streams[0],
+                            stdout=streams[1],
+                            # `2>&1` in mid-pipeline sends stderr down the pipe with stdout
+                            stderr=subprocess.STDOUT if streams[2] == subprocess.PIPE else streams[2],
+                            cwd=self.cwd,
+                            env=self.env,
+                            start_new_session=self.background
+                        )
+                    except FileNotFoundError:
+                        self.output(_line(f"Command not found: {cmd}"))
+                        self._abort(processes)
+                        return 1
+                    except Exception as e:
+                        self.output(_line(f"Error running command {cmd}: {e}"))
+                        self._abort(processes)
+                        return 1
+                    finally:
+                        # The child owns its stdin now; closing ours lets SIGPIPE reach the writer
+                        if upstream is not None and upstream is not NO_INPUT and not fed_by_builtin:
+                            upstream.close()
+                finally:
+                    # Children and stream objects hold their own copies of redirected files
+                    for fd in opened:
+                        os.close(fd)
+
+                if profile is not None:
+                    stage_profile.spawned()
+                    profile.watch(stage_profile, proc)
+                if fed_by_builtin:
+                    pumps.append(self._pump(self._measured(upstream, profile), proc.stdin))
                 processes.append(proc)
-                prev_proc = proc
-            except FileNotFoundError:
-                print(f"Command not found: {cmd}")
-                return 1
-            except Exception as e:
-                print(f"Error running command {cmd}: {e}")
-                return 1
+                self._track(proc)
+                last_stage = proc
+                upstream = proc.stdout if proc.stdout is not None else NO_INPUT
 
-        # Collect output from last process in the pipe
-        if processes:
-            out, err = processes[-1].communicate()
-            if out:
-                print(out.strip())
-            if err:
-                print(err.strip())
-            return processes[-1].returncode
-        return 0
+            os.close(write_fd)
+            write_fd = None
+            output = profile.sink(self.output) if profile is not None else self.output
+            interrupted = not self._stream_output(read_fd, processes, output)
+        finally:
+            if write_fd is not None:
+                os.close(write_fd)
+            os.close(read_fd)
+            with self._lock:
+                self._running.difference_update(processes)
 
-    # -------- Built-ins --------
-    def change_directory(self, args):
+        for pump in pumps:
+            pump.join()
+        if interrupted or self._cancelled.is_set():
+            return 130
+        if isinstance(last_stage, BuiltinStage):
+            return last_stage.status
+        return last_stage.returncode
+
+    def _execute_builtin_chain(self, pipe_chain, plans, profile=None):
+        """Runs a pipeline made only of builtins by chaining their generators in-process."""
+        stage = None
+        output = profile.sink(self.output) if profile is not None else self.output
+        for cmd_parts, plan in zip(pipe_chain, plans):
+            # Every stage's stderr is the terminal, not the next stage
+            stage = self._builtin_stage(cmd_parts, stage, plan, profile, output)
         try:
-            if args:
-                os.chdir(args[0])
+            for chunk in self._measured(stage, profile):
+                if self._cancelled.is_set():
+                    return 130
+                output(chunk)
+        except KeyboardInterrupt:
+            return 130
+        if self._cancelled.is_set():
+            return 130  # e.g. `tail -f` stopped by cancel() while waiting for data
+        return stage.status
+
+    def _plan(self, pipe_chain):
+        """
+        How each stage runs: (builtin function, or None for an external
+        command; its keyword arguments; whether its records are rendered
+        as text for the next stage). ps/ls/find emit records when a record
+        stage follows them or --json/--csv asks for it; sort and head work
+        on records only when they are fed records and their arguments are
+        record arguments (`sort rss -r`, `head 5`, not `sort -u`).
+        """
+        plans = []
+        kind = None  # of the records the previous stage emits, if it does
+        for i, cmd_parts in enumerate(pipe_chain):
+            cmd, args = cmd_parts[0], cmd_parts[1:]
+            following = pipe_chain[i + 1] if i + 1 < len(pipe_chain) else None
+            kwargs = {}
+            if cmd in self.pipe_aware:
+                kwargs["piped"] = following is not None
+            if cmd in self.record_sources:
+                source = records.SOURCES[cmd]
+                emits = self._takes_records(following, source) or "--json" in args or "--csv" in args
+                kwargs["as_records"] = emits
+                func, kind = self.builtins[cmd], source if emits else None
+            elif kind is not None:
+                # A record stage (the previous one checked): sort/head take their record versions
+                func = self.record_stages.get(cmd) or self.builtins[cmd]
+                if cmd == "count":
+                    kind = None  # prints a number
             else:
-                os.chdir(os.path.expanduser("~"))
-        except Exception as e:
-            print(f"cd: {e}")
+                # where/select/count without records complain about it themselves
+                func = self.builtins.get(cmd)
+                if needs_external(cmd, args) and shutil.which(cmd, path=self.env.get("PATH")):
+                    func = None  # the system tool does what the builtin doesn't
+            render = kind is not None and not self._takes_records(following, kind)
+            plans.append((func, kwargs or None, render))
+            if render:
+                kind = None
+        return plans
+
+    def _takes_records(self, cmd_parts, kind):
+        """Whether a stage fed records of this kind runs as a record stage"""
+        if cmd_parts is None or cmd_parts[0] not in RECORD_STAGES:
+            return False
+        if cmd_parts[0] in self.record_stages:
+            return records.takes(cmd_parts[0], cmd_parts[1:], kind)
+        return True
+
+    def _builtin_stage(self, cmd_parts, stdin, plan, profile=None, errors=None):
+        cmd = cmd_parts[0]
+        func, kwargs, render = plan
+        source = stdin.profile if isinstance(stdin, BuiltinStage) else None
+        stage = BuiltinStage(func, cmd, cmd_parts[1:], self._measured(stdin, profile), kwargs, render, errors)
+        if profile is not None:
+            stage.profile = profile.stage(cmd, "builtin")
+            stage.profile.source = source
+        return stage
+
+    @staticmethod
+    def _measured(stage, profile):
+        """A builtin stage's chunks, timed and counted while profiling"""
+        if profile is None or not isinstance(stage, BuiltinStage):
+            return stage
+        return profile.count(stage.profile, stage)
 
-    def print_working_directory(self, args):
-        print(os.getcwd())
+    def _track(self, proc):
+        """Register a spawned process so cancel() can reach it"""
+        with self._lock:
+            self._running.add(proc)
+        if self._cancelled.is_set():
+            proc.kill()
 
-    def list_directory(self, args):
+    def _open_redirects(self, redirects, streams):
+        """
+        Apply a command's redirections, left to right, to its default
+        streams {0: stdin, 1: stdout, 2: stderr}. Files are opened here,
+        so external commands get the descriptors and no byte passes
+        through Python. Returns (streams, descriptors to close once the
+        stage has its own copies).
+        """
+        streams = dict(streams)
+        opened = []
         try:
-            path = args[0] if args else os.getcwd()
-            entries = os.listdir(path)
-            for entry in entries:
-                full_path = os.path.join(path, entry)
-                if os.path.isdir(full_path):
-                    print(f"[DIR]  {entry}")
-                else:
-                    print(f"       {entry}")
-        except Exception as e:
-            print(f"ls: {e}")
+            for redirect in redirects:
+                if redirect.fd not in (0, 1, 2):
+                    raise ValueError(f"{redirect.fd}: bad file descriptor")
+                if redirect.op == ">&" and (redirect.fd, redirect.target) not in DUPS:
+                    raise ValueError(f"{redirect.fd}>&{redirect.target}: only 1>&2 and 2>&1 are supported")
+                if redirect.op == ">&":
+                    streams[redirect.fd] = streams[redirect.target]
+                    continue
+                path = self.resolve(redirect.target)
+                try:
+                    fd = os.open(path, REDIRECT_FLAGS[redirect.op], 0o666)
+                except OSError as e:
+                    raise OSError(f"{redirect.target}: {e.strerror}") from None
+                opened.append(fd)
+                streams[redirect.fd] = fd
+        except (OSError, ValueError):
+            for fd in opened:
+                os.close(fd)
+            raise
+        return streams, opened
 
-    def echo(self, args):
+    @staticmethod
+    def _error_file(streams):
+        """
+        A builtin stage's stderr: its own copy of fd 2's target (the shared
+        output pipe, or a `2>` file), or None when `2>&1` sends it down the
+        pipe or into the same place as stdout
+        """
+        if streams[2] == subprocess.PIPE or streams[2] == streams[1]:
+            return None
+        return open(os.dup(streams[2]), "wb", buffering=0)
+
+    def _discard(self, upstream, pumps):
+        """Drop a stage's output that nothing reads (`a | b < file`); builtins still run"""
+        if isinstance(upstream, BuiltinStage):
+            pumps.append(self._pump(upstream, open(os.devnull, "wb"), flush=False))
+        elif upstream is not None and upstream is not NO_INPUT:
+            upstream.close()
+
+    def _pump(self, stage, pipe, flush=True):
+        """Feed a builtin stage's output into a pipe (or file) from a background thread"""
+        def run():
+            try:
+                for chunk in stage:
+                    if self._cancelled.is_set():
+                        break
+                    pipe.write(chunk)
+                    if flush:
+                        pipe.flush()
+            except OSError:
+                pass  # reader went away (e.g. `ps | head`)
+            finally:
+                try:
+                    pipe.close()
+                except OSError:
+                    pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _stream_output(self, read_fd, processes, output):
+        """Forward pipeline output in bounded chunks until every writer has exited."""
+        try:
+            while True:
+                chunk = os.read(read_fd, CHUNK_SIZE)
+                if not chunk:
+                    break
+                output(chunk)
+            for proc in processes:
+                proc.wait()
+        except KeyboardInterrupt:
+            self._cancelled.set()  # stops builtin stages still feeding the pipeline (`tail -f log | sort`)
+            self._abort(processes)
+            return False
+        return True
+
+    @staticmethod
+    def _abort(processes):
+        """Kill and reap already-started stages of a failed pipeline"""
+        for proc in processes:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+
+    def resolve(self, path):
+        """`path` as an absolute path in this session's working directory"""
+        return os.path.join(self.cwd, os.path.expanduser(path))
+
+    # -------- Built-ins --------
+    def print_working_directory(self, args, stdin=None):
+        yield _line(self.cwd)
+
+    def echo(self, args, stdin=None):
         """Implements 'echo' command"""
-        print(" ".join(args))
+        yield _line(" ".join(args))
+
+    def tee(self, args, stdin=None):
+        """Copy stdin to each file (buffered binary writes) and pass it on"""
+        _, flags, paths = parse_options(args, {}, switches={"-a"})
+        if stdin is None or any(path.startswith("-") for path in paths):
+            yield _error("Usage: cmd | tee [-a] [file ...]")
+            return 1
+        mode = "ab" if "-a" in flags else "wb"
+        files = []
+        try:
+            for path in paths:
+                files.append(open(self.resolve(path), mode, buffering=CHUNK_SIZE))
+        except OSError as e:
+            for f in files:
+                f.close()
+            yield _error(f"tee: {path}: {e.strerror}")
+            return 1
+        try:
+            for chunk in stdin:
+                for f in files:
+                    f.write(chunk)
+                yield chunk
+        finally:
+            for f in files:
+                f.close()
 
     # -------- New System Monitoring Commands --------
-    def cpu_usage(self, args):
-        """Show CPU usage percentage"""
-        print(f"CPU Usage: {psutil.cpu_percent(interval=1)}%")
+    def cpu_usage(self, args, stdin=None):
+        """Show CPU usage percentage (instant when the metrics sampler is running)"""
+        options, flags, positional = parse_options(args, {"-w": None, "--export": None}, switches={"--per-core"})
+        if positional:
+            yield _error("Usage: cpu [--per-core] [-w secs] [--export csv|json]")
+            return 1
+        if options["-w"] or options["--export"]:
+            return (yield from self._metrics_report("cpu", "cpu", options))
+
+        latest = self.metrics.latest()
+        if "--per-core" in flags:
+            per_cpu = latest.per_cpu if latest else psutil.cpu_percent(interval=1, percpu=True)
+            for core, percent in enumerate(per_cpu):
+                yield _line(f"CPU{core}: {percent}%")
+        else:
+            percent = round(latest.cpu, 1) if latest else psutil.cpu_percent(interval=1)
+            yield _line(f"CPU Usage: {percent}%")
 
-    def memory_usage(self, args):
+    def memory_usage(self, args, stdin=None):
         """Show memory usage stats"""
+        options, _, positional = parse_options(args, {"-w": None, "--export": None})
+        if positional:
+            yield _error("Usage: mem [-w secs] [--export csv|json]")
+            return 1
+        if options["-w"] or options["--export"]:
+            return (yield from self._metrics_report("mem", "mem_percent", options))
+
         mem = psutil.virtual_memory()
-        print(f"Memory Used: {mem.percent}% ({mem.used // (1024 ** 2)} MB / {mem.total // (1024 ** 2)} MB)")
+        yield _line(f"Memory Used: {mem.percent}% ({mem.used // (1024 ** 2)} MB / {mem.total // (1024 ** 2)} MB)")
 
-    def list_processes(self, args):
-        """List running processes"""
-        print(f"{'PID':<10} {'Name':<25} {'Status':<10}")
+    def _metrics_report(self, name, field, options):
+        """min/avg/max over a window, or the full history export, for cpu/mem"""
+        if not self.metrics.history:
+            yield _error(f"{name}: no samples yet (start the sampler with 'metrics start')")
+            return 1
+        fmt = options["--export"]
+        if fmt:
+            if fmt not in ("csv", "json"):
+                yield _error(f"{name}: --export takes csv or json")
+                return 1
+            for text in self.metrics.export(fmt):
+                yield text.encode()
+            return 0
+
+        samples = self.metrics.window(float(options["-w"]))
+        if not samples:
+            yield _error(f"{name}: no samples in the last {options['-w']}s")
+            return 1
+        low, avg, high = self.metrics.summarize(samples, field)
+        yield _line(f"{name} over {options['-w']}s: min {low:.1f}% / avg {avg:.1f}% / max {high:.1f}% ({len(samples)} samples)")
+
+    def metrics_sampler(self, args, stdin=None):
+        """Control the background metrics sampler"""
+        usage = "Usage: metrics start [-i secs] [-k samples] | stop | status"
+        options, _, positional = parse_options(args, {"-i": None, "-k": None})
+        action = positional[0] if positional else "status"
+        if action == "start":
+            self.metrics.start(
+                interval=float(options["-i"]) if options["-i"] else None,
+                size=int(options["-k"]) if options["-k"] else None,
+            )
+            yield _line(f"Metrics sampler running every {self.metrics.interval}s "
+                        f"(keeps {self.metrics.history.maxlen} samples)")
+        elif action == "stop":
+            self.metrics.stop()
+            yield _line("Metrics sampler stopped")
+        elif action == "status":
+            state = "running" if self.metrics.running else "stopped"
+            yield _line(f"Metrics sampler {state}: {len(self.metrics.history)}/{self.metrics.history.maxlen} "
+                        f"samples every {self.metrics.interval}s")
+        else:
+            yield _error(usage)
+            return 1
+
+    def list_processes(self, args, stdin=None, as_records=False):
+        """List running processes, or emit them as records for where/sort/select"""
+        if as_records:
+            format, _ = records.parse_format(args)
+            return (yield from records.processes(format or "text"))
+        yield _line(f"{'PID':<10} {'Name':<25} {'Status':<10}")
         for proc in psutil.process_iter(['pid', 'name', 'status']):
             try:
-                print(f"{proc.info['pid']:<10} {proc.info['name']:<25} {proc.info['status']:<10}")
+                yield _line(f"{proc.info['pid']:<10} {proc.info['name']:<25} {proc.info['status']:<10}")
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
 
-    def kill_process(self, args):
-        """Kill process by PID"""
-        if not args:
-            print("Usage: kill <pid>")
-            return
+    def top(self, args, stdin=None, piped=False):
+        """Live process monitor, redrawn in place every -d seconds until cancelled"""
+        usage = "Usage: top [-d secs] [-n iterations] [-s cpu|mem|pid|name] [-f name] [-u user] [-m rows]"
         try:
-            pid = int(args[0])
-            proc = psutil.Process(pid)
-            proc.terminate()
-            print(f"Process {pid} terminated.")
-        except Exception as e:
-            print(f"kill: {e}")
+            options, _, positional = parse_options(
+                args, {"-d": "2", "-n": "1" if piped else "0", "-s": "cpu", "-f": None, "-u": None, "-m": None}
+            )
+            interval = float(options["-d"])
+            iterations = int(options["-n"])
+            if options["-m"]:
+                limit = int(options["-m"])
+            else:
+                # Fill the terminal when drawing to it; print everything into a pipe
+                limit = None if piped else max(1, shutil.get_terminal_size((80, 24)).lines - 5)
+        except ValueError:
+            yield _error(usage)
+            return 1
+        if positional or options["-s"] not in monitor.SORT_KEYS or interval <= 0:
+            yield _error(usage)
+            return 1
 
-    # -------- File/Directory Operations --------
-    def touch(self, args):
-        """Create an empty file"""
+        sampler = monitor.ProcessSampler()
+        sampler.sample()  # baseline for the first CPU deltas
+        count = 0
+        while not iterations or count < iterations:
+            # Waiting on the cancel event instead of sleeping lets Ctrl-C stop top at once
+            if self._cancelled.wait(interval):
+                return 130
+            rows = sampler.sample()
+            shown = sampler.select(rows, options["-s"], options["-f"], options["-u"], limit)
+            screen = sampler.render(rows, shown)
+            yield (screen if piped else CLEAR_SCREEN + screen).encode()
+            count += 1
+
+    def kill_process(self, args, stdin=None):
+        """Kill process by PID, or signal a background job by %number"""
+        sig = signal.SIGTERM
+        if args and args[0].startswith("-") and len(args[0]) > 1:
+            name = args[0][1:].upper()
+            try:
+                sig = signal.Signals(int(name)) if name.isdigit() else signal.Signals["SIG" + name.removeprefix("SIG")]
+            except (KeyError, ValueError):
+                yield _error(f"kill: {args[0][1:]}: invalid signal specification")
+                return 1
+            args = args[1:]
         if not args:
-            print("Usage: touch <filename>")
+            yield _error("Usage: kill [-signal] <pid|%job> ...")
+            return 1
+
+        status = 0
+        for target in args:
+            try:
+                if target.startswith("%"):
+                    job = self.jobs.get(target)
+                    self._signal_job(job, sig)
+                    yield _line(f"[{job.number}] {sig.name}  {job.text}")
+                else:
+                    pid = int(target)
+                    psutil.Process(pid).send_signal(sig)
+                    yield _line(f"Process {pid} terminated." if sig == signal.SIGTERM else f"Process {pid}: {sig.name} sent.")
+            except Exception as e:
+                yield _error(f"kill: {e}")
+                status = 1
+        return status
+
+    # -------- Job Control --------
+    def _signal_job(self, job, sig):
+        if not job.running:
+            raise ProcessLookupError(f"%{job.number}: job has already finished")
+        if sig in (signal.SIGTERM, signal.SIGINT, getattr(signal, "SIGKILL", None)):
+            job.cancel()  # also stops the rest of a `a && b &` list
             return
+        job.send_signal(sig)
+        if sig == getattr(signal, "SIGSTOP", None):
+            job.stopped = True
+        elif sig == getattr(signal, "SIGCONT", None):
+            job.stopped = False
+
+    def list_jobs(self, args, stdin=None):
+        """List background jobs with their state"""
+        for job in self.jobs.list():
+            unread = f"  ({job.unread} bytes of output)" if job.unread else ""
+            yield _line(f"[{job.number}]  {job.state():<10} {job.text}{unread}")
+
+    def foreground(self, args, stdin=None):
+        """Stream a job's buffered and new output until it finishes"""
         try:
-            open(args[0], 'a').close()
-            print(f"Created file: {args[0]}")
-        except Exception as e:
-            print(f"touch: {e}")
+            job = self.jobs.get(args[0] if args else None)
+        except LookupError as e:
+            yield _error(f"fg: {e}")
+            return 1
+        yield _line(job.text)
+        if job.stopped:
+            self._signal_job(job, signal.SIGCONT)
+        try:
+            yield from job.follow(self._cancelled)
+        finally:
+            # Ctrl-C, or a reader that went away, interrupts it like any foreground command
+            if job.running:
+                job.cancel()
+            self.jobs.remove(job)
+        if self._cancelled.is_set():
+            return 130
+        return job.status
 
-    def make_directory(self, args):
-        """Create a directory"""
-        if not args:
-            print("Usage: mkdir <dirname>")
-            return
+    def background_job(self, args, stdin=None):
+        """Continue a stopped job without waiting for it"""
         try:
-            os.makedirs(args[0], exist_ok=True)
-            print(f"Created directory: {args[0]}")
-        except Exception as e:
-            print(f"mkdir: {e}")
+            job = self.jobs.get(args[0] if args else None)
+        except LookupError as e:
+            yield _error(f"bg: {e}")
+            return 1
+        if not job.running:
+            yield _error(f"bg: job {job.number} has already finished")
+            return 1
+        if not job.stopped:
+            yield _error(f"bg: job {job.number} already in background")
+            return 0
+        self._signal_job(job, signal.SIGCONT)
+        yield _line(f"[{job.number}] {job.text} &")
 
-    def remove_file(self, args):
-        """Delete a file or directory recursively"""
-        if not args:
-            print("Usage: rm <file>")
-            return
-        target = args[0]
+    def wait_jobs(self, args, stdin=None):
+        """Wait for the given jobs (default: all running ones); status of the last"""
         try:
-            if os.path.isdir(target):
-                if len(args) > 1 and args[1] == "-r":
-                    shutil.rmtree(target)
-                    print(f"Removed directory recursively: {target}")
-                else:
-                    print(f"rm: cannot remove '{target}': Is a directory (use rm -r)")
+            jobs = [self.jobs.get(spec) for spec in args] if args else self.jobs.running()
+        except LookupError as e:
+            yield _error(f"wait: {e}")
+            return 1
+        status = 0
+        for job in jobs:
+            if not job.wait(self._cancelled):
+                return 130
+            status = job.status
+        return status
+
+    # -------- File/Directory Operations --------
+    def _file_op(self, name, usage, args, switches, minimum=1):
+        """
+        Shared argument handling of the bulk file builtins: returns
+        (FileOps, flags, paths) after glob expansion, or a message to show.
+        """
+        try:
+            options, flags, positional = parse_options(
+                split_flags(args, "".join(s[1] for s in switches if len(s) == 2)),
+                {"-j": None}, switches=set(switches) | {"--dry-run"}
+            )
+            workers = int(options["-j"]) if options["-j"] else None
+        except ValueError:
+            return usage
+        if len(positional) < minimum or any(arg.startswith("-") and arg != "-" for arg in positional):
+            return usage
+        paths, unmatched = fileops.expand(positional, self.cwd)
+        if unmatched and "-f" not in flags:
+            return "\n".join(f"{name}: {pattern}: No such file or directory" for pattern in unmatched)
+        return fileops.FileOps(workers, self.cwd), flags, paths
+
+    @staticmethod
+    def _relay(messages):
+        """Yield a fileops generator's lines; status 1 if it reported any error"""
+        while True:
+            try:
+                message = next(messages)
+            except StopIteration as stop:
+                return 1 if stop.value else 0
+            yield _error(message) if isinstance(message, fileops.Problem) else _line(message)
+
+    def touch(self, args, stdin=None):
+        """Create files or update their times"""
+        prepared = self._file_op("touch", "Usage: touch [--dry-run] <file|glob> ...", args, ())
+        if isinstance(prepared, str):
+            yield _error(prepared)
+            return 1
+        ops, flags, paths = prepared
+        return (yield from self._relay(ops.touch(paths, dry_run="--dry-run" in flags)))
+
+    def make_directory(self, args, stdin=None):
+        """Create directories (and their parents)"""
+        prepared = self._file_op("mkdir", "Usage: mkdir [-p] [--dry-run] <dirname> ...", args, ("-p",))
+        if isinstance(prepared, str):
+            yield _error(prepared)
+            return 1
+        ops, flags, paths = prepared
+        return (yield from self._relay(ops.make_dirs(paths, dry_run="--dry-run" in flags)))
+
+    def remove_file(self, args, stdin=None):
+        """Delete files, and directories recursively with -r, on a worker pool"""
+        usage = "Usage: rm [-r] [-f] [--dry-run] [-j workers] <path|glob> ..."
+        prepared = self._file_op("rm", usage, args, ("-r", "-R", "-f"))
+        if isinstance(prepared, str):
+            yield _error(prepared)
+            return 1
+        ops, flags, paths = prepared
+        messages = ops.remove(
+            paths, recursive=bool(flags & {"-r", "-R"}), force="-f" in flags, dry_run="--dry-run" in flags
+        )
+        return (yield from self._relay(messages))
+
+    def remove_directory(self, args, stdin=None):
+        """Remove empty directories"""
+        if not args:
+            yield _error("Usage: rmdir <dirname> ...")
+            return 1
+        paths, unmatched = fileops.expand(args, self.cwd)
+        status = 0
+        for pattern in unmatched:
+            yield _error(f"rmdir: {pattern}: No such file or directory")
+            status = 1
+        for path in paths:
+            try:
+                os.rmdir(path)
+                yield _line(f"Removed directory: {fileops.relative(path, self.cwd)}")
+            except Exception as e:
+                yield _error(f"rmdir: {e}")
+                status = 1
+        return status
+
+    def copy_files(self, args, stdin=None):
+        """Copy files and trees on a worker pool, in the kernel where the OS allows"""
+        usage = "Usage: cp [-r] [--dry-run] [-j workers] <source|glob> ... <dest>"
+        prepared = self._file_op("cp", usage, args, ("-r", "-R"), minimum=2)
+        if isinstance(prepared, str):
+            yield _error(prepared)
+            return 1
+        ops, flags, paths = prepared
+        messages = ops.copy(paths[:-1], paths[-1], recursive=bool(flags & {"-r", "-R"}), dry_run="--dry-run" in flags)
+        return (yield from self._relay(messages))
+
+    def move_files(self, args, stdin=None):
+        """Move or rename; across filesystems it copies, then deletes the sources"""
+        usage = "Usage: mv [--dry-run] [-j workers] <source|glob> ... <dest>"
+        prepared = self._file_op("mv", usage, args, (), minimum=2)
+        if isinstance(prepared, str):
+            yield _error(prepared)
+            return 1
+        ops, flags, paths = prepared
+        return (yield from self._relay(ops.move(paths[:-1], paths[-1], dry_run="--dry-run" in flags)))
+
+    # -------- Text Processing --------
+    @staticmethod
+    def _count_options(args, switches=()):
+        """
+        head/tail arguments, with the -20 shorthand for -n 20; returns
+        (lines, bytes or None, flags, paths)
+        """
+        expanded = []
+        for arg in args:
+            if len(arg) > 1 and arg[0] == "-" and arg[1:].isdigit():
+                expanded.extend(("-n", arg[1:]))
             else:
-                os.remove(target)
-                print(f"Removed file: {target}")
-        except Exception as e:
-            print(f"rm: {e}")
+                expanded.append(arg)
+        options, flags, paths = parse_options(expanded, {"-n": "10", "-c": None}, switches=set(switches))
+        for key in ("-n", "-c"):
+            if options[key] is not None and not options[key].isdigit():
+                raise ValueError(f"invalid count: {options[key]}")
+        size = int(options["-c"]) if options["-c"] is not None else None
+        return int(options["-n"]), size, flags, paths
+
+    def _unsupported(self, cmd, args, usage):
+        """Lines rejecting a flag the builtin lacks, when no system program took the command"""
+        flag = unsupported_flag(cmd, args)
+        if flag is None:
+            return []
+        return [_error(f"{cmd}: unsupported option '{flag}'"), _error(usage)]
 
-    def remove_directory(self, args):
-        """Remove empty directory"""
+    def cat(self, args, stdin=None):
+        """Concatenate files (memory-mapped) or pass piped input through"""
+        rejected = self._unsupported("cat", args, "Usage: cat <file> ...   or   cmd | cat")
+        if rejected:
+            yield from rejected
+            return 1
         if not args:
-            print("Usage: rmdir <dirname>")
-            return
+            if stdin is None:
+                yield _error("Usage: cat <file> ...   or   cmd | cat")
+                return 1
+            yield from stdin
+            return 0
+        status = 0
+        for path in args:
+            try:
+                with textops.mapped(self.resolve(path)) as buf:
+                    yield from textops.chunks(buf)
+            except OSError as e:
+                yield _error(f"cat: {path}: {e.strerror}")
+                status = 1
+        return status
+
+    def head(self, args, stdin=None):
+        """First lines (-n) or bytes (-c) of files or piped input; stops reading once they are out"""
+        rejected = self._unsupported("head", args, "Usage: head [-n lines | -c bytes] <file> ...   or   cmd | head")
+        if rejected:
+            yield from rejected
+            return 1
+        lines, size, _, paths = self._count_options(args)
+        if not paths:
+            if stdin is None:
+                yield _error("Usage: head [-n lines | -c bytes] <file> ...   or   cmd | head")
+                return 1
+            yield from textops.head_stream(stdin, lines, size)
+            return 0
+        status = 0
+        for i, path in enumerate(paths):
+            try:
+                with textops.mapped(self.resolve(path)) as buf:
+                    if len(paths) > 1:
+                        yield _line(f"{chr(10) if i else ''}==> {path} <==")
+                    yield from textops.chunks(buf, 0, size if size is not None else textops.head_end(buf, lines))
+            except OSError as e:
+                yield _error(f"head: {path}: {e.strerror}")
+                status = 1
+        return status
+
+    def tail(self, args, stdin=None):
+        """Last lines (-n) or bytes (-c), found from the end of the file; -f keeps following it"""
+        rejected = self._unsupported("tail", args, "Usage: tail [-n lines | -c bytes] [-f] <file> ...   or   cmd | tail")
+        if rejected:
+            yield from rejected
+            return 1
+        lines, size, flags, paths = self._count_options(args, switches=("-f",))
+        if not paths:
+            if stdin is None:
+                yield _error("Usage: tail [-n lines | -c bytes] [-f] <file> ...   or   cmd | tail")
+                return 1
+            yield textops.tail_stream(stdin, lines, size)
+            return 0
+        if "-f" in flags and len(paths) > 1:
+            yield _error("tail: -f follows a single file")
+            return 1
+        status = 0
+        for i, path in enumerate(paths):
+            full = self.resolve(path)
+            try:
+                with textops.mapped(full) as buf:
+                    if len(paths) > 1:
+                        yield _line(f"{chr(10) if i else ''}==> {path} <==")
+                    start = max(0, len(buf) - size) if size is not None else textops.tail_start(buf, lines)
+                    yield from textops.chunks(buf, start)
+                    end = len(buf)
+                if "-f" in flags:
+                    # Until Ctrl-C / cancel, which sets the event
+                    yield from textops.follow(full, end, self._cancelled)
+            except OSError as e:
+                yield _error(f"tail: {path}: {e.strerror}")
+                status = 1
+        return status
+
+    def word_count(self, args, stdin=None):
+        """Line, word and byte counts, counted in bulk over mapped files"""
+        rejected = self._unsupported("wc", args, "Usage: wc [-l] [-w] [-c] <file> ...   or   cmd | wc")
+        if rejected:
+            yield from rejected
+            return 1
+        _, flags, paths = parse_options(split_flags(args, "lwc"), {}, switches={"-l", "-w", "-c"})
+        if not paths and stdin is None:
+            yield _error("Usage: wc [-l] [-w] [-c] <file> ...   or   cmd | wc")
+            return 1
+        wanted = [key for key in ("-l", "-w", "-c") if key in flags] or ["-l", "-w", "-c"]
+        lines, words = "-l" in wanted, "-w" in wanted
+        rows = []
+        status = 0
+        if not paths:
+            rows.append((textops.count_stream(stdin, lines, words), ""))
+        for path in paths:
+            full = self.resolve(path)
+            try:
+                if not lines and not words and os.path.isfile(full):
+                    counts = textops.Counts()
+                    counts.bytes = os.path.getsize(full)  # -c alone needs no reading
+                else:
+                    with textops.mapped(full) as buf:
+                        counts = textops.count_buffer(buf, lines, words)
+            except OSError as e:
+                yield _error(f"wc: {path}: {e.strerror}")
+                status = 1
+                continue
+            rows.append((counts, path))
+        if len(rows) > 1:
+            total = textops.Counts()
+            for counts, _ in rows:
+                total.add(counts)
+            rows.append((total, "total"))
+
+        fields = {"-l": "lines", "-w": "words", "-c": "bytes"}
+        width = max([len(str(getattr(c, fields[key]))) for c, _ in rows for key in wanted] + [1])
+        for counts, name in rows:
+            numbers = " ".join(f"{getattr(counts, fields[key]):>{width}}" for key in wanted)
+            yield _line(f"{numbers} {name}".rstrip())
+        return status
+
+    def grep(self, args, stdin=None):
+        """Search files (memory-mapped) or piped input with a precompiled regex; -j splits files over processes"""
+        usage = "Usage: grep [-i] [-v] [-c] [-n] [-l] [-F] [-j workers] <pattern> [file ...]"
+        rejected = self._unsupported("grep", args, usage)
+        if rejected:
+            yield from rejected
+            return 2
+        switches = {"-i", "-v", "-c", "-n", "-l", "-F"}
+        options, flags, positional = parse_options(split_flags(args, "ivcnlF"), {"-j": None}, switches=switches)
+        if not positional or len(positional) == 1 and stdin is None:
+            yield _error(usage)
+            return 2
+        pattern, paths = positional[0], positional[1:]
         try:
-            os.rmdir(args[0])
-            print(f"Removed directory: {args[0]}")
-        except Exception as e:
-            print(f"rmdir: {e}")
+            search = textops.Grep(pattern, "-i" in flags, "-F" in flags, "-v" in flags, "-n" in flags)
+        except re.error as e:
+            yield _error(f"grep: bad pattern: {e}")
+            return 2
+        mode = "files" if "-l" in flags else "count" if "-c" in flags else "lines"
+
+        if not paths:
+            selected = yield from textops.grep_stream(search, stdin, mode, b"(standard input)")
+            return 0 if selected else 1
+
+        files = []
+        for path in paths:
+            name = os.fsencode(path)
+            files.append((self.resolve(path), name, name + b":" if len(paths) > 1 else b""))
+        workers = int(options["-j"]) if options["-j"] else os.cpu_count() or 1
+        selected = failed = False
+        if len(files) > 1 and workers > 1 and self._total_size(files) >= textops.PARALLEL_MIN_BYTES:
+            results = textops.grep_files(search, files, mode, min(workers, len(files)))
+            for path, (output, found, error) in zip(paths, results):
+                if error:
+                    yield _error(f"grep: {path}: {error}")
+                    failed = True
+                elif output:
+                    yield output
+                selected |= found
+        else:
+            for path, (full, name, prefix) in zip(paths, files):
+                try:
+                    with textops.mapped(full) as buf:
+                        selected |= yield from textops.grep_buffer(search, buf, mode, name, prefix)
+                except OSError as e:
+                    yield _error(f"grep: {path}: {e.strerror}")
+                    failed = True
+        return 2 if failed else 0 if selected else 1
+
+    @staticmethod
+    def _total_size(files):
+        total = 0
+        for full, _, _ in files:
+            try:
+                total += os.path.getsize(full)
+            except OSError:
+                pass
+        return total
+
+    # -------- Record Pipelines --------
+    def where(self, args, stdin=None):
+        """Keep the records matching a condition: ps | where cpu gt 5"""
+        return records.where(args, stdin)
+
+    def select(self, args, stdin=None):
+        """Print only the named fields: ps | select pid name rss"""
+        return records.select(args, stdin)
+
+    def count_records(self, args, stdin=None):
+        """Number of records: find . -name '*.py' | count"""
+        return records.count(args, stdin)
+
+    def sort_records(self, args, stdin=None):
+        """`sort` fed records: by fields, -r for descending"""
+        return records.sort(args, stdin)
+
+    def head_records(self, args, stdin=None):
+        """`head` fed records: the first N of them"""
+        return records.head(args, stdin)
 
     # -------- Finding Files --------
-    def find_files(self, args):
-        """Find files/directories by name"""
-        if not args:
-            print("Usage: find <name>")
-            return
-        target = args[0].lower()
-        for root, dirs, files in os.walk("."):
-            for name in files + dirs:
-                if target in name.lower():
-                    print(os.path.join(root, name))
+    def find_files(self, args, stdin=None, as_records=False):
+        """Find files/directories by name (parallel scan, optional filename index); records for where/sort/select"""
+        usage = "Usage: find [path] [name] [-name GLOB] [-iname GLOB] [-regex RE] [-type f|d] [-I] [--json | --csv]"
+        if as_records:
+            format, args = records.parse_format(args)
+        try:
+            options, flags, positional = parse_options(
+                args, {"-name": None, "-iname": None, "-regex": None, "-type": None}, switches={"-I"}
+            )
+        except ValueError:
+            yield _error(usage)
+            return 1
+
+        # With any predicate, a lone positional is the start directory (`find src -type f`)
+        filtered = any(options[o] for o in ("-name", "-iname", "-regex", "-type"))
+        if not positional and not filtered or len(positional) > 2 or options["-type"] not in (None, "f", "d"):
+            yield _error(usage)
+            return 1
+        # `find foo` keeps its original meaning: substring match under "."
+        if len(positional) == 2 or filtered:
+            root, name = positional[0] if positional else ".", positional[1:] and positional[1]
+        else:
+            root, name = ".", positional[0]
+        if not os.path.isdir(self.resolve(root)):
+            yield _error(f"find: '{root}': No such directory")
+            return 1
+
+        try:
+            matcher = finder.FileFinder.build_matcher(
+                name=name or None, glob=options["-name"], iglob=options["-iname"], regex=options["-regex"]
+            )
+        except re.error as e:
+            yield _error(f"find: bad regex: {e}")
+            return 1
+        search = self.finder.search(root, matcher, ftype=options["-type"], use_index="-I" in flags, cwd=self.cwd)
+        if as_records:
+            found = ((path, records.FileRef(os.path.join(self.cwd, path))) for path in search)
+            return (yield from records.files(found, ["path"], format or "text"))
+        for path in search:
+            yield _line(path)
 
     # -------- Archiving --------
-    def zip_files(self, args):
-        """Create a zip archive"""
-        if len(args) < 2:
-            print("Usage: zip <archive.zip> <file1> <file2> ...")
-            return
-        archive_name = args[0]
+    def zip_files(self, args, stdin=None):
+        """Create a zip archive, compressing members in parallel"""
+        usage = "Usage: zip [-r] [-m deflate|lzma|bzip2|store] [-0..-9] [-j workers] <archive.zip> <path> ..."
+        level = None
+        rest = []
+        for arg in args:
+            if len(arg) == 2 and arg[0] == "-" and arg[1].isdigit():
+                level = int(arg[1])
+            else:
+                rest.append(arg)
+        options, flags, positional = parse_options(rest, {"-m": "deflate", "-j": None}, switches={"-r"})
+        if len(positional) < 2 or options["-m"] not in archiver.METHODS:
+            yield _error(usage)
+            return 1
+
+        members, skipped = archiver.ZipArchiver.collect(positional[1:], "-r" in flags, base=self.cwd)
+        for path in skipped:
+            yield _error(f"zip: skipping directory {path} (use -r)")
+        if not members:
+            yield _error("zip: nothing to do")
+            return 1
+        zipper = archiver.ZipArchiver(workers=int(options["-j"]) if options["-j"] else None)
         try:
-            with zipfile.ZipFile(archive_name, 'w') as zipf:
-                for f in args[1:]:
-                    zipf.write(f)
-            print(f"Created archive: {archive_name}")
+            messages = zipper.create(positional[0], members, archiver.METHODS[options["-m"]], level, base=self.cwd)
+            for message in messages:
+                yield _line(message)
         except Exception as e:
-            print(f"zip: {e}")
+            yield _error(f"zip: {e}")
+            return 1
 
-    def unzip_file(self, args):
-        """Extract zip archive"""
-        if not args:
-            print("Usage: unzip <archive.zip>")
-            return
+    def unzip_file(self, args, stdin=None):
+        """Extract zip archive, members in parallel"""
+        options, _, positional = parse_options(args, {"-d": ".", "-j": None})
+        if len(positional) != 1:
+            yield _error("Usage: unzip [-d dir] [-j workers] <archive.zip>")
+            return 1
+        zipper = archiver.ZipArchiver(workers=int(options["-j"]) if options["-j"] else None)
         try:
-            with zipfile.ZipFile(args[0], 'r') as zipf:
-                zipf.extractall()
-            print(f"Extracted: {args[0]}")
+            for message in zipper.extract(positional[0], options["-d"], base=self.cwd):
+                yield _line(message)
         except Exception as e:
-            print(f"unzip: {e}")
+            yield _error(f"unzip: {e}")
+            return 1
+
+    # -------- History --------
+    def show_history(self, args, stdin=None):
+        """Recent commands with time, duration and status, or a fuzzy search"""
+        try:
+            options, _, positional = parse_options(args, {"-n": "20"})
+            count = int(options["-n"])
+        except ValueError:
+            positional, count = ["?"], 0
+        if positional[:1] == ["search"] and len(positional) > 1:
+            for command in self.history.search(" ".join(positional[1:]), count):
+                yield _line(command)
+            return
+        if positional or count < 1:
+            yield _error("Usage: history [-n count] | history search [-n count] <text>")
+            return 1
+        for number, entry in enumerate(self.history.recent(count), 1):
+            yield _line(history.format_entry(number, entry))
+
+    # -------- Profiling --------
+    def time_usage(self, args, stdin=None):
+        """`time <command>` is handled in _execute_pipeline; alone it only explains itself"""
+        yield _error("Usage: time [-v] <command> [| command ...]")
+        return 1
+
+    def profile_mode(self, args, stdin=None):
+        """Turn the per-pipeline profile log on or off"""
+        if args[:1] == ["on"] and len(args) <= 2:
+            self.profile_log = profiler.ProfileLog(self.resolve(args[1]) if len(args) > 1 else None)
+            yield _line(f"profile: logging to {self.profile_log.path}")
+        elif args == ["off"]:
+            self.profile_log = None
+            yield _line("profile: off")
+        elif args in ([], ["status"]):
+            state = f"logging to {self.profile_log.path}" if self.profile_log is not None else "off"
+            yield _line(f"profile: {state}")
+        else:
+            yield _error("Usage: profile on [file] | off | status")
+            return 1
+
+    def profile_stats(self, args, stdin=None):
+        """Wall-time percentiles per program from the profile log"""
+        try:
+            options, _, positional = parse_options(args, {"-f": None})
+        except ValueError:
+            positional = [None, None]
+        if len(positional) > 1:
+            yield _error("Usage: stats [-f file] [program]")
+            return 1
+        path = self.resolve(options["-f"]) if options["-f"] else None
+        if path is None and self.profile_log is not None:
+            path = self.profile_log.path
+        try:
+            rows = profiler.summarize(profiler.ProfileLog(path).read(), positional[0] if positional else None)
+        except OSError as e:
+            yield _error(f"stats: {e}")
+            return 1
+        if not rows:
+            yield _line("stats: no profiled commands yet (profile on, or time <command>)")
+            return 1
+
+        def ms(value):
+            return f"{value * 1000:.1f}" if value is not None else "-"
+
+        yield _line(f"{'PROGRAM':<16} {'RUNS':>6} {'P50 ms':>9} {'P90 ms':>9} {'P99 ms':>9} {'MAX ms':>9} "
+                    f"{'SPAWN ms':>9} {'PEAK RSS MB':>12}")
+        for name, runs, p50, p90, p99, worst, spawn, rss in rows:
+            peak = f"{rss / (1024 ** 2):.1f}" if rss else "-"
+            yield _line(f"{name[:16]:<16} {runs:>6} {ms(p50):>9} {ms(p90):>9} {ms(p99):>9} {ms(worst):>9} "
+                        f"{ms(spawn):>9} {peak:>12}")
 
     # -------- Enhancements --------
-    def clear_screen(self, args):
+    def clear_screen(self, args, stdin=None):
         """Clear terminal screen"""
         os.system("cls" if os.name == "nt" else "clear")
 
-    def help_menu(self, args):
+    def startup_report(self, args, stdin=None):
+        """Time fresh shell startups and list the slowest imports"""
+        try:
+            options, _, positional = parse_options(args, {"-n": "5", "-b": str(startup.STARTUP_BUDGET_MS)})
+            runs = int(options["-n"])
+            budget = float(options["-b"])
+        except ValueError:
+            positional = True
+        if positional or runs < 1:
+            yield _error("Usage: startup [-n runs] [-b budget_ms]")
+            return 1
+        for text in startup.report(runs, budget):
+            yield _line(text)
+            if text.startswith("FAIL"):
+                return 1
+
+    def help_menu(self, args, stdin=None):
         """Display all commands with one-line description"""
-        print(Fore.YELLOW + "Available Commands:\n" + Style.RESET_ALL)
+        yield _line(colorama.Fore.YELLOW + "Available Commands:\n" + colorama.Style.RESET_ALL)
         for cmd, desc in sorted(self.command_help.items()):
-            print(f"{Fore.CYAN}{cmd:<10}{Style.RESET_ALL} - {desc}")
+            yield _line(f"{colorama.Fore.CYAN}{cmd:<10}{colorama.Style.RESET_ALL} - {desc}")
 
     # -------- Enhanced List Directory --------
-    def list_directory(self, args):
-        """Colored ls output"""
-        try:
-            path = args[0] if args else os.getcwd()
-            entries = os.listdir(path)
+    def list_directory(self, args, stdin=None, piped=False, as_records=False):
+        """Colored ls output, in columns unless piped or -1/-l; records for where/sort/select"""
+        if as_records:
+            format, args = records.parse_format(args)
+        flags = set()
+        paths = []
+        for arg in args:
+            if arg.startswith("-") and len(arg) > 1:
+                flags.update(arg[1:])
+            else:
+                paths.append(arg)
+        unknown = flags - set("laStrR1")
+        if unknown:
+            yield _error(colorama.Fore.RED + f"ls: invalid option -- '{''.join(sorted(unknown))}'" + colorama.Style.RESET_ALL)
+            return 1
+
+        options = {
+            "show_all": "a" in flags,
+            "long": "l" in flags,
+            "sort_key": "size" if "S" in flags else "time" if "t" in flags else None,
+            "reverse": "r" in flags,
+            "columns": not piped and "1" not in flags,
+            "color": not piped and self.color,
+        }
+        paths = paths or ["."]
+        if as_records:
+            name = "name" if paths == ["."] and "R" not in flags else "path"
+            columns = ["mode", "size", "modified", name] if "l" in flags else [name]
+            return (yield from records.files(self._ls_entries(paths, options, "R" in flags), columns, format or "text"))
+        status = 0
+        for path in paths:
+            full = self.resolve(path)
+            try:
+                if not os.path.isdir(full):
+                    os.lstat(full)  # raise for a missing path
+                    yield _line(path)
+                    continue
+                dirs = self.lister.walk(full, options["show_all"]) if "R" in flags else [full]
+                for directory in dirs:
+                    # One buffered write per directory listing, headed by the path as typed
+                    header = f"{path}{directory[len(full):]}:\n" if "R" in flags or len(paths) > 1 else ""
+                    yield (header + self.lister.listing(directory, **options)).encode()
+            except Exception as e:
+                yield _error(colorama.Fore.RED + f"ls: {e}" + colorama.Style.RESET_ALL)
+                status = 1
+        return status
+
+    def _ls_entries(self, paths, options, recursive=False):
+        """
+        (path as shown, DirEntry) pairs for ls records, in ls order per
+        directory (-S, -t, -r; -R descends into subdirectories); bytes for errors
+        """
+        for path in paths:
+            full = self.resolve(path)
+            try:
+                if not os.path.isdir(full):
+                    os.lstat(full)  # raise for a missing path
+                    yield path, records.FileRef(full)
+                    continue
+                with os.scandir(full) as it:
+                    entries = sorted(
+                        (e for e in it if options["show_all"] or not e.name.startswith(".")), key=lambda e: e.name
+                    )
+                if options["sort_key"]:
+                    field = "st_size" if options["sort_key"] == "size" else "st_mtime"
+                    entries.sort(key=lambda e: getattr(e.stat(follow_symlinks=False), field), reverse=True)
+            except OSError as e:
+                yield path, _error(f"ls: {e}")
+                continue
+            if options["reverse"]:
+                entries.reverse()
             for entry in entries:
-                full_path = os.path.join(path, entry)
-                if os.path.isdir(full_path):
-                    print(Fore.BLUE + entry + Style.RESET_ALL)
-                else:
-                    print(entry)
-        except Exception as e:
-            print(Fore.RED + f"ls: {e}" + Style.RESET_ALL)
+                shown = entry.name if path == "." else os.path.join(path, entry.name)
+                yield shown, entry
+                if recursive and entry.is_dir(follow_symlinks=False):
+                    yield from self._ls_entries([shown], options, recursive)
 
     # -------- Error Example Update --------
-    def change_directory(self, args):
-        try:
-            if args:
-                os.chdir(args[0])
-            else:
-                os.chdir(os.path.expanduser("~"))
-        except Exception as e:
-            print(Fore.RED + f"cd: {e}" + Style.RESET_ALL)
\ No newline at end of file
+    def change_directory(self, args, stdin=None):
+        """Change this session's directory; `cd -` returns to the previous one"""
+        if len(args) > 1:
+            yield _error("Usage: cd [dir | -]")
+            return 1
+        if args == ["-"]:
+            target = self.env.get("OLDPWD", self.cwd)
+        else:
+            target = os.path.normpath(self.resolve(args[0] if args else "~"))
+        shown = args[0] if args else target
+        if not os.path.isdir(target):
+            reason = "Not a directory" if os.path.exists(target) else "No such file or directory"
+            yield _error(colorama.Fore.RED + f"cd: {shown}: {reason}" + colorama.Style.RESET_ALL)
+            return 1
+        if not os.access(target, os.X_OK):
+            yield _error(colorama.Fore.RED + f"cd: {shown}: Permission denied" + colorama.Style.RESET_ALL)
+            return 1
+        self.env["OLDPWD"], self.env["PWD"] = self.cwd, target
+        self.cwd = target
+        if args == ["-"]:
+            yield _line(target)
+
+    def export_variables(self, args, stdin=None):
+        """Set variables in the session environment; no arguments lists it"""
+        if not args:
+            yield from self.show_environment([])
+            return
+        for arg in args:
+            name, sep, value = arg.partition("=")
+            if not name.isidentifier():
+                yield _error(f"export: '{arg}': not a valid identifier")
+                return 1
+            if sep:
+                self.env[name] = value
+
+    def unset_variables(self, args, stdin=None):
+        for name in args:
+            self.env.pop(name, None)
+
+    def show_environment(self, args, stdin=None):
+        """The session environment, with any NAME=value arguments applied; commands go to the system env"""
+        if not all(_assignment(arg) for arg in args):
+            yield _error("Usage: env [NAME=value ...]   (env NAME=value cmd needs the system env)")
+            return 1
+        env = dict(self.env, **dict(arg.split("=", 1) for arg in args))
+        for name in sorted(env):
+            yield _line(f"{name}={env[name]}")
@@ -0,0 +1,474 @@
+import os
+import sys
+import glob
+import stat
+import time
+import errno
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+# Bytes handed to the kernel per copy_file_range/sendfile call
+COPY_CHUNK = 64 * 1024 * 1024
+
+# Buffer for the read/write fallback copy
+COPY_BUFFER = 1024 * 1024
+
+# Files unlinked per pool task; one unlink is too small a job to schedule alone
+UNLINK_BATCH = 256
+
+# Per-target result lines shown before the rest are summarised
+LIST_LIMIT = 20
+
+# errno values meaning "this kernel copy can't handle these files", so a slower copy is tried
+UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EBADF, errno.EOPNOTSUPP, getattr(errno, "ENOTSUP", 0)}
+
+
+def _mb(n):
+    return n / (1024 ** 2)
+
+
+def expand(patterns, cwd=None):
+    """
+    Expand glob patterns the way a shell would, relative to cwd (default:
+    the process's); returns (absolute paths, patterns that matched nothing)
+    """
+    cwd = cwd or os.getcwd()
+    paths = []
+    unmatched = []
+    for pattern in patterns:
+        pattern = os.path.expanduser(pattern)
+        if not any(c in pattern for c in "*?["):
+            paths.append(os.path.join(cwd, pattern))
+            continue
+        matches = sorted(glob.glob(os.path.join(glob.escape(cwd), pattern)))
+        if matches:
+            paths.extend(matches)
+        else:
+            unmatched.append(pattern)
+    return paths, unmatched
+
+
+def relative(path, cwd):
+    """path as the user would type it in cwd: relative inside it, absolute elsewhere"""
+    prefix = cwd.rstrip(os.sep) + os.sep
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+# -------- Copying file data --------
+def _kernel_copy(call, infd, outfd, progress):
+    """Repeat a kernel copy call to EOF; False if it can't copy these files (nothing copied yet)"""
+    copied = 0
+    while True:
+        try:
+            n = call(infd, outfd, COPY_CHUNK)
+        except OSError as e:
+            if copied == 0 and e.errno in UNSUPPORTED:
+                return False
+            raise
+        if n == 0:
+            # Some filesystems (procfs, ...) report EOF at once for files with data
+            return copied > 0 or os.fstat(infd).st_size == 0
+        copied += n
+        progress(n)
+
+
+KERNEL_COPIES = []
+if hasattr(os, "copy_file_range"):
+    # Linux 4.5+: no copy through user space; a reflink on btrfs/XFS, server-side on NFS 4.2
+    KERNEL_COPIES.append(lambda infd, outfd, count: os.copy_file_range(infd, outfd, count))
+if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+    # file-to-file sendfile works on Linux only (macOS needs a socket)
+    KERNEL_COPIES.append(lambda infd, outfd, count: os.sendfile(outfd, infd, None, count))
+
+
+def copy_data(src, dst, progress=lambda n: None):
+    """Copy src's contents to dst in the kernel where possible; progress(n) gets each copied amount"""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        for call in KERNEL_COPIES:
+            if _kernel_copy(call, fsrc.fileno(), fdst.fileno(), progress):
+                return
+        while True:
+            chunk = fsrc.read(COPY_BUFFER)
+            if not chunk:
+                return
+            fdst.write(chunk)
+            progress(len(chunk))
+
+
+class Problem(str):
+    """A message about something that failed, which the shell shows on stderr"""
+
+
+class Tally:
+    """Thread-safe file/byte counters behind the progress and summary lines"""
+
+    def __init__(self, files=0, nbytes=0):
+        self.total_files = files
+        self.total_bytes = nbytes
+        self.files = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, files=0, nbytes=0):
+        with self._lock:
+            self.files += files
+            self.bytes += nbytes
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def progress(self, name):
+        elapsed = self.elapsed()
+        rate = f", {_mb(self.bytes) / elapsed:.1f} MB/s" if self.total_bytes and elapsed else ""
+        size = f", {_mb(self.bytes):.1f}/{_mb(self.total_bytes):.1f} MB" if self.total_bytes else ""
+        return f"{name}: {self.files}/{self.total_files} files{size}{rate}"
+
+
+class FileOps:
+    """
+    Bulk rm/cp/mv/mkdir/touch over many paths. The syscalls run on a
+    thread pool (they release the GIL, and on SSDs and network mounts
+    many in flight finish far sooner than one at a time). Each operation
+    is a generator of output lines, with a progress line every
+    PROGRESS_INTERVAL; its return value is the number of errors.
+    """
+
+    def __init__(self, workers=None, cwd=None):
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        # Paths arrive absolute; messages show them relative to the session's cwd
+        self.cwd = cwd or os.getcwd()
+
+    def _show(self, path):
+        return relative(path, self.cwd)
+
+    def _run(self, name, tasks, tally, errors):
+        """Run tasks on the pool, yielding progress lines; exceptions are collected in errors"""
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            pending = {pool.submit(task) for task in tasks}
+            last_report = time.monotonic()
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                errors.extend(f.exception() for f in done if f.exception() is not None)
+                now = time.monotonic()
+                if pending and now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    yield tally.progress(name)
+        finally:
+            # Closing the generator (Ctrl-C) drops queued work; running tasks finish
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _listed(lines, name):
+        """The first LIST_LIMIT lines, then a count of the rest"""
+        yield from lines[:LIST_LIMIT]
+        if len(lines) > LIST_LIMIT:
+            yield f"{name}: ... and {len(lines) - LIST_LIMIT} more"
+
+    def _errors(self, errors, name):
+        for e in errors[:LIST_LIMIT]:
+            if isinstance(e, OSError) and e.filename is not None:
+                yield Problem(f"{name}: '{self._show(e.filename)}': {e.strerror}")
+            else:
+                yield Problem(f"{name}: {e}")
+        if len(errors) > LIST_LIMIT:
+            yield Problem(f"{name}: ... and {len(errors) - LIST_LIMIT} more errors")
+
+    @staticmethod
+    def scan(top):
+        """(files, dirs) under top: files as (path, size) with symlinks as files, dirs deepest first"""
+        files = []
+        dirs = []
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            dirs.append(directory)
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        files.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+        # Parents are appended before their children, so reversed is children first
+        dirs.reverse()
+        return files, dirs
+
+    # -------- rm --------
+    def remove(self, paths, recursive=False, force=False, dry_run=False):
+        errors = []
+        refused = 0
+        files = []
+        dirs = []
+        targets = []
+        for path in paths:
+            try:
+                is_dir = stat.S_ISDIR(os.lstat(path).st_mode)
+            except OSError as e:
+                if not (force and isinstance(e, FileNotFoundError)):
+                    errors.append(e)
+                continue
+            if not is_dir:
+                files.append((path, os.lstat(path).st_size))
+            elif not recursive:
+                yield Problem(f"rm: cannot remove '{self._show(path)}': Is a directory (use rm -r)")
+                refused += 1
+                continue
+            else:
+                try:
+                    tree_files, tree_dirs = self.scan(path)
+                except OSError as e:
+                    errors.append(e)
+                    continue
+                files.extend(tree_files)
+                dirs.extend(tree_dirs)
+            targets.append((path, is_dir))
+
+        size = sum(n for _, n in files)
+        if dry_run:
+            yield from self._listed(
+                [f"would remove {'directory' if d else 'file'}: {self._show(p)}" for p, d in targets], "rm"
+            )
+            yield f"rm: would remove {len(files)} files and {len(dirs)} directories ({_mb(size):.1f} MB)"
+            yield from self._errors(errors, "rm")
+            return refused + len(errors)
+
+        tally = Tally(len(files), size)
+
+        def unlink(batch):
+            # One failure (EACCES, or another remover got there first) mustn't skip the rest
+            for path, n in batch:
+                try:
+                    os.unlink(path)
+                except OSError as e:
+                    if not (force and isinstance(e, FileNotFoundError)):
+                        errors.append(e)
+                    continue
+                tally.add(1, n)
+
+        batches = [files[i:i + UNLINK_BATCH] for i in range(0, len(files), UNLINK_BATCH)]
+        yield from self._run("rm", [lambda b=b: unlink(b) for b in batches], tally, errors)
+        removed_dirs = 0
+        for directory in dirs:
+            try:
+                os.rmdir(directory)
+                removed_dirs += 1
+            except OSError as e:
+                # Including those a failed unlink left non-empty: they are still there
+                errors.append(e)
+
+        removed = [p for p, _ in targets if not os.path.lexists(p)]
+        yield from self._listed(
+            [f"Removed {'directory recursively' if d else 'file'}: {self._show(p)}"
+             for p, d in targets if p in removed], "rm"
+        )
+        yield from self._errors(errors, "rm")
+        if len(paths) > 1 or dirs:
+            yield (f"rm: removed {tally.files} files, {removed_dirs} directories "
+                   f"({_mb(tally.bytes):.1f} MB) in {tally.elapsed():.2f}s")
+        return refused + len(errors)
+
+    # -------- cp / mv --------
+    def _destinations(self, sources, dest, name):
+        """(source, target) pairs for cp/mv semantics: into dest when it is a directory"""
+        into = os.path.isdir(dest)
+        if len(sources) > 1 and not into:
+            raise ValueError(f"{name}: target '{self._show(dest)}' is not a directory")
+        return [(src, os.path.join(dest, os.path.basename(src.rstrip("/" + os.sep))) if into else dest)
+                for src in sources]
+
+    def _plan_copy(self, pairs, recursive, name):
+        """Expand (source, target) pairs into dirs to create, files and symlinks to copy, and problems"""
+        dirs, files, links, problems = [], [], [], []
+        for src, target in pairs:
+            if os.path.exists(target) and os.path.exists(src) and os.path.samefile(src, target):
+                problems.append(Problem(f"{name}: '{self._show(src)}' and '{self._show(target)}' are the same file"))
+            elif os.path.isdir(src):
+                if not recursive:
+                    problems.append(Problem(f"{name}: -r not specified; omitting directory '{self._show(src)}'"))
+                    continue
+                real_src = os.path.realpath(src)
+                if (os.path.realpath(target) + os.sep).startswith(real_src + os.sep):
+                    problems.append(Problem(
+                        f"{name}: cannot copy a directory, '{self._show(src)}', into itself, '{self._show(target)}'"
+                    ))
+                    continue
+                dirs.append(target)
+                for root, subdirs, names in os.walk(src):
+                    relative = os.path.relpath(root, src)
+                    out = os.path.normpath(os.path.join(target, relative))
+                    for d in subdirs:
+                        path = os.path.join(root, d)
+                        if os.path.islink(path):
+                            links.append((path, os.path.join(out, d)))
+                        else:
+                            dirs.append(os.path.join(out, d))
+                    for f in names:
+                        path = os.path.join(root, f)
+                        if os.path.islink(path):
+                            links.append((path, os.path.join(out, f)))
+                        else:
+                            files.append((path, os.path.join(out, f), os.lstat(path).st_size))
+            elif os.path.exists(src):
+                files.append((src, target, os.path.getsize(src)))
+            else:
+                problems.append(Problem(f"{name}: cannot stat '{self._show(src)}': No such file or directory"))
+        return dirs, files, links, problems
+
+    def _copy(self, name, dirs, files, links, errors):
+        """Create dirs, then copy files and symlinks on the pool; yields progress"""
+        tally = Tally(len(files), sum(size for _, _, size in files))
+        for directory in dirs:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                errors.append(e)
+
+        def copy_file(src, dst):
+            copy_data(src, dst, lambda n: tally.add(0, n))
+            os.chmod(dst, stat.S_IMODE(os.stat(src).st_mode))
+            tally.add(1)
+
+        def copy_link(src, dst):
+            if os.path.lexists(dst):
+                os.unlink(dst)
+            os.symlink(os.readlink(src), dst)
+
+        tasks = [lambda s=s, d=d: copy_file(s, d) for s, d, _ in files]
+        tasks += [lambda s=s, d=d: copy_link(s, d) for s, d in links]
+        yield from self._run(name, tasks, tally, errors)
+        return tally
+
+    def copy(self, sources, dest, recursive=False, dry_run=False):
+        try:
+            pairs = self._destinations(sources, dest, "cp")
+        except ValueError as e:
+            yield Problem(e)
+            return 1
+        dirs, files, links, problems = self._plan_copy(pairs, recursive, "cp")
+        yield from problems
+        size = sum(n for _, _, n in files)
+        if dry_run:
+            yield from self._listed(
+                [f"would copy: {self._show(src)} -> {self._show(target)}" for src, target in pairs], "cp"
+            )
+            yield (f"cp: would copy {len(files)} files, {len(links)} symlinks, "
+                   f"{len(dirs)} directories ({_mb(size):.1f} MB)")
+            return len(problems)
+
+        if not files and not dirs and not links:
+            return len(problems)
+        errors = []
+        tally = yield from self._copy("cp", dirs, files, links, errors)
+        failed = {e.filename for e in errors if isinstance(e, OSError)}
+        yield from self._listed([f"Copied: {self._show(src)} -> {self._show(target)}" for src, target in pairs
+                                 if src not in failed and os.path.lexists(target)], "cp")
+        yield from self._errors(errors, "cp")
+        if len(files) > 1 or dirs:
+            elapsed = tally.elapsed()
+            yield (f"cp: copied {tally.files} files ({_mb(tally.bytes):.1f} MB) in {elapsed:.2f}s"
+                   f"{f', {_mb(tally.bytes) / elapsed:.1f} MB/s' if elapsed else ''}")
+        return len(problems) + len(errors)
+
+    def move(self, sources, dest, dry_run=False):
+        try:
+            pairs = self._destinations(sources, dest, "mv")
+        except ValueError as e:
+            yield Problem(e)
+            return 1
+        problems = 0
+        movable = []
+        for src, target in pairs:
+            if not os.path.lexists(src):
+                yield Problem(f"mv: cannot stat '{self._show(src)}': No such file or directory")
+                problems += 1
+            elif os.path.isdir(src) and (os.path.realpath(target) + os.sep).startswith(os.path.realpath(src) + os.sep):
+                yield Problem(f"mv: cannot move '{self._show(src)}' to a subdirectory of itself, '{self._show(target)}'")
+                problems += 1
+            else:
+                movable.append((src, target))
+        pairs = movable
+        if dry_run:
+            yield from self._listed(
+                [f"would move: {self._show(src)} -> {self._show(target)}" for src, target in pairs], "mv"
+            )
+            return problems
+
+        # Renames first (metadata only); pairs on different filesystems fall back to copy + delete
+        errors = []
+        crossing = []
+        lock = threading.Lock()
+
+        def rename(src, target):
+            try:
+                os.replace(src, target)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                with lock:
+                    crossing.append((src, target))
+
+        tally = Tally(len(pairs))
+        yield from self._run("mv", [lambda s=s, t=t: rename(s, t) for s, t in pairs], tally, errors)
+        if crossing:
+            dirs, files, links, copy_problems = self._plan_copy(crossing, True, "mv")
+            yield from copy_problems
+            copy_errors = []
+            yield from self._copy("mv", dirs, files, links, copy_errors)
+            errors.extend(copy_errors)
+            problems += len(copy_problems)
+            if not copy_problems and not copy_errors:
+                # Sources go only once every copy landed; rm's own lines stay quiet
+                removal = self.remove([src for src, _ in crossing], recursive=True, force=True)
+                try:
+                    while True:
+                        next(removal)
+                except StopIteration as stop:
+                    problems += stop.value
+        moved = [f"Moved: {self._show(src)} -> {self._show(target)}" for src, target in pairs
+                 if not os.path.lexists(src) and os.path.lexists(target)]
+        yield from self._listed(moved, "mv")
+        yield from self._errors(errors, "mv")
+        return problems + len(errors)
+
+    # -------- mkdir / touch --------
+    def make_dirs(self, paths, dry_run=False):
+        if dry_run:
+            yield from self._listed(
+                [f"would create directory: {self._show(p)}" for p in paths if not os.path.isdir(p)], "mkdir"
+            )
+            return 0
+        errors = []
+        yield from self._run("mkdir", [lambda p=p: os.makedirs(p, exist_ok=True) for p in paths],
+                             Tally(len(paths)), errors)
+        yield from self._listed([f"Created directory: {self._show(p)}" for p in paths if os.path.isdir(p)], "mkdir")
+        yield from self._errors(errors, "mkdir")
+        return len(errors)
+
+    def touch(self, paths, dry_run=False):
+        """Create missing files and set the times of existing ones to now"""
+        existing = {p for p in paths if os.path.exists(p)}
+        if dry_run:
+            yield from self._listed(
+                [f"would {'update' if p in existing else 'create'} file: {self._show(p)}" for p in paths], "touch"
+            )
+            return 0
+
+        def touch(path):
+            if path in existing:
+                os.utime(path)
+            else:
+                open(path, "a").close()
+
+        errors = []
+        yield from self._run("touch", [lambda p=p: touch(p) for p in paths], Tally(len(paths)), errors)
+        failed = {e.filename for e in errors if isinstance(e, OSError)}
+        yield from self._listed(
+            [f"{'Updated' if p in existing else 'Created'} file: {self._show(p)}"
+             for p in paths if p not in failed], "touch"
+        )
+        yield from self._errors(errors, "touch")
+        return len(errors)
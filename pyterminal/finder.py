@@ -0,0 +1,170 @@
+import os
+import re
+import pickle
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class FileFinder:
+    """
+    Concurrent filename search. Directories are scanned in parallel with
+    os.scandir and matches are yielded as soon as their directory is read.
+
+    With use_index=True the search runs against an on-disk filename index
+    (like `locate`). Each directory's listing is reused while its mtime is
+    unchanged, so a repeat query costs one stat() per directory instead of
+    a full listing, and only directories that changed are rescanned.
+    """
+
+    def __init__(self, index_path=None, workers=None):
+        self.index_path = index_path or os.path.expanduser("~/.pyterminal_index")
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self._index = None  # abs dir -> (mtime_ns, [(name, is_dir), ...])
+        self._dirty = False
+        # One finder serves every session of `serve` and every job: index
+        # updates, pruning and saving happen under this lock
+        self._lock = threading.Lock()
+
+    # -------- Matching --------
+    @staticmethod
+    def build_matcher(name=None, glob=None, iglob=None, regex=None):
+        """Compile the name filters once into a single predicate"""
+        tests = []
+        if name:
+            needle = name.lower()
+            tests.append(lambda n: needle in n.lower())
+        if glob:
+            tests.append(re.compile(fnmatch.translate(glob)).match)
+        if iglob:
+            tests.append(re.compile(fnmatch.translate(iglob), re.IGNORECASE).match)
+        if regex:
+            tests.append(re.compile(regex).search)
+        if not tests:
+            return lambda n: True
+        if len(tests) == 1:
+            return tests[0]
+        return lambda n: all(test(n) for test in tests)
+
+    def search(self, root, matcher, ftype=None, use_index=False, cwd=None):
+        """
+        Yield paths under root whose name passes matcher; ftype is 'f', 'd'
+        or None. A relative root is taken from cwd (default: the process's).
+        """
+        abs_root = os.path.normpath(os.path.join(cwd, root)) if cwd else os.path.abspath(root)
+        want_dirs = ftype != "f"
+        want_files = ftype != "d"
+
+        for dirpath, entries in self._walk(abs_root, use_index):
+            shown = root + dirpath[len(abs_root):]
+            for name, is_dir in entries:
+                if (want_dirs if is_dir else want_files) and matcher(name):
+                    yield os.path.join(shown, name)
+
+    # -------- Walking --------
+    def _walk(self, abs_root, use_index):
+        """Yield (dirpath, entries) for every directory, scanning many in parallel"""
+        if use_index:
+            self._load_index()
+
+        visited = set()
+        completed = False
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            pending = {pool.submit(self._scan_batch, abs_root, use_index)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results, leftover = future.result()
+                    for subdir in leftover:
+                        pending.add(pool.submit(self._scan_batch, subdir, use_index))
+                    for dirpath, entries, fresh in results:
+                        if use_index:
+                            visited.add(dirpath)
+                            if fresh is not None:
+                                with self._lock:
+                                    self._index[dirpath] = fresh
+                                    self._dirty = True
+                        yield dirpath, entries
+            completed = True
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if use_index:
+                if completed:
+                    self._prune_index(abs_root, visited)
+                self._save_index()
+
+    def _scan_batch(self, top, use_index, batch=64):
+        """
+        Scan up to `batch` directories depth-first starting at top, in one task.
+        Returns the scanned (dirpath, entries, fresh) triples and the subdirectories
+        left over for other workers, which keeps per-task overhead low.
+        """
+        scan = self._scan_indexed if use_index else self._scan
+        results = []
+        stack = [top]
+        while stack and len(results) < batch:
+            dirpath = stack.pop()
+            entries, fresh = scan(dirpath)
+            if entries is None:
+                continue
+            results.append((dirpath, entries, fresh))
+            stack.extend(os.path.join(dirpath, name) for name, is_dir in entries if is_dir)
+        return results, stack
+
+    @staticmethod
+    def _scan(dirpath):
+        try:
+            with os.scandir(dirpath) as it:
+                return [(e.name, e.is_dir(follow_symlinks=False)) for e in it], None
+        except OSError:
+            return None, None
+
+    def _scan_indexed(self, dirpath):
+        """Reuse the cached listing while the directory's mtime is unchanged"""
+        try:
+            mtime = os.stat(dirpath).st_mtime_ns
+        except OSError:
+            return None, None
+        cached = self._index.get(dirpath)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], None
+        entries, _ = self._scan(dirpath)
+        if entries is None:
+            return None, None
+        return entries, (mtime, entries)
+
+    # -------- Index persistence --------
+    def _load_index(self):
+        with self._lock:
+            if self._index is not None:
+                return
+            try:
+                with open(self.index_path, "rb") as f:
+                    self._index = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                self._index = {}
+
+    def _prune_index(self, abs_root, visited):
+        """Forget directories under abs_root that no longer exist"""
+        prefix = abs_root.rstrip(os.sep) + os.sep
+        with self._lock:
+            stale = [d for d in self._index
+                     if (d == abs_root or d.startswith(prefix)) and d not in visited]
+            for d in stale:
+                del self._index[d]
+            self._dirty = self._dirty or bool(stale)
+
+    def _save_index(self):
+        # Held throughout: pickling iterates the dict, and two saves would share the temp file
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.index_path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(self._index, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.index_path)
+                self._dirty = False
+            except OSError:
+                pass
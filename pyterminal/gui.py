@@ -1,27 +1,95 @@
 import tkinter as tk
-from tkinter import scrolledtext, Menu
-import os, re
-from core.parser import CommandParser
-from core.executor import CommandExecutor
+from tkinter import scrolledtext, ttk, Menu
+import os, re, time, codecs, queue, threading
+from parser import CommandParser
+from executor import CommandExecutor
+from lister import DirectoryLister
+from history import HistoryStore
 
-class PyTerminalGUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("PyTerminal Emulator")
-        self.root.geometry("1000x600")
-        self.root.configure(bg="black")
+# CSI escape sequences: parameters + final byte (only SGR "m" affects rendering)
+ANSI_PATTERN = re.compile(r"\x1b\[([0-9;]*)([A-Za-z])")
 
-        # --- Menu Bar ---
-        menu_bar = Menu(root, bg="black", fg="white", tearoff=0)
-        root.config(menu=menu_bar)
-        file_menu = Menu(menu_bar, tearoff=0, bg="black", fg="white")
-        file_menu.add_command(label="Clear", command=self.clear_output)
-        file_menu.add_command(label="Exit", command=root.destroy)
-        menu_bar.add_cascade(label="Menu", menu=file_menu)
+# SGR foreground codes → Tk colours, readable on a black background
+ANSI_COLORS = {
+    30: "gray40", 31: "red", 32: "green", 33: "yellow",
+    34: "dodger blue", 35: "magenta", 36: "cyan", 37: "white",
+    90: "gray60", 91: "tomato", 92: "pale green", 93: "light yellow",
+    94: "light sky blue", 95: "violet", 96: "light cyan", 97: "white",
+}
+
+
+class AnsiParser:
+    """
+    Incrementally turns text with ANSI SGR codes into (text, tags) segments.
+    A clear-screen sequence (ESC[2J) becomes a (None, ()) marker so that
+    in-place redraws such as `top` replace the output instead of appending.
+    """
+
+    def __init__(self):
+        self.tags = ()
+        self.pending = ""  # escape sequence split across two chunks
+
+    def feed(self, text):
+        text = self.pending + text
+        self.pending = ""
+        # Hold back an unterminated escape sequence until the next chunk
+        cut = text.rfind("\x1b")
+        if cut != -1 and not ANSI_PATTERN.match(text, cut) and len(text) - cut < 32:
+            text, self.pending = text[:cut], text[cut:]
+
+        segments = []
+        pos = 0
+        for match in ANSI_PATTERN.finditer(text):
+            if match.start() > pos:
+                segments.append((text[pos:match.start()], self.tags))
+            pos = match.end()
+            if match.group(2) == "m":
+                self.apply_sgr(match.group(1))
+            elif match.group(2) == "J" and match.group(1) == "2":
+                segments.append((None, ()))
+        if pos < len(text):
+            segments.append((text[pos:], self.tags))
+        return segments
+
+    def apply_sgr(self, params):
+        codes = [int(p) for p in params.split(";") if p] or [0]
+        fg = next((t for t in self.tags if t.startswith("ansi_fg")), None)
+        bold = "ansi_bold" in self.tags
+        for code in codes:
+            if code == 0:
+                fg, bold = None, False
+            elif code == 1:
+                bold = True
+            elif code == 22:
+                bold = False
+            elif code == 39:
+                fg = None
+            elif code in ANSI_COLORS:
+                fg = f"ansi_fg{code}"
+        self.tags = tuple(t for t in (fg, "ansi_bold" if bold else None) if t)
+
+
+class TerminalSession:
+    """
+    One tab: its own output area, input line, executor (cwd, environment,
+    jobs) and worker thread. Commands in different tabs run concurrently;
+    the window's render loop drains every tab's output queue.
+    """
+
+    # Upper bound on bytes rendered in one frame; the rest waits for the next one
+    MAX_FRAME_BYTES = 1024 * 1024
+    # Chunks buffered between worker and UI before the pipeline is throttled
+    MAX_QUEUED_CHUNKS = 256
+
+    def __init__(self, app, number, cwd=None, env=None):
+        self.app = app
+        self.number = number
+        self.closed = False
+        self.frame = tk.Frame(app.notebook, bg="black")
 
         # --- Output Area ---
         self.output_area = scrolledtext.ScrolledText(
-            root, wrap=tk.WORD, bg="black", fg="white",
+            self.frame, wrap=tk.WORD, bg="black", fg="white",
             insertbackground="white", font=("Consolas", 12)
         )
         self.output_area.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
@@ -33,62 +101,222 @@ class PyTerminalGUI:
         self.output_area.tag_config("dir", foreground="cyan")
         self.output_area.tag_config("info", foreground="yellow")
         self.output_area.tag_config("prompt", foreground="magenta")
+        for code, color in ANSI_COLORS.items():
+            self.output_area.tag_config(f"ansi_fg{code}", foreground=color)
+        self.output_area.tag_config("ansi_bold", font=("Consolas", 12, "bold"))
+
+        # Lines kept in the output area; older ones are trimmed
+        self.scrollback = app.scrollback
+        self.ansi = AnsiParser()
+        self.pending = []  # (text, tags) segments waiting for the next frame
 
         # --- Input Area ---
         self.input_var = tk.StringVar()
         self.input_field = tk.Entry(
-            root, textvariable=self.input_var, bg="black",
+            self.frame, textvariable=self.input_var, bg="black",
             fg="cyan", insertbackground="cyan", font=("Consolas", 12)
         )
         self.input_field.pack(fill=tk.X, padx=10, pady=5)
         self.input_field.bind("<Return>", self.execute_command)
         self.input_field.bind("<Up>", self.show_prev_command)
         self.input_field.bind("<Down>", self.show_next_command)
-
-        # Command history
-        self.history = []
-        self.history_index = -1
+        self.input_field.bind("<Control-c>", self.cancel_command)
+        self.input_field.bind("<Control-r>", self.open_history_search)
+        # Entry's own Ctrl-T transposes characters; the tab shortcuts win here
+        self.input_field.bind("<Control-t>", app.new_tab)
+        self.input_field.bind("<Control-w>", app.close_tab)
 
         # Core components
-        self.executor = CommandExecutor()
-        self.print_banner()
+        # Commands run on a worker thread; their output comes back through a
+        # thread-safe queue that the Tk loop drains, so the window never blocks.
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.output_queue = queue.Queue(maxsize=self.MAX_QUEUED_CHUNKS)
+        self.command_queue = queue.Queue()
+        self.executor = CommandExecutor(output=self.emit, cwd=cwd, env=env, color=True)
+        # Tabs share the history database and the directory listing cache
+        self.executor._history = app.store
+        self.executor.lister = app.lister
+        self.history_index = len(app.history)
+        self.worker = threading.Thread(target=self.run_worker, daemon=True)
+        self.worker.start()
 
-    def print_banner(self):
-        banner = """
-██████╗ ██╗   ██╗████████╗████████╗███████╗██████╗ ███╗   ███╗ █████╗ ██╗     
-██╔══██╗██║   ██║╚══██╔══╝╚══██╔══╝██╔════╝██╔══██╗████╗ ████║██╔══██╗██║     
-██████╔╝██║   ██║   ██║      ██║   █████╗  ██████╔╝██╔████╔██║███████║██║     
-██╔═══╝ ██║   ██║   ██║      ██║   ██╔══╝  ██╔══██╗██║╚██╔╝██║██╔══██║██║     
-██║     ╚██████╔╝   ██║      ██║   ███████╗██║  ██║██║ ╚═╝ ██║██║  ██║███████╗
-╚═╝      ╚═════╝    ╚═╝      ╚═╝   ╚══════╝╚═╝  ╚═╝╚═╝     ╚═╝╚═╝  ╚═╝╚══════╝
-                            Python Terminal Emulator
-        """
-        self.write_output(banner, "info")
-        self.write_output("Type 'help' for available commands.\n", "success")
+    @property
+    def title(self):
+        return f"{self.number}: {os.path.basename(self.executor.cwd) or self.executor.cwd}"
+
+    def emit(self, item):
+        # A closed tab's worker may still be unwinding; its output goes nowhere
+        if not self.closed:
+            self.output_queue.put(item)
+
+    def close(self):
+        """Stop the worker, kill the running pipeline and this tab's jobs"""
+        self.closed = True
+        self.command_queue.put(None)
+        self.executor.cancel()
+        self.executor.jobs.shutdown()
+        try:
+            while True:  # unblock a worker waiting on a full queue
+                self.output_queue.get_nowait()
+        except queue.Empty:
+            pass
 
     def clear_output(self):
+        self.pending = []
         self.output_area.config(state=tk.NORMAL)
         self.output_area.delete(1.0, tk.END)
         self.output_area.config(state=tk.DISABLED)
 
     def write_output(self, text, tag=None):
+        """Queue a line for the next frame (ANSI codes become tags)"""
+        for segment, tags in AnsiParser().feed(text + "\n"):
+            self.pending.append((segment, tags + (tag,) if tag else tags))
+
+    def render(self):
+        """Coalesce everything produced since the last frame into one widget insert"""
+        budget = self.MAX_FRAME_BYTES
+        try:
+            while budget > 0:
+                item = self.output_queue.get_nowait()
+                if isinstance(item, bytes):
+                    budget -= len(item)
+                    self.pending.extend(self.ansi.feed(self.decoder.decode(item)))
+                else:
+                    # (text, tag) messages such as the echoed prompt
+                    self.write_output(*item)
+        except queue.Empty:
+            pass
+        for text in self.executor.jobs.notifications():
+            self.write_output(text, "info")
+
+        if self.pending:
+            self.flush_pending()
+
+    def flush_pending(self):
+        segments = self.pending
+        self.pending = []
+        # Everything before the last clear-screen marker is never shown
+        cleared = [i for i, (text, _) in enumerate(segments) if text is None]
+        if cleared:
+            segments = segments[cleared[-1] + 1:]
+            self.output_area.config(state=tk.NORMAL)
+            self.output_area.delete(1.0, tk.END)
+            self.output_area.config(state=tk.DISABLED)
+        segments = self.tail_lines(segments, self.scrollback)
+        if not segments:
+            return
+
+        # Merge neighbours with identical tags, then insert everything at once
+        merged = []
+        for text, tags in segments:
+            if merged and merged[-1][1] == tags:
+                merged[-1][0].append(text)
+            else:
+                merged.append(([text], tags))
+        args = []
+        for texts, tags in merged:
+            args.extend(("".join(texts), tags))
+
         self.output_area.config(state=tk.NORMAL)
-        clean_text = re.sub(r"\x1b\[[0-9;]*m", "", text)  # remove ANSI codes
-        self.output_area.insert(tk.END, clean_text + "\n", tag)
+        self.output_area.insert(tk.END, *args)
+        # "end-1c" sits on the empty line after the last newline
+        lines = int(self.output_area.index("end-1c").split(".")[0]) - 1
+        if lines > self.scrollback:
+            self.output_area.delete("1.0", f"{lines - self.scrollback + 1}.0")
         self.output_area.config(state=tk.DISABLED)
         self.output_area.see(tk.END)
 
+    @staticmethod
+    def tail_lines(segments, max_lines):
+        """Drop leading segments that would be trimmed from scrollback anyway"""
+        newlines = 0
+        for i in range(len(segments) - 1, -1, -1):
+            text, tags = segments[i]
+            newlines += text.count("\n")
+            if newlines > max_lines:
+                # Keep only the part of this segment after the excess newlines
+                excess = newlines - max_lines
+                cut = -1
+                for _ in range(excess):
+                    cut = text.index("\n", cut + 1)
+                return [(text[cut + 1:], tags)] + segments[i + 1:]
+        return segments
+
     # --- Command History Navigation ---
     def show_prev_command(self, event=None):
-        if self.history:
+        history = self.app.history
+        if history:
             self.history_index = max(0, self.history_index - 1)
-            self.input_var.set(self.history[self.history_index])
+            self.input_var.set(history[self.history_index])
         return "break"
 
     def show_next_command(self, event=None):
-        if self.history:
-            self.history_index = min(len(self.history) - 1, self.history_index + 1)
-            self.input_var.set(self.history[self.history_index])
+        history = self.app.history
+        if history:
+            self.history_index = min(len(history) - 1, self.history_index + 1)
+            self.input_var.set(history[self.history_index])
+        return "break"
+
+    # --- Fuzzy History Search (Ctrl-R) ---
+    def open_history_search(self, event=None):
+        """Search window over the shared history; re-queried on every keystroke"""
+        store = self.app.store
+        if store is None:
+            return "break"
+        dialog = tk.Toplevel(self.app.root)
+        dialog.title("History search")
+        dialog.configure(bg="black")
+        dialog.transient(self.app.root)
+        query = tk.StringVar(value=self.input_var.get())
+        entry = tk.Entry(
+            dialog, textvariable=query, bg="black", fg="cyan",
+            insertbackground="cyan", font=("Consolas", 12)
+        )
+        entry.pack(fill=tk.X, padx=10, pady=5)
+        results = tk.Listbox(
+            dialog, bg="black", fg="white", selectbackground="magenta",
+            font=("Consolas", 12), height=self.app.SEARCH_ROWS, width=80
+        )
+        results.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        def refresh(*_):
+            results.delete(0, tk.END)
+            for command in store.search(query.get(), self.app.SEARCH_ROWS):
+                results.insert(tk.END, command)
+            if results.size():
+                results.selection_set(0)
+
+        def move(step):
+            selection = results.curselection()
+            if results.size():
+                index = min(max((selection[0] if selection else 0) + step, 0), results.size() - 1)
+                results.selection_clear(0, tk.END)
+                results.selection_set(index)
+                results.see(index)
+            return "break"
+
+        def close(chosen=None):
+            if chosen is not None:
+                self.input_var.set(chosen)
+                self.input_field.icursor(tk.END)
+            dialog.destroy()
+            self.input_field.focus_set()
+            return "break"
+
+        def choose(event=None):
+            selection = results.curselection()
+            return close(results.get(selection[0]) if selection else None)
+
+        query.trace_add("write", refresh)
+        entry.bind("<Return>", choose)
+        entry.bind("<Escape>", lambda e: close())
+        entry.bind("<Down>", lambda e: move(1))
+        entry.bind("<Control-r>", lambda e: move(1))
+        entry.bind("<Up>", lambda e: move(-1))
+        results.bind("<Double-Button-1>", choose)
+        refresh()
+        entry.focus_set()
+        entry.icursor(tk.END)
         return "break"
 
     def execute_command(self, event=None):
@@ -102,50 +330,180 @@ class PyTerminalGUI:
         if not command_input:
             return
 
-        # Save to history
-        self.history.append(command_input)
-        self.history_index = len(self.history)
-
-        # Show command prompt
-        cwd = os.getcwd()
-        prompt = f"{os.getenv('USERNAME') or 'user'}@pyterminal:{cwd}$ {command_input}"
-        self.write_output(prompt, "prompt")
+        # Save to history (shared by all tabs)
+        history = self.app.history
+        history.append(command_input)
+        del history[:-self.app.HISTORY_PRELOAD]
+        self.history_index = len(history)
 
         # Special case: clear
         if command_input.lower() == "clear":
             self.clear_output()
             return
 
-        # Exit command
+        # Exit command closes this tab (the window with the last one)
         if command_input.lower() in ["exit", "quit"]:
+            self.write_output(self.build_prompt(command_input), "prompt")
             self.write_output("Exiting PyTerminal... Goodbye!", "error")
-            self.root.after(1000, self.root.destroy)
+            self.app.root.after(1000, lambda: self.app.close_tab(session=self))
             return
 
         # Parse + Execute
-        parsed_commands = CommandParser.parse(command_input)
-        self.capture_execution(parsed_commands)
+        try:
+            parsed_commands = CommandParser.parse(command_input)
+        except ValueError as e:
+            self.write_output(f"parse error: {e}", "error")
+            if self.app.store is not None:
+                self.app.store.record(command_input, time.time(), 0.0, self.executor.cwd, 2)
+            return
+        self.command_queue.put((command_input, parsed_commands))
+
+    def build_prompt(self, command_input):
+        cwd = self.executor.cwd
+        return f"{os.getenv('USERNAME') or 'user'}@pyterminal:{cwd}$ {command_input}"
 
-    def capture_execution(self, parsed_commands):
-        from io import StringIO
-        import sys
+    def run_worker(self):
+        """Execute this tab's queued commands off the Tk main loop"""
+        while True:
+            item = self.command_queue.get()
+            if item is None:  # tab closed
+                return
+            command_input, parsed_commands = item
+            # Echo the prompt through the queue so it stays ordered with earlier output
+            self.emit((self.build_prompt(command_input), "prompt"))
+            started = time.time()
+            cwd = self.executor.cwd
+            status = 1
+            try:
+                status = self.executor.execute(parsed_commands)
+            except Exception as e:
+                self.emit(f"error: {e}\n".encode())
+            if self.app.store is not None:
+                self.app.store.record(command_input, started, time.time() - started, cwd, status)
 
-        old_stdout = sys.stdout
-        sys.stdout = mystdout = StringIO()
+    def cancel_command(self, event=None):
+        """Ctrl-C: drop queued commands and kill the running pipeline"""
+        try:
+            while True:
+                self.command_queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.executor.cancel()
+        self.write_output("^C", "error")
+        return "break"
 
-        self.executor.execute(parsed_commands)
 
-        sys.stdout = old_stdout
-        output = mystdout.getvalue().strip()
+class PyTerminalGUI:
+    # Output produced by the workers is rendered at most once per frame (~30 fps)
+    FRAME_INTERVAL = 33
+    # Commands kept for Up/Down recall, loaded from the shared history database
+    HISTORY_PRELOAD = 1000
+    # Matches listed by the Ctrl-R search
+    SEARCH_ROWS = 10
 
-        if output:
-            if "error" in output.lower() or "not found" in output.lower():
-                self.write_output(output, "error")
-            elif "dir" in output.lower() or "\\" in output or "/" in output:
-                self.write_output(output, "dir")
-            else:
-                self.write_output(output, "success")
+    def __init__(self, root, scrollback=10000):
+        self.root = root
+        self.root.title("PyTerminal Emulator")
+        self.root.geometry("1000x600")
+        self.root.configure(bg="black")
+
+        # --- Menu Bar ---
+        menu_bar = Menu(root, bg="black", fg="white", tearoff=0)
+        root.config(menu=menu_bar)
+        file_menu = Menu(menu_bar, tearoff=0, bg="black", fg="white")
+        file_menu.add_command(label="New Tab (Ctrl-T)", command=self.new_tab)
+        file_menu.add_command(label="Close Tab (Ctrl-W)", command=self.close_tab)
+        file_menu.add_separator()
+        file_menu.add_command(label="Clear", command=lambda: self.current.clear_output())
+        file_menu.add_command(label="Cancel (Ctrl-C)", command=lambda: self.current.cancel_command())
+        file_menu.add_command(label="Exit", command=self.quit)
+        menu_bar.add_cascade(label="Menu", menu=file_menu)
+
+        # --- Tabs ---
+        self.notebook = ttk.Notebook(root)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.notebook.bind("<<NotebookTabChanged>>", self.focus_current)
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+
+        # Lines kept in each tab's output area; older ones are trimmed
+        self.scrollback = scrollback
+        self.sessions = []
+        self._numbers = 0
+
+        # Command history, shared with other sessions and written per command
+        try:
+            self.store = HistoryStore()
+            self.history = [entry[0] for entry in self.store.recent(self.HISTORY_PRELOAD)]
+        except Exception:
+            self.store = None
+            self.history = []
+        self.lister = DirectoryLister()
+
+        self.new_tab()
+        self.print_banner()
+        self.root.after(self.FRAME_INTERVAL, self.render_frame)
+
+    @property
+    def current(self):
+        return self.sessions[self.notebook.index("current")]
+
+    def new_tab(self, event=None):
+        """Open a tab starting in the current tab's directory and environment"""
+        cwd = env = None
+        if self.sessions:
+            cwd, env = self.current.executor.cwd, self.current.executor.env
+        self._numbers += 1
+        session = TerminalSession(self, self._numbers, cwd, env)
+        self.sessions.append(session)
+        self.notebook.add(session.frame, text=session.title)
+        self.notebook.select(session.frame)
+        return "break"
+
+    def close_tab(self, event=None, session=None):
+        session = session or self.current
+        if session not in self.sessions:
+            return "break"  # already closed (e.g. `exit` followed by Ctrl-W)
+        session.close()
+        self.sessions.remove(session)
+        self.notebook.forget(session.frame)
+        session.frame.destroy()
+        if not self.sessions:
+            self.quit()
+        return "break"
+
+    def focus_current(self, event=None):
+        if self.sessions:
+            self.current.input_field.focus_set()
+
+    def quit(self):
+        for session in self.sessions:
+            session.close()
+        self.sessions = []
+        if self.store is not None:
+            self.store.close()
+        self.root.destroy()
+
+    def print_banner(self):
+        banner = """
+██████╗ ██╗   ██╗████████╗████████╗███████╗██████╗ ███╗   ███╗ █████╗ ██╗     
+██╔══██╗██║   ██║╚══██╔══╝╚══██╔══╝██╔════╝██╔══██╗████╗ ████║██╔══██╗██║     
+██████╔╝██║   ██║   ██║      ██║   █████╗  ██████╔╝██╔████╔██║███████║██║     
+██╔═══╝ ██║   ██║   ██║      ██║   ██╔══╝  ██╔══██╗██║╚██╔╝██║██╔══██║██║     
+██║     ╚██████╔╝   ██║      ██║   ███████╗██║  ██║██║ ╚═╝ ██║██║  ██║███████╗
+╚═╝      ╚═════╝    ╚═╝      ╚═╝   ╚══════╝╚═╝  ╚═╝╚═╝     ╚═╝╚═╝  ╚═╝╚══════╝
+                            Python Terminal Emulator
+        """
+        self.current.write_output(banner, "info")
+        self.current.write_output("Type 'help' for available commands; Ctrl-T opens a new tab.\n", "success")
 
+    def render_frame(self):
+        """Render every tab's new output, then keep tab titles in step with `cd`"""
+        for session in self.sessions:
+            session.render()
+            title = session.title
+            if self.notebook.tab(session.frame, "text") != title:
+                self.notebook.tab(session.frame, text=title)
+        self.root.after(self.FRAME_INTERVAL, self.render_frame)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,218 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Rows fetched from SQLite per search before ranking them in Python
+SEARCH_CANDIDATES = 200
+
+# Most recent distinct commands a fuzzy search scans; older ones are found
+# through the trigram index when the query is an exact substring of them
+SEARCH_WINDOW = 20000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    command TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL,
+    cwd TEXT,
+    status INTEGER,
+    session INTEGER
+);
+-- One row per distinct command, so searches scan unique commands, newest first.
+-- mask is char_mask(command): an integer test that rejects most rows before LIKE
+CREATE TABLE IF NOT EXISTS commands (
+    command TEXT PRIMARY KEY,
+    last_used REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 1,
+    mask INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commands_recent ON commands (last_used, mask);
+"""
+
+# Trigram index of commands.command (SQLite 3.34+), filled as new commands are inserted
+TEXT_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS commands_text USING fts5(command, content='commands', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS commands_text_insert AFTER INSERT ON commands BEGIN
+    INSERT INTO commands_text (rowid, command) VALUES (new.rowid, new.command);
+END;
+"""
+
+UPSERT_COMMAND = (
+    "INSERT INTO commands (command, last_used, mask) VALUES (?, ?, ?) "
+    "ON CONFLICT (command) DO UPDATE SET last_used = max(last_used, excluded.last_used), uses = uses + 1"
+)
+
+
+def char_mask(text):
+    """63-bit set of the (lowercased) characters in text, one bit per bucket"""
+    mask = 0
+    for c in set(text.lower()):
+        mask |= 1 << (ord(c) % 63)
+    return mask
+
+
+def fuzzy_pattern(query):
+    """LIKE pattern matching query's characters in order: "gco" → %g%c%o%"""
+    escaped = [("\\" + c) if c in "%_\\" else c for c in query]
+    return "%" + "%".join(escaped) + "%"
+
+
+def fuzzy_score(query, command):
+    """
+    Lower is better: an exact substring scores by its position, otherwise
+    the span the subsequence match covers. None if it doesn't match.
+    """
+    query = query.lower()
+    command = command.lower()
+    position = command.find(query)
+    if position != -1:
+        return position
+    # Greedy subsequence match from the first possible start
+    start = i = command.find(query[0]) if query else 0
+    if start == -1:
+        return None
+    for c in query:
+        i = command.find(c, i)
+        if i == -1:
+            return None
+        i += 1
+    return len(command) + (i - start)
+
+
+class HistoryStore:
+    """
+    Command history shared by every session, in SQLite. Each command is
+    committed as soon as it finishes, with its start time, duration, cwd
+    and exit status, so a crash loses nothing. WAL mode lets several
+    shells write while others search.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.expanduser("~/.pyterminal_history.db")
+        self._lock = threading.Lock()
+        # (query, matches) of the last search whose scan reached the end of
+        # the table; a longer query typed after it only filters those matches
+        self._narrow = None
+        # Commands run on the GUI worker thread and are searched from the Tk thread
+        self.db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.text_index = self._create_text_index()
+
+    def _create_text_index(self):
+        """Add the trigram index (indexing existing commands once); False where SQLite lacks it"""
+        try:
+            new = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'commands_text'").fetchone() is None
+            self.db.executescript(TEXT_INDEX)
+            if new:
+                with self.db:
+                    self.db.execute("INSERT INTO commands_text (commands_text) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError:
+            return False  # no FTS5 or no trigram tokenizer: searches cover SEARCH_WINDOW commands
+
+    def record(self, command, started, duration, cwd, status):
+        try:
+            with self._lock, self.db:
+                self.db.execute(
+                    "INSERT INTO history (command, started, duration, cwd, status, session) VALUES (?, ?, ?, ?, ?, ?)",
+                    (command, started, duration, cwd, status, os.getpid()),
+                )
+                self.db.execute(UPSERT_COMMAND, (command, started, char_mask(command)))
+                self._narrow = None
+        except sqlite3.Error:
+            pass  # a locked or full database must never break the shell
+
+    def import_lines(self, lines, mtime=0.0):
+        """One-time import of an old flat history file (oldest line first)"""
+        lines = [line for line in lines if line.strip()]
+        with self._lock, self.db:
+            self.db.executemany("INSERT INTO history (command, started) VALUES (?, ?)", [(line, mtime) for line in lines])
+            self.db.executemany(UPSERT_COMMAND, [(line, mtime, char_mask(line)) for line in lines])
+
+    def empty(self):
+        with self._lock:
+            return self.db.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None
+
+    def recent(self, limit=1000):
+        """The last `limit` entries, oldest first, as (command, started, duration, cwd, status)"""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT command, started, duration, cwd, status FROM history ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        rows.reverse()
+        return rows
+
+    def search(self, query, limit=20):
+        """
+        Distinct commands fuzzily matching query, best first. SQLite walks
+        the newest SEARCH_WINDOW commands, skips rows whose character mask
+        can't match, and stops after SEARCH_CANDIDATES matches, so a query
+        costs at most one window however long the history is. Older commands
+        containing the query (3+ characters) come from the trigram index.
+        When a search finds fewer candidates than that, it saw every match,
+        and the next keystroke just filters them.
+        """
+        if not query:
+            with self._lock:
+                rows = self.db.execute(
+                    "SELECT command FROM commands ORDER BY last_used DESC LIMIT ?", (limit,)
+                ).fetchall()
+            return [command for command, in rows]
+
+        with self._lock:
+            narrow = self._narrow
+        if narrow is not None and query.startswith(narrow[0]):
+            candidates = narrow[1]
+        else:
+            mask = char_mask(query)
+            with self._lock:
+                # last_used of the oldest command in the window; None when the window holds them all
+                cutoff = self.db.execute(
+                    "SELECT last_used FROM commands ORDER BY last_used DESC LIMIT 1 OFFSET ?", (SEARCH_WINDOW - 1,)
+                ).fetchone()
+                rows = self.db.execute(
+                    "SELECT command FROM commands WHERE last_used >= ? AND (mask & ?) = ? "
+                    "AND command LIKE ? ESCAPE '\\' ORDER BY last_used DESC LIMIT ?",
+                    (cutoff[0] if cutoff else float("-inf"), mask, mask, fuzzy_pattern(query), SEARCH_CANDIDATES),
+                ).fetchall()
+                complete = len(rows) < SEARCH_CANDIDATES
+                if complete and cutoff is not None:
+                    # The history is longer than the window: look for the query as a substring of the rest
+                    older = self._containing(query) if self.text_index and len(query) >= 3 else None
+                    complete = older is not None and len(older) < SEARCH_CANDIDATES
+                    rows += older or []
+            candidates = list(dict.fromkeys(command for command, in rows))
+            with self._lock:
+                self._narrow = (query, candidates) if complete else None
+
+        # Candidates are newest first; the stable sort keeps that order among equal scores
+        scored = [(fuzzy_score(query, command), command) for command in candidates]
+        scored = [(score, command) for score, command in scored if score is not None]
+        scored.sort(key=lambda item: item[0])
+        return [command for _, command in scored[:limit]]
+
+    def _containing(self, query):
+        """Rows of up to SEARCH_CANDIDATES commands containing query (any case), newest first"""
+        phrase = '"' + query.replace('"', '""') + '"'
+        return self.db.execute(
+            "SELECT command FROM commands WHERE rowid IN "
+            "(SELECT rowid FROM commands_text WHERE commands_text MATCH ?) ORDER BY last_used DESC LIMIT ?",
+            (phrase, SEARCH_CANDIDATES),
+        ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+def format_entry(number, entry):
+    """One line of `history` output"""
+    command, started, duration, cwd, status = entry
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started)) if started else "-" * 19
+    took = f"{duration:.2f}s" if duration is not None else "-"
+    result = "-" if status is None else str(status)
+    return f"{number:>6}  {when}  {took:>8}  {result:>3}  {command}"
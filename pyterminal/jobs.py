@@ -0,0 +1,209 @@
+import shlex
+import threading
+from collections import deque
+
+# Bytes of output kept per job; the oldest output is dropped first
+JOB_BUFFER = 1024 * 1024
+
+# Finished jobs with unread output are kept for `fg` up to this many
+MAX_FINISHED = 32
+
+
+def describe_pipeline(pipeline):
+    """Command text of a Pipeline, quoted so it parses back the same"""
+    stages = []
+    for command in pipeline.commands:
+        words = [shlex.quote(word) for word in command.argv]
+        for redirect in command.redirects:
+            target = f"&{redirect.target}" if redirect.op == ">&" else shlex.quote(redirect.target)
+            fd = "" if redirect.fd == (0 if redirect.op == "<" else 1) else str(redirect.fd)
+            words.append(f"{fd}{redirect.op.rstrip('&')}{target}")
+        stages.append(" ".join(words))
+    return " | ".join(stages)
+
+
+def describe(and_or):
+    """Command text of an AndOrList, for job listings"""
+    parts = []
+    for op, pipeline in and_or.items:
+        if op:
+            parts.append(op)
+        parts.append(describe_pipeline(pipeline))
+    return " ".join(parts)
+
+
+class OutputRing:
+    """
+    Bounded byte buffer addressed by absolute offsets, so a reader can
+    resume where it left off; once more than `limit` bytes are buffered
+    the oldest chunks are dropped.
+    """
+
+    def __init__(self, limit=JOB_BUFFER):
+        self.limit = limit
+        self.chunks = deque()
+        self.start = 0  # offset of the first buffered byte
+        self.end = 0    # offset just past the last byte written
+        self.changed = threading.Condition()
+
+    def write(self, chunk):
+        with self.changed:
+            self.chunks.append(chunk)
+            self.end += len(chunk)
+            while self.end - self.start > self.limit and len(self.chunks) > 1:
+                self.start += len(self.chunks.popleft())
+            self.changed.notify_all()
+
+    def read(self, offset):
+        """(data from offset to end, new offset, bytes lost to the ring)"""
+        with self.changed:
+            lost = max(0, self.start - offset)
+            # Walk back from the newest chunk, so a reader keeping up touches only new data
+            parts = []
+            position = self.end
+            for chunk in reversed(self.chunks):
+                if position <= offset:
+                    break
+                position -= len(chunk)
+                parts.append(chunk[max(0, offset - position):])
+            parts.reverse()
+            return b"".join(parts), self.end, lost
+
+
+class Job:
+    """One `&` list running on its own thread and executor"""
+
+    def __init__(self, number, text, executor):
+        self.number = number
+        self.text = text
+        self.executor = executor
+        self.output = OutputRing()
+        self.shown = 0  # offset up to which output was shown by fg
+        self.status = None
+        self.stopped = False
+        self.notified = False
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.status is None
+
+    @property
+    def unread(self):
+        return self.output.end - self.shown
+
+    def state(self):
+        if self.running:
+            return "Stopped" if self.stopped else "Running"
+        return "Done" if self.status == 0 else f"Exit {self.status}"
+
+    def start(self, parsed):
+        def run():
+            try:
+                status = self.executor.execute(parsed)
+            except Exception as e:
+                self.output.write(f"{self.text}: {e}\n".encode())
+                status = 1
+            with self.output.changed:
+                self.status = status
+                self.output.changed.notify_all()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def follow(self, cancelled, poll=0.1):
+        """Yield unread output, then new output as it arrives, until the job ends or cancelled is set"""
+        while True:
+            with self.output.changed:
+                if self.output.end == self.shown and self.running and not cancelled.is_set():
+                    self.output.changed.wait(poll)
+            data, self.shown, lost = self.output.read(self.shown)
+            if lost:
+                yield f"[{self.number}] ... {lost} bytes dropped from the job buffer\n".encode()
+            if data:
+                yield data
+            elif not self.running or cancelled.is_set():
+                return
+
+    def send_signal(self, sig):
+        self.executor.send_signal(sig)
+
+    def cancel(self):
+        self.executor.cancel()
+
+    def wait(self, cancelled, poll=0.1):
+        """Block until the job ends; False if cancelled first"""
+        with self.output.changed:
+            while self.running:
+                if cancelled.is_set():
+                    return False
+                self.output.changed.wait(poll)
+        return True
+
+
+class JobTable:
+    """Background jobs of one shell, numbered like a POSIX shell's %1, %2, ..."""
+
+    def __init__(self):
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, and_or, executor):
+        """Run and_or in the background on executor; returns the new Job"""
+        with self._lock:
+            number = max(self.jobs, default=0) + 1
+            job = Job(number, describe(and_or), executor)
+            self.jobs[number] = job
+        executor.output = job.output.write
+        job.start((and_or._replace(background=False),))
+        return job
+
+    def get(self, spec=None):
+        """Job for a spec like "%2", "2", "%+" or None (the most recent job)"""
+        with self._lock:
+            if spec in (None, "%", "%+", "%%"):
+                if not self.jobs:
+                    raise LookupError("no current job")
+                return self.jobs[max(self.jobs)]
+            try:
+                return self.jobs[int(spec[1:] if spec.startswith("%") else spec)]
+            except (KeyError, ValueError):
+                raise LookupError(f"{spec}: no such job")
+
+    def remove(self, job):
+        with self._lock:
+            self.jobs.pop(job.number, None)
+
+    def list(self):
+        with self._lock:
+            return [self.jobs[n] for n in sorted(self.jobs)]
+
+    def running(self):
+        return [job for job in self.list() if job.running]
+
+    def notifications(self):
+        """
+        One line per job that finished since the last call. Jobs whose
+        output has all been seen are dropped from the table; the rest stay
+        for `fg`, up to MAX_FINISHED of them.
+        """
+        lines = []
+        with self._lock:
+            finished = [job for job in self.jobs.values() if not job.running]
+            for job in finished:
+                if job.notified:
+                    continue
+                job.notified = True
+                hint = f" ({job.unread} bytes of output: fg %{job.number})" if job.unread else ""
+                lines.append(f"[{job.number}]  {job.state():<10} {job.text}{hint}")
+                if not job.unread:
+                    del self.jobs[job.number]
+            kept = [job for job in finished if job.number in self.jobs]
+            for job in kept[:max(0, len(kept) - MAX_FINISHED)]:
+                del self.jobs[job.number]
+        return lines
+
+    def shutdown(self):
+        """Kill every running job (shell exit)"""
+        for job in self.running():
+            job.cancel()
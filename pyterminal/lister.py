@@ -0,0 +1,124 @@
+import os
+import stat
+import time
+import shutil
+import threading
+from collections import OrderedDict
+
+from lazy import lazy_import
+
+colorama = lazy_import("colorama")
+
+
+class DirectoryLister:
+    """
+    Directory listings built on os.scandir, whose d_type tells files from
+    directories without an extra stat() per entry. Listings (names + types)
+    are cached per directory and reused while the directory's mtime is
+    unchanged; sizes and times for -l/-S/-t are always read fresh, since
+    editing a file does not touch its directory's mtime.
+    """
+
+    def __init__(self, max_dirs=256):
+        self.max_dirs = max_dirs
+        self._cache = OrderedDict()  # abs path -> (mtime_ns, [(name, is_dir), ...])
+        self._lock = threading.Lock()
+
+    def entries(self, path):
+        """Sorted (name, is_dir) pairs for path, served from cache when possible"""
+        key = os.path.abspath(path)
+        mtime = os.stat(key).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        with os.scandir(key) as it:
+            entries = sorted((e.name, e.is_dir()) for e in it)
+
+        with self._lock:
+            self._cache[key] = (mtime, entries)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_dirs:
+                self._cache.popitem(last=False)
+        return entries
+
+    def listing(self, path, show_all=False, long=False, sort_key=None, reverse=False, columns=True, color=True):
+        """Render one directory as a single string; color=False for pipes and files"""
+        entries = self.entries(path)
+        if not show_all:
+            entries = [e for e in entries if not e[0].startswith(".")]
+
+        stats = None
+        if long or sort_key:
+            stats = {}
+            for name, _ in entries:
+                try:
+                    stats[name] = os.lstat(os.path.join(path, name))
+                except OSError:
+                    stats[name] = None
+
+        if sort_key == "size":
+            entries = sorted(entries, key=lambda e: stats[e[0]].st_size if stats[e[0]] else 0, reverse=True)
+        elif sort_key == "time":
+            entries = sorted(entries, key=lambda e: stats[e[0]].st_mtime if stats[e[0]] else 0, reverse=True)
+        if reverse:
+            entries = entries[::-1]
+
+        if long:
+            return self.format_long(entries, stats, color)
+        if columns:
+            return self.format_columns(entries, color)
+        return "".join(self.colorize(name, is_dir, color) + "\n" for name, is_dir in entries)
+
+    @staticmethod
+    def colorize(name, is_dir, color=True):
+        return colorama.Fore.BLUE + name + colorama.Style.RESET_ALL if is_dir and color else name
+
+    def format_columns(self, entries, color=True):
+        """Lay names out in columns (filled top to bottom) at terminal width"""
+        if not entries:
+            return ""
+        width = shutil.get_terminal_size((80, 24)).columns
+        col_width = max(len(name) for name, _ in entries) + 2
+        ncols = max(1, width // col_width)
+        nrows = -(-len(entries) // ncols)
+
+        lines = []
+        for row in range(nrows):
+            cells = []
+            for i in range(row, len(entries), nrows):
+                name, is_dir = entries[i]
+                cells.append(self.colorize(name, is_dir, color) + " " * (col_width - len(name)))
+            lines.append("".join(cells).rstrip() + "\n")
+        return "".join(lines)
+
+    def format_long(self, entries, stats, color=True):
+        rows = []
+        for name, is_dir in entries:
+            st = stats[name]
+            if st is None:
+                rows.append(("?" * 10, "?", "?", "?", name, is_dir))
+                continue
+            mtime = time.strftime("%b %d %H:%M", time.localtime(st.st_mtime))
+            rows.append((stat.filemode(st.st_mode), str(st.st_nlink), str(st.st_size), mtime, name, is_dir))
+        if not rows:
+            return ""
+
+        link_width = max(len(r[1]) for r in rows)
+        size_width = max(len(r[2]) for r in rows)
+        return "".join(
+            f"{mode} {links:>{link_width}} {size:>{size_width}} {mtime} {self.colorize(name, is_dir, color)}\n"
+            for mode, links, size, mtime, name, is_dir in rows
+        )
+
+    def walk(self, path, show_all=False):
+        """Directories under path (depth-first, sorted), for ls -R"""
+        yield path
+        for name, is_dir in self.entries(path):
+            if not is_dir or (not show_all and name.startswith(".")):
+                continue
+            child = os.path.join(path, name)
+            if not os.path.islink(child):
+                yield from self.walk(child, show_all)
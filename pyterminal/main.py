@@ -1,13 +1,68 @@
+import os
 import sys
 
+USAGE = """Usage:
+  python main.py                        interactive shell
+  python main.py gui [--scrollback N]   GUI mode
+  python main.py run [-e] <script|->    run a command file (-e: stop at the first failure)
+  python main.py -c "<command>"         run one command line
+  python main.py serve [-s socket] [--idle secs]
+                                        keep a warm shell behind a Unix socket
+  python main.py client [-s socket] <command|->
+                                        run command lines on that server"""
+
+
+def enable_ansi():
+    """Windows consoles need VT processing switched on for colour codes"""
+    if os.name == "nt":
+        from colorama import just_fix_windows_console
+        just_fix_windows_console()
+
+
+def run_script(args):
+    """Batch modes: no readline, history or prompt setup; exits with the command status"""
+    from script import ScriptRunner, ScriptError
+
+    try:
+        if args[0] == "-c" and len(args) == 2:
+            return ScriptRunner().run_command(args[1])
+        stop_on_error = "-e" in args[1:]
+        paths = [a for a in args[1:] if a != "-e"]
+        if args[0] == "run" and len(paths) == 1:
+            return ScriptRunner(stop_on_error=stop_on_error).run_file(paths[0])
+    except ScriptError as e:
+        print(f"pyterminal: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # Reader went away (e.g. `main.py run x | head`): stop quietly like other tools
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 141
+    print(USAGE, file=sys.stderr)
+    return 2
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "gui":
+    if len(sys.argv) > 1 and sys.argv[1] in ("run", "-c"):
+        enable_ansi()
+        sys.exit(run_script(sys.argv[1:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "client":
+        # Kept free of shell imports: the server does the work
+        import client
+        sys.exit(client.main(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        import server
+        sys.exit(server.main(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "gui":
         from gui import PyTerminalGUI
         import tkinter as tk
         root = tk.Tk()
-        app = PyTerminalGUI(root)
+        if "--scrollback" in sys.argv:
+            app = PyTerminalGUI(root, scrollback=int(sys.argv[sys.argv.index("--scrollback") + 1]))
+        else:
+            app = PyTerminalGUI(root)
         root.mainloop()
     else:
+        enable_ansi()
         from cli import CommandLineInterface
         cli = CommandLineInterface()
         cli.run()
@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+import time
+import threading
+from collections import deque, namedtuple
+
+import psutil
+
+# Fetched for every process in one pass; psutil reads them under oneshot()
+SAMPLE_ATTRS = ["pid", "name", "username", "status", "cpu_times", "memory_info", "create_time"]
+
+SORT_KEYS = {
+    "cpu": lambda p: p["cpu"],
+    "mem": lambda p: p["rss"],
+    "pid": lambda p: -p["pid"],
+    "name": lambda p: (p["name"] or "").lower(),
+}
+
+
+class ProcessSampler:
+    """
+    Batched process sampler for `top`. Every tick does a single
+    psutil.process_iter(attrs=...) pass, and CPU% is the change in each
+    process's CPU time since the previous tick divided by the wall time
+    between ticks, so no sampling call ever sleeps.
+    """
+
+    def __init__(self):
+        self._previous = {}  # (pid, create_time) -> total cpu seconds
+        self._previous_time = None
+        self.sample_cost = 0.0  # seconds spent in the last sample()
+        psutil.cpu_percent(interval=None)  # start system-wide CPU delta tracking
+
+    def sample(self):
+        """Return one row per process, with CPU% relative to the previous call"""
+        started = time.perf_counter()
+        now = time.monotonic()
+        elapsed = now - self._previous_time if self._previous_time else None
+        total_mem = psutil.virtual_memory().total
+
+        rows = []
+        current = {}
+        for proc in psutil.process_iter(attrs=SAMPLE_ATTRS, ad_value=None):
+            info = proc.info
+            times = info["cpu_times"]
+            cpu_total = times.user + times.system if times else 0.0
+            key = (info["pid"], info["create_time"])
+            current[key] = cpu_total
+
+            before = self._previous.get(key)
+            cpu = (cpu_total - before) / elapsed * 100 if elapsed and before is not None else 0.0
+            rss = info["memory_info"].rss if info["memory_info"] else 0
+            rows.append({
+                "pid": info["pid"],
+                "name": info["name"] or "?",
+                "user": info["username"] or "?",
+                "status": info["status"] or "?",
+                "cpu": cpu,
+                "rss": rss,
+                "mem": rss / total_mem * 100 if total_mem else 0.0,
+            })
+
+        self._previous = current
+        self._previous_time = now
+        self.sample_cost = time.perf_counter() - started
+        return rows
+
+    @staticmethod
+    def select(rows, sort="cpu", name=None, user=None, limit=None):
+        """Filter by name substring / user, sort by column, and cap the row count"""
+        if name:
+            needle = name.lower()
+            rows = [r for r in rows if needle in r["name"].lower()]
+        if user:
+            rows = [r for r in rows if r["user"] == user]
+        rows = sorted(rows, key=SORT_KEYS[sort], reverse=sort != "name")
+        return rows[:limit] if limit else rows
+
+    def render(self, rows, shown):
+        """Format one screen: summary header plus the selected rows"""
+        mem = psutil.virtual_memory()
+        lines = [
+            f"top - {time.strftime('%H:%M:%S')}  procs: {len(rows)}  "
+            f"cpu: {psutil.cpu_percent(interval=None):.1f}%  "
+            f"mem: {mem.percent:.1f}% ({mem.used // (1024 ** 2)} MB / {mem.total // (1024 ** 2)} MB)  "
+            f"sample: {self.sample_cost * 1000:.1f} ms",
+            "",
+            f"{'PID':>7} {'USER':<12} {'CPU%':>6} {'MEM%':>6} {'RSS MB':>8} {'STATUS':<10} NAME",
+        ]
+        for r in shown:
+            lines.append(
+                f"{r['pid']:>7} {r['user'][:12]:<12} {r['cpu']:>6.1f} {r['mem']:>6.1f} "
+                f"{r['rss'] / (1024 ** 2):>8.1f} {r['status'][:10]:<10} {r['name']}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+# One row of the metrics history; disk/net fields are rates in bytes per second
+Sample = namedtuple("Sample", [
+    "time", "cpu", "per_cpu", "mem_percent", "mem_used",
+    "disk_read", "disk_write", "net_sent", "net_recv",
+])
+
+
+class MetricsSampler:
+    """
+    Optional background thread recording system metrics every `interval`
+    seconds into a fixed-size ring buffer, so `cpu`/`mem` can answer from
+    the latest sample instead of blocking for a measurement.
+    """
+
+    def __init__(self, interval=1.0, size=3600):
+        self.interval = interval
+        self.history = deque(maxlen=size)
+        self._thread = None
+        self._stop = threading.Event()
+        self._counters = None  # (time, disk counters, net counters) of the last tick
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None, size=None):
+        if self.running:
+            return
+        if interval:
+            self.interval = interval
+        if size and size != self.history.maxlen:
+            self.history = deque(self.history, maxlen=size)
+        self._stop.clear()
+        psutil.cpu_percent(interval=None, percpu=True)  # prime the CPU deltas
+        self._counters = self._read_counters()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def latest(self):
+        """The newest sample while the sampler is running and it is under one interval old, else None"""
+        if not self.running or not self.history:
+            return None
+        sample = self.history[-1]
+        return sample if time.time() - sample.time < self.interval else None
+
+    def window(self, seconds):
+        """Samples taken within the last `seconds`"""
+        cutoff = time.time() - seconds
+        return [s for s in self.history if s.time >= cutoff]
+
+    @staticmethod
+    def summarize(samples, field):
+        """(min, avg, max) of one field over samples"""
+        values = [getattr(s, field) for s in samples]
+        return min(values), sum(values) / len(values), max(values)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.history.append(self._sample())
+
+    @staticmethod
+    def _read_counters():
+        return time.monotonic(), psutil.disk_io_counters(), psutil.net_io_counters()
+
+    def _sample(self):
+        per_cpu = psutil.cpu_percent(interval=None, percpu=True)
+        mem = psutil.virtual_memory()
+
+        # Turn cumulative disk/net counters into rates since the previous tick
+        then, disk_before, net_before = self._counters
+        now, disk, net = self._counters = self._read_counters()
+        elapsed = (now - then) or 1.0
+
+        def rate(after, before, field):
+            if after is None or before is None:
+                return 0.0
+            return (getattr(after, field) - getattr(before, field)) / elapsed
+
+        return Sample(
+            time=time.time(),
+            cpu=sum(per_cpu) / len(per_cpu) if per_cpu else 0.0,
+            per_cpu=tuple(per_cpu),
+            mem_percent=mem.percent,
+            mem_used=mem.used,
+            disk_read=rate(disk, disk_before, "read_bytes"),
+            disk_write=rate(disk, disk_before, "write_bytes"),
+            net_sent=rate(net, net_before, "bytes_sent"),
+            net_recv=rate(net, net_before, "bytes_recv"),
+        )
+
+    def export(self, fmt):
+        """Yield the history as CSV (with header) or JSON-lines text"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=Sample._fields)
+        if fmt == "csv":
+            writer.writeheader()
+        for sample in list(self.history):
+            row = sample._asdict()
+            if fmt == "json":
+                buffer.write(json.dumps(row) + "\n")
+            else:
+                row["per_cpu"] = " ".join(f"{p:.1f}" for p in sample.per_cpu)
+                writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
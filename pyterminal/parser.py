@@ -1,30 +1,207 @@
-import shlex
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# -------- AST --------
+# 2>&1 is Redirect(fd=2, op=">&", target=1); > out.txt is Redirect(fd=1, op=">", target="out.txt")
+Redirect = namedtuple("Redirect", ["fd", "op", "target"])
+# One program invocation: argv plus its redirections
+Command = namedtuple("Command", ["argv", "redirects"])
+# Commands joined by |
+Pipeline = namedtuple("Pipeline", ["commands"])
+# Pipelines joined by && / ||: items are (op, Pipeline) with op None for the first
+AndOrList = namedtuple("AndOrList", ["items", "background"])
+
+# Operators, longest first so "||" wins over "|"
+OPERATORS = ("&&", "||", ">>", ">&", "<", ">", "|", ";", "&")
+REDIRECTIONS = {">", ">>", "<", ">&"}
+DEFAULT_FD = {">": 1, ">>": 1, ">&": 1, "<": 0}
+OPERATOR_CHARS = set("&|;<>")
+
+# A run of ordinary word characters, consumed in one step by the lexer
+PLAIN_RUN = re.compile(r"[^\s'\"\\&|;<>]+")
+
+# Parsed inputs kept for history replays and scripted loops
+PARSE_CACHE_SIZE = 1024
+
+
+class ParseError(ValueError):
+    pass
+
+
+def tokenize(command_input):
+    """
+    Single pass over the input producing ("word", text) and ("op", operator)
+    tokens. Quotes and backslashes are resolved here, so operators inside
+    quotes ("a|b", '&&') stay part of their word. A redirection operator
+    carries its file descriptor: ("op", (">", 2)) for 2>.
+    """
+    tokens = []
+    word = []
+    in_word = False  # distinguishes an empty quoted word "" from no word
+    quoted = False   # a quoted digit cannot be a redirection fd ("2">x)
+    i = 0
+    n = len(command_input)
+
+    def end_word():
+        nonlocal word, in_word, quoted
+        if in_word:
+            tokens.append(("word", "".join(word)))
+        word, in_word, quoted = [], False, False
+
+    while i < n:
+        c = command_input[i]
+        if c in " \t\r\n":
+            end_word()
+            i += 1
+        elif c == "'":
+            end = command_input.find("'", i + 1)
+            if end == -1:
+                raise ParseError("No closing quotation")
+            word.append(command_input[i + 1:end])
+            in_word = quoted = True
+            i = end + 1
+        elif c == '"':
+            i += 1
+            while True:
+                if i >= n:
+                    raise ParseError("No closing quotation")
+                c = command_input[i]
+                if c == '"':
+                    break
+                if c == "\\" and i + 1 < n and command_input[i + 1] in '"\\$`':
+                    i += 1
+                    c = command_input[i]
+                word.append(c)
+                i += 1
+            in_word = quoted = True
+            i += 1
+        elif c == "\\":
+            if i + 1 >= n:
+                raise ParseError("No escaped character")
+            word.append(command_input[i + 1])
+            in_word = quoted = True
+            i += 2
+        elif c not in OPERATOR_CHARS:
+            run = PLAIN_RUN.match(command_input, i)
+            word.append(run.group())
+            in_word = True
+            i = run.end()
+        else:
+            op = next(o for o in OPERATORS if command_input.startswith(o, i))
+            if op in REDIRECTIONS:
+                # "2>" - a bare number glued to the operator is its file descriptor
+                fd = DEFAULT_FD[op]
+                if in_word and not quoted and "".join(word).isdigit():
+                    fd = int("".join(word))
+                    word, in_word = [], False
+                end_word()
+                tokens.append(("op", (op, fd)))
+            else:
+                end_word()
+                tokens.append(("op", op))
+            i += len(op)
+    end_word()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the token list: sequence → and-or → pipeline → command"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def sequence(self):
+        lists = []
+        while self.peek() is not None:
+            if self.peek() == ("op", ";"):
+                self.pos += 1  # empty statement, e.g. "ls ;; pwd"
+                continue
+            items = self.and_or()
+            background = False
+            token = self.peek()
+            if token == ("op", "&"):
+                background = True
+                self.pos += 1
+            elif token == ("op", ";"):
+                self.pos += 1
+            elif token is not None:
+                raise ParseError(f"syntax error near unexpected token '{token[1]}'")
+            lists.append(AndOrList(items, background))
+        return tuple(lists)
+
+    def and_or(self):
+        items = [(None, self.pipeline())]
+        while self.peek() in (("op", "&&"), ("op", "||")):
+            op = self.peek()[1]
+            self.pos += 1
+            items.append((op, self.pipeline()))
+        return tuple(items)
+
+    def pipeline(self):
+        commands = [self.command()]
+        while self.peek() == ("op", "|"):
+            self.pos += 1
+            commands.append(self.command())
+        return Pipeline(tuple(commands))
+
+    def command(self):
+        argv = []
+        redirects = []
+        while True:
+            token = self.peek()
+            if token is None:
+                break
+            kind, value = token
+            if kind == "word":
+                argv.append(value)
+                self.pos += 1
+            elif isinstance(value, tuple):
+                op, fd = value
+                self.pos += 1
+                target = self.peek()
+                if target is None or target[0] != "word":
+                    raise ParseError(f"syntax error: missing target for '{op}'")
+                self.pos += 1
+                if op == ">&":
+                    if not target[1].isdigit():
+                        raise ParseError(f"syntax error: '>&' needs a file descriptor, got '{target[1]}'")
+                    redirects.append(Redirect(fd, op, int(target[1])))
+                else:
+                    redirects.append(Redirect(fd, op, target[1]))
+            else:
+                break
+        if not argv:
+            if redirects:
+                raise ParseError("syntax error: missing command before redirection")
+            token = self.peek()
+            near = token[1] if token else "newline"
+            raise ParseError(f"syntax error near unexpected token '{near}'")
+        return Command(tuple(argv), tuple(redirects))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(command_input):
+    return _Parser(tokenize(command_input)).sequence()
+
 
 class CommandParser:
     @staticmethod
     def parse(command_input: str):
+        """
+        Parse a command line into a tuple of AndOrList nodes. Results are
+        immutable and cached by input string. Raises ParseError (a
+        ValueError) on unbalanced quotes or misplaced operators.
+        """
         # Special shorthand fix (Windows)
         if command_input.strip().lower() == "cd..":
             command_input = "cd .."
+        return _parse(command_input)
 
-        # Split chaining first
-        # e.g. "ls && pwd; echo hi" → ["ls && pwd", "echo hi"]
-        chain_parts = command_input.split(";")
-
-        commands = []
-        for part in chain_parts:
-            # Split "&&" → must succeed before next
-            subparts = part.split("&&")
-            for sub in subparts:
-                sub = sub.strip()
-                if not sub:
-                    continue
-
-                # Split pipes
-                pipe_parts = [shlex.split(p.strip()) for p in sub.split("|")]
-                commands.append({
-                    "pipe_chain": pipe_parts,
-                    "must_succeed": True if "&&" in part else False
-                })
-
-        return commands
+    @staticmethod
+    def cache_info():
+        return _parse.cache_info()
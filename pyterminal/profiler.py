@@ -0,0 +1,229 @@
+import os
+import json
+import math
+import time
+import threading
+import subprocess
+from collections import defaultdict
+
+from lazy import lazy_import
+
+psutil = lazy_import("psutil")
+
+# Seconds between RSS/CPU samples of a running external stage
+SAMPLE_INTERVAL = 0.02
+
+
+class StageProfile:
+    """Measurements for one pipeline stage; None where a value can't be known"""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind      # "external" or "builtin"
+        self.spawn = None     # seconds spent in Popen (fork + exec)
+        self.wall = None      # seconds from start to exit
+        self.cpu = None       # user + system seconds
+        self.peak_rss = None  # bytes, highest sample
+        self.bytes_out = None  # None for a kernel pipe straight into another process
+        self.source = None    # builtin stage this one pulls its input from
+        self.started = time.perf_counter()
+
+    def spawned(self):
+        self.spawn = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            "name": self.name, "kind": self.kind, "spawn": self.spawn, "wall": self.wall,
+            "cpu": self.cpu, "peak_rss": self.peak_rss, "bytes_out": self.bytes_out,
+        }
+
+
+class PipelineProfile:
+    """
+    Collects timings while one pipeline runs. External stages are watched
+    from a thread each (exit time, RSS and CPU via psutil); builtin stages
+    and the output sink are timed by wrapping their chunk iterators.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.stages = []
+        self.output_bytes = 0
+        self.output_time = 0.0
+        self._watchers = []
+        self._time = time.time()
+        self._started = time.perf_counter()
+        self._cpu = os.times()
+
+    def stage(self, name, kind):
+        stage = StageProfile(name, kind)
+        self.stages.append(stage)
+        return stage
+
+    def watch(self, stage, proc):
+        """Sample a running process until it exits"""
+        def run():
+            peak = 0
+            try:
+                process = psutil.Process(proc.pid)
+            except psutil.Error:
+                process = None
+            while True:
+                if process is not None:
+                    try:
+                        with process.oneshot():
+                            peak = max(peak, process.memory_info().rss)
+                            times = process.cpu_times()
+                            stage.cpu = times.user + times.system
+                    except psutil.Error:
+                        process = None  # already reaped: keep the last sample
+                try:
+                    proc.wait(timeout=SAMPLE_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    continue
+            stage.wall = time.perf_counter() - stage.started
+            stage.peak_rss = peak or None
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self._watchers.append(thread)
+
+    def count(self, stage, chunks):
+        """Pass chunks through, adding their bytes and (for builtins) the time spent producing them"""
+        stage.bytes_out = 0
+        wall = cpu = 0.0
+        iterator = iter(chunks)
+        try:
+            while True:
+                started, started_cpu = time.perf_counter(), time.thread_time()
+                try:
+                    chunk = next(iterator)
+                finally:
+                    wall += time.perf_counter() - started
+                    cpu += time.thread_time() - started_cpu
+                if isinstance(chunk, bytes):  # records are counted once rendered
+                    stage.bytes_out += len(chunk)
+                yield chunk
+        except StopIteration:
+            pass
+        finally:
+            if stage.kind == "builtin":
+                stage.wall, stage.cpu = wall, cpu
+
+    def sink(self, output):
+        """Wrap the output callable to count bytes and time spent rendering"""
+        def write(chunk):
+            started = time.perf_counter()
+            output(chunk)
+            self.output_time += time.perf_counter() - started
+            self.output_bytes += len(chunk)
+        return write
+
+    def finish(self, status):
+        """Stop measuring; returns the JSON-ready record"""
+        for thread in self._watchers:
+            thread.join(1.0)
+        wall = time.perf_counter() - self._started
+        cpu = os.times()
+        if self.stages and self.stages[-1].kind == "external":
+            self.stages[-1].bytes_out = self.output_bytes  # the shared stdout/stderr pipe
+        # A builtin pulling from another builtin ran that one inside its own next() calls
+        inclusive = {id(s): (s.wall, s.cpu) for s in self.stages}
+        for s in self.stages:
+            if s.source is not None and s.wall is not None:
+                source_wall, source_cpu = inclusive[id(s.source)]
+                s.wall = max(0.0, s.wall - (source_wall or 0.0))
+                s.cpu = max(0.0, s.cpu - (source_cpu or 0.0))
+        return {
+            "time": self._time,
+            "command": self.text,
+            "status": status,
+            "wall": wall,
+            # The shell's own CPU plus that of the reaped children
+            "user": (cpu.user - self._cpu.user) + (cpu.children_user - self._cpu.children_user),
+            "sys": (cpu.system - self._cpu.system) + (cpu.children_system - self._cpu.children_system),
+            "output_bytes": self.output_bytes,
+            "output_time": self.output_time,
+            "stages": [s.as_dict() for s in self.stages],
+        }
+
+
+def format_time(record):
+    """bash-style `time` report"""
+    lines = [""]
+    for label, key in (("real", "wall"), ("user", "user"), ("sys", "sys")):
+        minutes, seconds = divmod(record[key], 60)
+        lines.append(f"{label}\t{int(minutes)}m{seconds:.3f}s")
+    return "\n".join(lines) + "\n"
+
+
+def format_stages(record):
+    """Per-stage breakdown for `time -v`"""
+    def ms(value):
+        return f"{value * 1000:.1f}" if value is not None else "-"
+
+    lines = [f"{'STAGE':<16} {'KIND':<8} {'SPAWN ms':>9} {'WALL ms':>9} {'CPU ms':>9} {'PEAK RSS MB':>12} {'BYTES OUT':>10}"]
+    for s in record["stages"]:
+        rss = f"{s['peak_rss'] / (1024 ** 2):.1f}" if s["peak_rss"] else "-"
+        moved = str(s["bytes_out"]) if s["bytes_out"] is not None else "pipe"
+        lines.append(f"{s['name'][:16]:<16} {s['kind']:<8} {ms(s['spawn']):>9} {ms(s['wall']):>9} "
+                     f"{ms(s['cpu']):>9} {rss:>12} {moved:>10}")
+    lines.append(f"output: {record['output_bytes']} bytes, {record['output_time'] * 1000:.1f} ms writing")
+    return "\n".join(lines) + "\n"
+
+
+class ProfileLog:
+    """Append-only JSON-lines log of pipeline profiles"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.expanduser("~/.pyterminal_profile.jsonl")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(records, name=None):
+    """
+    Per-program rows of (name, runs, p50, p90, p99, max wall seconds,
+    median spawn seconds, max peak RSS), busiest program first.
+    """
+    walls = defaultdict(list)
+    spawns = defaultdict(list)
+    rss = defaultdict(int)
+    for record in records:
+        for stage in record.get("stages", ()):
+            if name and stage["name"] != name or stage["wall"] is None:
+                continue
+            walls[stage["name"]].append(stage["wall"])
+            if stage["spawn"] is not None:
+                spawns[stage["name"]].append(stage["spawn"])
+            rss[stage["name"]] = max(rss[stage["name"]], stage["peak_rss"] or 0)
+
+    rows = []
+    for program, values in walls.items():
+        values.sort()
+        spawn = sorted(spawns[program])
+        rows.append((
+            program, len(values),
+            percentile(values, 0.5), percentile(values, 0.9), percentile(values, 0.99), values[-1],
+            percentile(spawn, 0.5) if spawn else None, rss[program] or None,
+        ))
+    rows.sort(key=lambda row: -row[1] * row[2])
+    return rows
@@ -0,0 +1,483 @@
+"""
+Typed records for builtin pipelines: `ps | where cpu > 5 | sort rss -r | head 10`.
+
+When ps, ls or find feed a record stage they emit Record objects instead
+of text. A record holds a handle (a psutil.Process, a DirEntry) and the
+fields read so far; any other field is fetched the first time a stage
+asks for it, so `ps | where cpu gt 5` never reads memory counters and
+`ls | sort name` never stats a file. Text (or JSON/CSV) is produced once,
+after the last record stage.
+
+A record stream starts with a Table describing the records and how to
+print them; Error items (error messages) may appear between records and
+are passed through unchanged.
+"""
+import io
+import os
+import re
+import csv
+import json
+import stat
+import time
+import itertools
+
+from lazy import lazy_import
+
+psutil = lazy_import("psutil")
+
+# Records formatted per output chunk
+RENDER_BATCH = 256
+
+# Multipliers for size values in conditions: `where size gt 10M`
+SIZE_SUFFIXES = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+# Condition operators; the words avoid quoting, since a bare > is a redirection
+OPERATORS = {
+    "==": "==", "=": "==", "eq": "==",
+    "!=": "!=", "ne": "!=",
+    "<": "<", "lt": "<",
+    "<=": "<=", "le": "<=",
+    ">": ">", "gt": ">",
+    ">=": ">=", "ge": ">=",
+    "=~": "=~", "match": "=~",
+}
+
+# One quoted argument: `where 'cpu > 5'`
+_CONDITION = re.compile(r"^\s*(\w+)\s*(==|!=|<=|>=|=~|=|<|>)\s*(.*?)\s*$")
+
+
+class Error(bytes):
+    """A builtin stage's error message; record stages downstream pass it on as it is"""
+
+
+class Field:
+    """How one field is read from a record's handle and printed"""
+    __slots__ = ("fetch", "type", "width")
+
+    def __init__(self, fetch, type="text", width=0):
+        self.fetch = fetch
+        self.type = type  # text, int, float, size (bytes) or time (epoch seconds)
+        self.width = width
+
+
+class Kind:
+    """A record type: its fields by name"""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def check(self, name):
+        if name not in self.fields:
+            raise ValueError(f"unknown field '{name}' ({self.name} fields: {', '.join(self.fields)})")
+        return name
+
+
+class Record:
+    __slots__ = ("kind", "handle", "values")
+
+    def __init__(self, kind, handle, values):
+        self.kind = kind
+        self.handle = handle
+        self.values = values
+
+    def __getitem__(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            value = self.values[name] = self.kind.fields[name].fetch(self.handle)
+            return value
+
+
+class Table:
+    """First item of a record stream: the kind of record, the columns to print and the output format"""
+    __slots__ = ("kind", "columns", "format", "chosen")
+
+    def __init__(self, kind, columns, format="text"):
+        self.kind = kind
+        self.columns = list(columns)
+        self.format = format
+        self.chosen = False  # columns picked by `select`, which later stages leave alone
+
+    def show(self, name):
+        """Print a field a stage filtered or sorted on, unless `select` decided the columns"""
+        if not self.chosen and name not in self.columns:
+            self.columns.append(name)
+
+
+# -------- Record Kinds --------
+def _process(getter):
+    def fetch(proc):
+        try:
+            return getter(proc)
+        except (psutil.Error, OSError):
+            return None  # exited, or not ours to read
+    return fetch
+
+
+def _lifetime_cpu(proc):
+    """CPU% averaged over the process's lifetime, as ps reports it: no sampling interval to wait for"""
+    times = proc.cpu_times()
+    elapsed = time.time() - proc.create_time()
+    return (times.user + times.system) / elapsed * 100 if elapsed > 0 else 0.0
+
+
+PROCESS = Kind("process", {
+    "pid": Field(_process(lambda p: p.pid), "int", 7),
+    "name": Field(_process(lambda p: p.name()), "text", 25),
+    "status": Field(_process(lambda p: p.status()), "text", 10),
+    "user": Field(_process(lambda p: p.username()), "text", 12),
+    "ppid": Field(_process(lambda p: p.ppid()), "int", 7),
+    "cpu": Field(_process(_lifetime_cpu), "float", 6),
+    "mem": Field(_process(lambda p: p.memory_percent()), "float", 6),
+    "rss": Field(_process(lambda p: p.memory_info().rss), "size", 7),
+    "vms": Field(_process(lambda p: p.memory_info().vms), "size", 7),
+    "threads": Field(_process(lambda p: p.num_threads()), "int", 7),
+    "started": Field(_process(lambda p: p.create_time()), "time", 16),
+    "cmd": Field(_process(lambda p: " ".join(p.cmdline())), "text"),
+})
+
+
+class FileRef:
+    """DirEntry-like handle for a path that didn't come from scandir (find results, ls of a file)"""
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, path):
+        self.name = os.path.basename(path.rstrip(os.sep)) or path
+        self.path = path
+        self._stat = None
+
+    def stat(self, follow_symlinks=False):
+        if self._stat is None:
+            self._stat = os.lstat(self.path)
+        return self._stat
+
+    def is_symlink(self):
+        return stat.S_ISLNK(self.stat().st_mode)
+
+    def is_dir(self, follow_symlinks=False):
+        return stat.S_ISDIR(self.stat().st_mode)
+
+    def is_file(self, follow_symlinks=False):
+        return stat.S_ISREG(self.stat().st_mode)
+
+
+def _file(getter):
+    def fetch(entry):
+        try:
+            return getter(entry)
+        except OSError:
+            return None  # removed since it was listed
+    return fetch
+
+
+def _file_type(entry):
+    # DirEntry answers these from the directory listing, without a stat
+    if entry.is_symlink():
+        return "link"
+    if entry.is_dir(follow_symlinks=False):
+        return "dir"
+    return "file" if entry.is_file(follow_symlinks=False) else "other"
+
+
+FILE = Kind("file", {
+    "name": Field(lambda entry: entry.name, "text", 30),
+    "path": Field(lambda entry: entry.path, "text", 40),
+    "type": Field(_file(_file_type), "text", 5),
+    "size": Field(_file(lambda entry: entry.stat(follow_symlinks=False).st_size), "size", 7),
+    "modified": Field(_file(lambda entry: entry.stat(follow_symlinks=False).st_mtime), "time", 16),
+    "mode": Field(_file(lambda entry: stat.filemode(entry.stat(follow_symlinks=False).st_mode)), "text", 10),
+    "ext": Field(lambda entry: os.path.splitext(entry.name)[1], "text", 6),
+})
+
+
+# Record kind of each producer
+SOURCES = {"ps": PROCESS, "ls": FILE, "find": FILE}
+
+
+def head_count(args):
+    """Record count from `head` arguments (`10`, `-10`, `-n 10`; default 10), or None if they aren't those"""
+    if args[:1] == ["-n"]:
+        args = args[1:]
+        if len(args) != 1:
+            return None
+    if not args:
+        return 10
+    if len(args) == 1 and args[0].lstrip("-").isdigit() and args[0].count("-") <= 1:
+        return int(args[0].lstrip("-"))
+    return None
+
+
+def takes(cmd, args, kind):
+    """
+    Whether sort/head arguments ask for the record version: only field
+    names and -r for sort, only a count for head. Anything else (sort -u,
+    head -c 5) keeps the text meaning.
+    """
+    _, args = parse_format(args)
+    if cmd == "sort":
+        return all(arg == "-r" or arg in kind.fields for arg in args)
+    return head_count(args) is not None
+
+
+def processes(format="text"):
+    """Record stream for ps; pid, name and status come in one read per process"""
+    yield Table(PROCESS, ("pid", "name", "status"), format)
+    for proc in psutil.process_iter(["pid", "name", "status"]):
+        yield Record(PROCESS, proc, dict(proc.info))
+
+
+def files(entries, columns, format="text"):
+    """Record stream for ls/find from (shown path, DirEntry or FileRef) pairs"""
+    yield Table(FILE, columns, format)
+    status = 0
+    for shown, entry in entries:
+        if isinstance(entry, bytes):
+            yield Error(entry)  # error message from the producer
+            status = 1
+            continue
+        yield Record(FILE, entry, {"path": shown})
+    return status
+
+
+def parse_format(args):
+    """Strip --json/--csv; returns (format or None, other args)"""
+    format = None
+    rest = []
+    for arg in args:
+        if arg in ("--json", "--csv"):
+            format = arg[2:]
+        else:
+            rest.append(arg)
+    return format, rest
+
+
+def read(stdin, name, args=()):
+    """
+    A record stage's input as (table, iterator, other args); applies
+    --json/--csv from its args. The table is None when an upstream stage
+    failed before its records began: its error went to stderr (the input
+    is empty) or, after `2>&1`, comes first, and the stage passes it on.
+    """
+    stream = iter(stdin) if stdin is not None else iter(())
+    table = next(stream, None)
+    if isinstance(table, Error) or table is None and stdin is not None:
+        return None, itertools.chain([table] if table is not None else [], stream), args
+    if not isinstance(table, Table):
+        raise ValueError(f"expects records, e.g. ps | {name} ... (from ps, ls or find)")
+    format, rest = parse_format(args)
+    if format:
+        table.format = format
+    return table, stream, rest
+
+
+# -------- Record Stages --------
+def _number(field, raw):
+    if field.type == "size" and raw[-1:].upper() in SIZE_SUFFIXES:
+        return float(raw[:-1]) * SIZE_SUFFIXES[raw[-1].upper()]
+    if field.type == "time":
+        for pattern in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+            try:
+                return time.mktime(time.strptime(raw, pattern))
+            except ValueError:
+                pass
+    return float(raw)
+
+
+def condition(kind, args):
+    """`where` arguments as a predicate on records: (field, test)"""
+    if len(args) == 1 and _CONDITION.match(args[0]):
+        args = list(_CONDITION.match(args[0]).groups())
+    if len(args) != 3 or args[1] not in OPERATORS:
+        raise ValueError("usage: where <field> <op> <value>  (op: == != < <= > >= =~ or eq ne lt le gt ge match)")
+    name, op, raw = kind.check(args[0]), OPERATORS[args[1]], args[2]
+    field = kind.fields[name]
+    if op == "=~":
+        pattern = re.compile(raw)
+        return name, lambda value: value is not None and pattern.search(str(value)) is not None
+    if field.type != "text":
+        try:
+            wanted = _number(field, raw)
+        except ValueError:
+            raise ValueError(f"{name} needs a number, got '{raw}'") from None
+    else:
+        wanted = raw
+    test = {
+        "==": lambda value: value == wanted,
+        "!=": lambda value: value != wanted,
+        "<": lambda value: value < wanted,
+        "<=": lambda value: value <= wanted,
+        ">": lambda value: value > wanted,
+        ">=": lambda value: value >= wanted,
+    }[op]
+    return name, lambda value: value is not None and test(value)
+
+
+def where(args, stdin):
+    """Keep the records whose field passes the condition"""
+    table, stream, args = read(stdin, "where", args)
+    if table is None:
+        yield from stream
+        return 1
+    name, test = condition(table.kind, args)
+    table.show(name)
+    yield table
+    for record in stream:
+        if isinstance(record, bytes) or test(record[name]):
+            yield record
+
+
+def select(args, stdin):
+    """Print only these fields, in this order"""
+    table, stream, args = read(stdin, "select", args)
+    if table is None:
+        yield from stream
+        return 1
+    if not args:
+        raise ValueError(f"usage: select <field> ...  ({table.kind.name} fields: {', '.join(table.kind.fields)})")
+    table.columns = [table.kind.check(name) for name in args]
+    table.chosen = True
+    yield table
+    yield from stream
+
+
+def sort(args, stdin):
+    """Order the records by one or more fields (-r: descending); missing values go last"""
+    table, stream, args = read(stdin, "sort", args)
+    if table is None:
+        yield from stream
+        return 1
+    reverse = "-r" in args
+    names = [table.kind.check(name) for name in args if name != "-r"] or table.columns[:1]
+    for name in names:
+        table.show(name)
+    yield table
+    rows = []
+    for record in stream:
+        if isinstance(record, bytes):
+            yield record
+        else:
+            rows.append(record)
+    # Stable sorts from the last key to the first; None sorts after any value either way
+    for name in reversed(names):
+        present = [r for r in rows if r[name] is not None]
+        missing = [r for r in rows if r[name] is None]
+        present.sort(key=lambda r: r[name], reverse=reverse)
+        rows = present + missing
+    yield from rows
+
+
+def head(args, stdin):
+    """The first N records (`head 10`, `head -n 10`, `head -10`; default 10)"""
+    table, stream, args = read(stdin, "head", args)
+    if table is None:
+        yield from stream
+        return 1
+    limit = head_count(args)
+    if limit is None:
+        raise ValueError("usage: head [-n] [count]")
+    yield table
+    if limit == 0:
+        return
+    taken = 0
+    for record in stream:
+        yield record
+        if not isinstance(record, bytes):
+            taken += 1
+            if taken == limit:
+                break  # stops the producer: the rest is never listed or fetched
+
+
+def count(args, stdin):
+    """Number of records"""
+    table, stream, args = read(stdin, "count", args)
+    if table is None:
+        yield from stream
+        return 1
+    if args:
+        raise ValueError("usage: count")
+    total = 0
+    for record in stream:
+        if isinstance(record, bytes):
+            yield record
+        else:
+            total += 1
+    yield f"{total}\n".encode()
+
+
+# -------- Output --------
+def _size(n):
+    for unit in ("", "K", "M", "G", "T"):
+        if n < 1024 or unit == "T":
+            return f"{n:.0f}" if not unit else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def text(field, value):
+    if value is None:
+        return "-"
+    if field.type == "float":
+        return f"{value:.1f}"
+    if field.type == "size":
+        return _size(value)
+    if field.type == "time":
+        return time.strftime("%Y-%m-%d %H:%M", time.localtime(value))
+    return str(value)
+
+
+def _formatter(table):
+    """(header bytes, function formatting a batch of records) for the table's output format"""
+    fields = [(name, table.kind.fields[name]) for name in table.columns]
+    if table.format == "json":
+        def rows(batch):
+            return "".join(json.dumps({name: record[name] for name, _ in fields}) + "\n" for record in batch)
+        return b"", rows
+    if table.format == "csv":
+        def rows(batch):
+            out = io.StringIO()
+            csv.writer(out, lineterminator="\n").writerows([record[name] for name, _ in fields] for record in batch)
+            return out.getvalue()
+        return (",".join(table.columns) + "\n").encode(), rows
+    if len(fields) == 1:
+        # A bare list, as ls and find print it, ready for the next command
+        name, field = fields[0]
+        return b"", lambda batch: "".join(text(field, record[name]) + "\n" for record in batch)
+
+    widths = [max(field.width, len(name)) for name, field in fields]
+    right = [field.type != "text" for _, field in fields]
+
+    def line(cells):
+        padded = [cell.rjust(w) if r else cell.ljust(w) for cell, w, r in zip(cells, widths, right)]
+        padded[-1] = cells[-1] if not right[-1] else padded[-1]  # no trailing spaces
+        return " ".join(padded) + "\n"
+
+    def rows(batch):
+        return "".join(line([text(field, record[name]) for name, field in fields]) for record in batch)
+    return line([name.upper() for name, _ in fields]).encode(), rows
+
+
+def render(stream):
+    """Format a record stream as bytes chunks; returns the producer's status"""
+    rows = None
+    batch = []
+    while True:
+        try:
+            item = next(stream)
+        except StopIteration as stop:
+            if batch:
+                yield rows(batch).encode()
+            return stop.value
+        if isinstance(item, Table):
+            header, rows = _formatter(item)
+            if header:
+                yield header
+        elif isinstance(item, bytes):
+            if batch:
+                yield rows(batch).encode()
+                batch = []
+            yield item
+        else:
+            batch.append(item)
+            if len(batch) >= RENDER_BATCH:
+                yield rows(batch).encode()
+                batch = []
@@ -0,0 +1,114 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from parser import CommandParser
+from executor import CommandExecutor, write_stdout
+
+
+class ScriptError(Exception):
+    pass
+
+
+class ScriptRunner:
+    """
+    Non-interactive execution of command files (`main.py run script.pyt`)
+    and single command strings (`main.py -c "cmd"`), without readline,
+    history or prompt setup.
+
+    The whole script is parsed before the first line runs, so a syntax
+    error on line 200 aborts the script instead of leaving it half done.
+    Lists ending in `&` are the explicit opt-in to concurrency: they start
+    on a worker pool with their own executor and buffered output, which is
+    written out in one piece when they finish. A `wait` line (and the end
+    of the script) waits for all of them.
+    """
+
+    def __init__(self, stop_on_error=False, workers=None):
+        self.stop_on_error = stop_on_error
+        self.output_lock = threading.Lock()
+        self.executor = CommandExecutor(output=self.write)
+        # Background lines mostly wait on child processes, so don't cap at the CPU count
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = []
+
+    @staticmethod
+    def compile(lines, name="<script>"):
+        """Parse every line up front; returns [(line number, parsed)]"""
+        program = []
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                program.append((number, CommandParser.parse(line)))
+            except ValueError as e:
+                raise ScriptError(f"{name}:{number}: {e}")
+        return program
+
+    def run_file(self, path):
+        try:
+            if path == "-":
+                lines = sys.stdin.read().splitlines()
+            else:
+                with open(path, encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+        except OSError as e:
+            raise ScriptError(f"run: {e}")
+        return self.run(self.compile(lines, path))
+
+    def run_command(self, text):
+        return self.run(self.compile([text], "-c"))
+
+    def run(self, program):
+        """Execute a compiled program; returns the shell-style exit status"""
+        status = 0
+        try:
+            for number, parsed in program:
+                for and_or in parsed:
+                    if and_or.background:
+                        # The line starts from the script's cwd and environment as they are now
+                        chunks = []
+                        executor = self.job_executor(chunks.append)
+                        self.pending.append(self.pool.submit(self.run_background, and_or, executor, chunks))
+                    elif self.is_wait(and_or):
+                        status = self.wait()
+                    else:
+                        status = self.executor.execute((and_or,))
+                    if status != 0 and self.stop_on_error:
+                        return status
+            waited = self.wait()
+            return status or waited
+        finally:
+            self.pool.shutdown(wait=True)
+
+    @staticmethod
+    def is_wait(and_or):
+        items = and_or.items
+        return len(items) == 1 and len(items[0][1].commands) == 1 and items[0][1].commands[0].argv == ("wait",)
+
+    def job_executor(self, output):
+        """Private executor for an `&` list, starting from a copy of the script's cwd and environment"""
+        shell = self.executor
+        executor = CommandExecutor(output=output, cwd=shell.cwd, env=shell.env, color=shell.color)
+        executor.background = True
+        executor._parent, executor.lister = shell, shell.lister
+        return executor
+
+    def run_background(self, and_or, executor, chunks):
+        """Run one `&` list on its private executor, then write its output in one piece"""
+        status = executor.execute((and_or._replace(background=False),))
+        self.write(b"".join(chunks))
+        return status
+
+    def write(self, chunk):
+        with self.output_lock:
+            write_stdout(chunk)
+
+    def wait(self):
+        """Wait for all background lists; nonzero if any of them failed"""
+        status = 0
+        for future in self.pending:
+            status = status or future.result()
+        self.pending = []
+        return status
@@ -0,0 +1,280 @@
+"""
+`main.py serve`: a long-lived shell behind a Unix domain socket, so tools
+firing many short commands skip interpreter startup, imports and executor
+construction on every call. Each connection is a session with its own
+executor (cwd, environment, jobs) started from the client's cwd and
+environment; the directory listing cache, the filename index, the metrics
+sampler and the history are shared by all of them and stay warm between
+calls.
+"""
+import os
+import sys
+import stat
+import time
+import queue
+import signal
+import socket
+import struct
+import importlib
+import threading
+
+import client
+from parser import CommandParser
+from executor import CommandExecutor
+
+# Seconds without a command before the server exits (0: never)
+IDLE_TIMEOUT = 15 * 60
+
+# How often the accept loop wakes up to check the idle timer
+ACCEPT_POLL = 1.0
+
+# Imported at startup so the first command doesn't pay for them
+WARM_MODULES = ("subprocess", "textops", "records", "fileops", "finder", "concurrent.futures")
+
+
+class ClientSession:
+    """
+    One connection. A reader thread takes frames off the socket (so an
+    interrupt arrives while a command runs) and a worker thread runs the
+    commands in order, streaming their output back.
+    """
+
+    def __init__(self, server, conn):
+        self.server = server
+        self.conn = conn
+        self.executor = None
+        self.commands = queue.Queue()
+        self._send_lock = threading.Lock()
+
+    def send(self, kind, payload=b""):
+        with self._send_lock:
+            client.write_frame(self.conn, kind, payload)
+
+    def output(self, chunk):
+        try:
+            self.send(client.OUTPUT, chunk)
+        except OSError:
+            self.executor.cancel()  # client went away: stop the command
+
+    def start(self, hello):
+        cwd, *variables = [os.fsdecode(item) for item in hello.split(b"\0")]
+        env = dict(variable.split("=", 1) for variable in variables)
+        # Output goes to tools as often as to terminals: no colour
+        executor = CommandExecutor(output=self.output, cwd=cwd, env=env, color=False)
+        # No terminal to share: children get no stdin and their own process group
+        executor.background = True
+        # The finder, metrics sampler and history are the server's: one of each,
+        # however many clients come and go
+        warm = self.server.executor
+        executor._parent, executor.lister, executor.profile_log = warm, warm.lister, warm.profile_log
+        self.executor = executor
+
+    def serve(self):
+        """Reader thread: runs until the client disconnects"""
+        worker = None
+        try:
+            kind, payload = client.read_frame(self.conn)
+            if kind != client.HELLO:
+                return
+            self.start(payload)
+            worker = threading.Thread(target=self.run_commands, daemon=True)
+            worker.start()
+            while True:
+                kind, payload = client.read_frame(self.conn)
+                if kind == client.RUN:
+                    self.commands.put(payload.decode(errors="replace"))
+                elif kind == client.INTERRUPT:
+                    self.executor.cancel()
+        except (EOFError, OSError, ValueError, KeyError):
+            pass  # disconnected, or not speaking the protocol
+        finally:
+            try:
+                while True:  # nobody is left to see the rest of the queue
+                    self.commands.get_nowait()
+            except queue.Empty:
+                pass
+            if self.executor is not None:
+                self.executor.cancel()
+                self.executor.jobs.shutdown()
+            self.commands.put(None)
+            if worker is not None:
+                worker.join()
+            self.conn.close()
+            self.server.finished(self)
+
+    def run_commands(self):
+        while True:
+            line = self.commands.get()
+            if line is None:
+                return
+            self.server.begin()
+            try:
+                self.run_line(line)
+            finally:
+                self.server.end()
+
+    def run_line(self, line):
+        try:
+            parsed = CommandParser.parse(line)
+        except ValueError as e:
+            self.reply(client.ERROR, f"pyterminal: {e}".encode(), status=2)
+            return
+        try:
+            status = self.executor.execute(parsed)
+        except Exception as e:
+            self.output(f"error: {e}\n".encode())
+            status = 1
+        for text in self.executor.jobs.notifications():
+            self.output(f"{text}\n".encode())
+        self.reply(status=status)
+
+    def reply(self, kind=None, payload=b"", status=0):
+        try:
+            if kind is not None:
+                self.send(kind, payload)
+            self.send(client.STATUS, str(status).encode())
+        except OSError:
+            pass
+
+
+class CommandServer:
+    def __init__(self, path=None, idle_timeout=IDLE_TIMEOUT):
+        self.path = path or client.socket_path()
+        self.idle_timeout = idle_timeout
+        self.sessions = set()
+        self.running = 0  # commands in progress, over all sessions
+        self._lock = threading.Lock()
+        self._last_active = time.monotonic()
+        # Holds the caches every session shares
+        self.executor = CommandExecutor()
+        for name in WARM_MODULES:
+            importlib.import_module(name)
+
+    def touch(self):
+        with self._lock:
+            self._last_active = time.monotonic()
+
+    def begin(self):
+        """A command started; the server is not idle until it ends"""
+        with self._lock:
+            self.running += 1
+
+    def end(self):
+        with self._lock:
+            self.running -= 1
+            self._last_active = time.monotonic()
+
+    def finished(self, session):
+        with self._lock:
+            self.sessions.discard(session)
+
+    def idle(self):
+        """No command running or run for idle_timeout; connected but quiet clients don't count"""
+        with self._lock:
+            return (self.idle_timeout and not self.running
+                    and time.monotonic() - self._last_active >= self.idle_timeout)
+
+    def close(self):
+        """Drop the clients still connected and stop the shared sampler and history"""
+        with self._lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            try:
+                session.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        warm = self.executor
+        if warm._metrics is not None:
+            warm._metrics.stop()
+        if warm._history is not None:
+            warm._history.close()
+
+    def bind(self):
+        """Listening socket only this user can connect to; refuses to take over a live server"""
+        if os.path.exists(self.path):
+            if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+                raise OSError(f"{self.path} exists and is not a socket")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                raise OSError(f"a server is already listening on {self.path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)  # left behind by a server that died
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        listener.listen()
+        listener.settimeout(ACCEPT_POLL)
+        return listener
+
+    @staticmethod
+    def same_user(conn):
+        """On Linux, check the peer's uid as well as the socket's permissions"""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        return struct.unpack("3i", creds)[1] == os.getuid()
+
+    def serve_forever(self):
+        listener = self.bind()
+        # `kill` should remove the socket too
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        idle = f"idle shutdown after {self.idle_timeout:g}s" if self.idle_timeout else "no idle shutdown"
+        print(f"pyterminal: serving on {self.path} ({idle})", flush=True)
+        try:
+            while not self.idle():
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                if not self.same_user(conn):
+                    conn.close()
+                    continue
+                session = ClientSession(self, conn)
+                with self._lock:
+                    self.sessions.add(session)
+                self.touch()  # a new client is about to send a command
+                threading.Thread(target=session.serve, daemon=True).start()
+            print("pyterminal: idle, shutting down", flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.close()
+
+
+def main(args):
+    """`main.py serve [-s socket] [--idle seconds]`"""
+    path = None
+    idle = IDLE_TIMEOUT
+    try:
+        it = iter(args)
+        for arg in it:
+            if arg in ("-s", "--socket"):
+                path = next(it)
+            elif arg == "--idle":
+                idle = float(next(it))
+            else:
+                raise ValueError(arg)
+    except (StopIteration, ValueError):
+        print("Usage: main.py serve [-s socket] [--idle seconds (0: never)]", file=sys.stderr)
+        return 2
+    if not hasattr(socket, "AF_UNIX"):
+        print("pyterminal: serve needs Unix domain sockets, which this platform lacks", file=sys.stderr)
+        return 2
+    try:
+        CommandServer(path, idle).serve_forever()
+    except OSError as e:
+        print(f"pyterminal: {e}", file=sys.stderr)
+        return 1
+    return 0
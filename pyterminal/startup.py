@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import subprocess
+
+# Budget for importing the shell and building the interactive CLI, in ms
+STARTUP_BUDGET_MS = 50
+
+# Modules that must stay out of startup; they load on first use
+DEFERRED_MODULES = (
+    "psutil", "zipfile", "colorama", "subprocess", "finder", "monitor", "archiver", "fileops", "textops", "records",
+    "concurrent.futures",
+)
+
+# Run in a fresh interpreter: the time from the first pyterminal import to a
+# CLI that is ready to draw its prompt, plus which deferred modules got loaded
+PROBE = """
+import sys, time
+started = time.perf_counter()
+from cli import CommandLineInterface
+cli = CommandLineInterface()
+cli._load_history()
+elapsed = time.perf_counter() - started
+import json
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(text, root="cli"):
+    """
+    Rows of (self_us, cumulative_us, depth, module) for everything imported
+    under `root`, from `python -X importtime` output. Imports are printed
+    children first, so root's subtree is the run of rows ending at root.
+    """
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[0].strip().isdigit():
+            continue  # the column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0 and name.strip() != root:
+            rows = []  # an unrelated top-level import (site, encodings, ...)
+            continue
+        rows.append((int(fields[0]), int(fields[1]), depth, name.strip()))
+        if depth == 0:
+            break
+    return rows
+
+
+def probe(importtime=False):
+    """Run PROBE once in a child interpreter; returns (result dict, importtime rows)"""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+    # Measure a normal start, which loads cached bytecode instead of compiling
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    proc = subprocess.run(command, cwd=HERE, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), parse_importtime(proc.stderr)
+
+
+def report(runs=5, budget_ms=STARTUP_BUDGET_MS, top=15):
+    """
+    Yield a startup report: median time to a ready CLI over `runs` fresh
+    interpreters, the slowest imports, and any deferred module that was
+    loaded anyway. The final line is PASS or FAIL against budget_ms.
+    """
+    times = []
+    loaded = set()
+    probe()  # warm-up: writes bytecode caches and fills the OS file cache
+    for _ in range(runs):
+        result, _ = probe()
+        times.append(result["ms"])
+        loaded.update(result["loaded"])
+    times.sort()
+    median = times[len(times) // 2]
+
+    _, rows = probe(importtime=True)
+    yield f"startup: {median:.1f} ms median over {runs} runs (min {times[0]:.1f}, max {times[-1]:.1f})"
+    yield ""
+    yield f"{'self ms':>8} {'total ms':>9}  module (slowest imports under cli)"
+    for self_us, total_us, depth, name in sorted(rows, key=lambda r: -r[0])[:top]:
+        yield f"{self_us / 1000:>8.1f} {total_us / 1000:>9.1f}  {'  ' * depth}{name}"
+    yield ""
+    if loaded:
+        yield f"deferred modules loaded at startup: {', '.join(sorted(loaded))}"
+    ok = median <= budget_ms and not loaded
+    yield f"{'PASS' if ok else 'FAIL'}: budget {budget_ms:g} ms"
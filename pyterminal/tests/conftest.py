@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import CommandExecutor  # noqa: E402
+from parser import CommandParser  # noqa: E402  (pyterminal/parser.py, not the stdlib module)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """tree/a (1 byte), tree/b (2 bytes) and tree/sub/c under the test's directory"""
+    root = tmp_path / "tree"
+    (root / "sub").mkdir(parents=True)
+    (root / "a").write_text("x")
+    (root / "b").write_text("yy")
+    (root / "sub" / "c").write_text("z")
+    return root
+
+
+@pytest.fixture
+def shell(tmp_path):
+    """Runs command lines in one session started in the test's directory; returns (status, output)"""
+    chunks = []
+    executor = CommandExecutor(output=chunks.append, cwd=str(tmp_path))
+    executor.background = True  # no terminal for children to read from
+
+    def run(line):
+        chunks.clear()
+        status = executor.execute(CommandParser.parse(line))
+        return status, b"".join(chunks).decode()
+    run.executor = executor
+    return run
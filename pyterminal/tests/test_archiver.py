@@ -0,0 +1,57 @@
+import zlib
+import struct
+import zipfile
+
+import pytest
+
+import archiver
+
+
+def test_bzip2_level_0_for_streamed_and_pooled_members(tree, monkeypatch):
+    (tree / "big").write_bytes(b"0123456789" * 1000)
+    # "big" goes through zipfile itself, the small files through the worker pool
+    monkeypatch.setattr(archiver, "LARGE_MEMBER", 5000)
+    zipper = archiver.ZipArchiver(workers=1)
+    members = ["a", "b", "big", "sub", "sub/c"]
+    list(zipper.create("out.zip", members, method=zipfile.ZIP_BZIP2, level=0, base=str(tree)))
+
+    with zipfile.ZipFile(tree / "out.zip") as zf:
+        assert zf.testzip() is None
+        assert zf.read("big") == b"0123456789" * 1000
+        assert zf.read("sub/c") == b"z"
+
+
+def test_large_deflate_member_is_compressed_in_pieces(tree, monkeypatch):
+    data = bytes(range(256)) * 40 + b"tail"
+    (tree / "big").write_bytes(data)
+    monkeypatch.setattr(archiver, "LARGE_MEMBER", 5000)
+    monkeypatch.setattr(archiver, "LARGE_CHUNK", 3000)
+    zipper = archiver.ZipArchiver(workers=2)
+    list(zipper.create("out.zip", ["big", "a", "b"], base=str(tree)))
+
+    with zipfile.ZipFile(tree / "out.zip") as zf:
+        assert zf.testzip() is None
+        assert zf.getinfo("big").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("big") == data
+        assert zf.read("b") == b"yy"
+
+
+@pytest.mark.parametrize("method", [zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA])
+def test_local_headers_match_the_central_directory(tree, method):
+    zipper = archiver.ZipArchiver(workers=1)
+    list(zipper.create("out.zip", ["a", "b", "sub/c"], method=method, base=str(tree)))
+
+    raw = (tree / "out.zip").read_bytes()
+    with zipfile.ZipFile(tree / "out.zip") as zf:
+        assert [zf.read(name) for name in ("a", "b", "sub/c")] == [b"x", b"yy", b"z"]
+        for info in zf.infolist():
+            # local file header: signature, version, flags, method, time, date, crc, sizes
+            header = struct.unpack("<4s5H3L", raw[info.header_offset:info.header_offset + 26])
+            assert header[0] == b"PK\x03\x04"
+            assert header[2:4] == (info.flag_bits, info.compress_type)
+            assert header[6:9] == (info.CRC, info.compress_size, info.file_size)
+
+
+def test_crc32_combine():
+    first, second = b"abc" * 100, b"defg" * 333
+    assert archiver.crc32_combine(zlib.crc32(first), zlib.crc32(second), len(second)) == zlib.crc32(first + second)
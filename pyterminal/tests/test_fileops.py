@@ -0,0 +1,31 @@
+import os
+
+import fileops
+
+
+def test_remove_keeps_going_after_a_failed_unlink(tree, monkeypatch):
+    blocked = str(tree / "b")
+    real_unlink = os.unlink
+
+    def unlink(path, *args, **kwargs):
+        if path == blocked:
+            raise PermissionError(13, "Permission denied", path)
+        return real_unlink(path, *args, **kwargs)
+
+    monkeypatch.setattr(fileops.os, "unlink", unlink)
+    ops = fileops.FileOps(workers=1, cwd=str(tree.parent))
+    run = ops.remove([str(tree)], recursive=True)
+    lines = []
+    try:
+        while True:
+            lines.append(next(run))
+    except StopIteration as stop:
+        failures = stop.value
+
+    # Everything else in the batch went; the blocked file and its directory are reported
+    assert not (tree / "a").exists() and not (tree / "sub").exists()
+    assert (tree / "b").exists()
+    assert failures == 2
+    assert "rm: 'tree/b': Permission denied" in lines
+    assert "rm: 'tree': Directory not empty" in lines
+    assert "rm: removed 2 files, 1 directories" in lines[-1]
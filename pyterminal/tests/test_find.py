@@ -0,0 +1,16 @@
+def test_find_dir_with_type(shell, tree):
+    status, output = shell("find tree -type f")
+    assert status == 0
+    assert sorted(output.split()) == ["tree/a", "tree/b", "tree/sub/c"]
+
+
+def test_find_type_only_searches_cwd(shell, tree):
+    status, output = shell("find -type d")
+    assert status == 0
+    assert "./tree/sub" in output.split()
+
+
+def test_find_lone_name_is_substring_under_cwd(shell, tree):
+    status, output = shell("find sub")
+    assert status == 0
+    assert output.split() == ["./tree/sub"]
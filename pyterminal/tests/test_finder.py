@@ -0,0 +1,41 @@
+import sys
+import pickle
+import threading
+
+import finder
+
+
+def test_concurrent_indexed_searches_share_one_finder(tmp_path):
+    # Many directories, so searches overlap with each other's index updates and saves
+    for i in range(60):
+        for j in range(50):
+            (tmp_path / "tree" / f"d{i}" / f"e{j}").mkdir(parents=True)
+    index = tmp_path / "index"
+    shared = finder.FileFinder(index_path=str(index), workers=4)
+    matcher = finder.FileFinder.build_matcher(name="e")
+    errors = []
+    counts = []
+
+    def search(n):
+        try:
+            for _ in range(5):
+                root = str(tmp_path / "tree" / f"d{n}") if n % 2 else str(tmp_path / "tree")
+                counts.append(len(list(shared.search(root, matcher, use_index=True))))
+                (tmp_path / "tree" / f"d{n}" / "e0" / f"new{len(counts)}").mkdir()  # dirty the index again
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=search, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    with open(index, "rb") as f:
+        assert isinstance(pickle.load(f), dict)
@@ -0,0 +1,37 @@
+import history
+
+
+def store_with(tmp_path, commands):
+    store = history.HistoryStore(str(tmp_path / "history.db"))
+    for when, command in enumerate(commands):
+        store.record(command, float(when), 0.1, str(tmp_path), 0)
+    return store
+
+
+def test_search_ranks_substrings_before_subsequences(tmp_path):
+    store = store_with(tmp_path, ["git checkout main", "grep foo", "echo gco"])
+    assert store.search("gco") == ["echo gco", "git checkout main"]
+    assert store.search("gcom") == ["git checkout main"]  # narrowed from the "gco" matches
+    store.close()
+
+
+def test_search_beyond_the_window_finds_substrings(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "SEARCH_WINDOW", 3)
+    store = store_with(tmp_path, ["git checkout old", "make deploy"] + [f"ls {i}" for i in range(5)])
+    assert store.text_index
+    assert store.search("ls 1") == ["ls 1"]
+    assert store.search("deploy") == ["make deploy"]  # older than the window, found by the trigram index
+    assert store.search("gco") == []  # a subsequence match older than the window is not scanned
+    assert store.search("ls") == ["ls 4", "ls 3", "ls 2"]
+    store.close()
+
+
+def test_existing_history_gets_the_trigram_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "SEARCH_WINDOW", 1)
+    store = store_with(tmp_path, ["make deploy", "ls"])
+    with store.db:
+        store.db.execute("DROP TABLE commands_text")
+    store.close()
+    store = history.HistoryStore(str(tmp_path / "history.db"))
+    assert store.search("deploy") == ["make deploy"]
+    store.close()
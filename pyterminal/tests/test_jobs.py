@@ -0,0 +1,9 @@
+def test_job_shares_caches_created_after_it_started(shell):
+    status, _ = shell("true &")
+    assert status == 0
+    job = shell.executor.jobs.list()[0]
+    assert shell.executor._finder is None  # nothing has searched yet
+
+    # Whichever side creates them first, both end up with the same objects
+    assert job.executor.finder is shell.executor.finder
+    assert shell.executor.metrics is job.executor.metrics
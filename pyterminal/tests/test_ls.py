@@ -0,0 +1,19 @@
+def test_piped_ls_has_no_colour(shell, tree):
+    shell.executor.color = True  # as on a terminal
+    status, output = shell("ls tree | cat")
+    assert status == 0
+    assert output == "a\nb\nsub\n"
+    assert "\x1b[" not in output
+
+
+def test_redirected_ls_has_no_colour(shell, tree, tmp_path):
+    shell.executor.color = True
+    status, _ = shell("ls tree > listing.txt")
+    assert status == 0
+    assert (tmp_path / "listing.txt").read_text() == "a\nb\nsub\n"
+
+
+def test_ls_colours_directories_on_a_terminal(shell, tree):
+    shell.executor.color = True
+    _, output = shell("ls -1 tree")
+    assert "\x1b[" in output
@@ -0,0 +1,28 @@
+import time
+
+import executor
+from monitor import MetricsSampler, Sample
+
+
+def sample(age):
+    return Sample(time.time() - age, 10.0, (10.0,), 50.0, 0, 0.0, 0.0, 0.0, 0.0)
+
+
+def test_latest_only_while_running_and_fresh(monkeypatch):
+    sampler = MetricsSampler(interval=1.0)
+    sampler.history.append(sample(0))
+    assert sampler.latest() is None  # stopped
+
+    monkeypatch.setattr(MetricsSampler, "running", property(lambda self: True))
+    assert sampler.latest() is sampler.history[-1]
+    sampler.history.append(sample(5))
+    assert sampler.latest() is None  # older than one interval
+
+
+def test_cpu_measures_again_after_metrics_stop(shell, monkeypatch):
+    shell("metrics start -i 0.05")
+    time.sleep(0.2)
+    shell("metrics stop")
+    assert shell.executor.metrics.history
+    monkeypatch.setattr(executor.psutil, "cpu_percent", lambda interval=None, percpu=False: 42.0)
+    assert shell("cpu")[1] == "CPU Usage: 42.0%\n"
@@ -0,0 +1,29 @@
+def test_sort_with_text_flags_stays_text(shell, tree):
+    status, output = shell("ls tree | sort -u")
+    assert status == 0
+    assert output == "a\nb\nsub\n"
+
+
+def test_head_with_byte_count_stays_text(shell, tree):
+    status, output = shell("ls tree | head -c 3")
+    assert status == 0
+    assert output == "a\nb"
+
+
+def test_record_sort_and_head(shell, tree):
+    status, output = shell("ls tree | sort size -r | head 1 | select name")
+    assert status == 0
+    assert output == "sub\n"
+
+
+def test_upstream_record_error_is_passed_on(shell, tree):
+    status, output = shell("ls tree | where nosuch gt 1 | head -n 2")
+    assert status == 1
+    assert output.startswith("where: unknown field 'nosuch'")
+    assert "expects records" not in output
+
+
+def test_text_input_to_record_stage(shell):
+    status, output = shell("echo a | where x gt 1")
+    assert status == 1
+    assert "expects records" in output
@@ -0,0 +1,26 @@
+def test_builtin_error_is_not_written_to_stdout_file(shell, tmp_path):
+    status, output = shell("cat nosuch > out.txt")
+    assert status == 1
+    assert output == "cat: nosuch: No such file or directory\n"
+    assert (tmp_path / "out.txt").read_text() == ""
+
+
+def test_builtin_stderr_redirect(shell, tmp_path):
+    status, output = shell("cat nosuch 2> err.txt")
+    assert (status, output) == (1, "")
+    assert (tmp_path / "err.txt").read_text() == "cat: nosuch: No such file or directory\n"
+
+    status, output = shell("ls nosuch 2>/dev/null")
+    assert (status, output) == (1, "")
+
+
+def test_builtin_stderr_to_stdout(shell, tmp_path):
+    (tmp_path / "a").write_text("hi\n")
+    shell("cat a nosuch > out.txt 2>&1")
+    assert (tmp_path / "out.txt").read_text() == "hi\ncat: nosuch: No such file or directory\n"
+    assert shell("cat nosuch 2>&1 | wc -l")[1].split() == ["1"]
+
+
+def test_builtin_errors_skip_the_next_stage(shell):
+    status, output = shell("cat nosuch | wc -l")
+    assert output.splitlines() == ["cat: nosuch: No such file or directory", "0"]
@@ -0,0 +1,68 @@
+import os
+import time
+import socket
+import threading
+
+import pytest
+
+import client
+from server import ClientSession, CommandServer
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets")
+
+
+def hello(path):
+    return b"\0".join([os.fsencode(str(path)), b"HOME=" + os.fsencode(str(path))])
+
+
+def test_sessions_share_the_servers_sampler_and_history(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    server = CommandServer(str(tmp_path / "sock"))
+    sessions = []
+    sockets = []
+    for _ in range(2):
+        ours, theirs = socket.socketpair()
+        sockets += [ours, theirs]
+        session = ClientSession(server, ours)
+        session.start(hello(tmp_path))
+        sessions.append(session.executor)
+    first, second = sessions
+    assert first.metrics is second.metrics is server.executor.metrics
+    assert first.history is second.history is server.executor.history
+    assert first._metrics is None and first._history is None
+
+    first.metrics.start(interval=0.05)
+    server.close()
+    assert not second.metrics.running
+    for sock in sockets:
+        sock.close()
+
+
+def test_disconnect_ends_the_session(tmp_path):
+    server = CommandServer(str(tmp_path / "sock"))
+    ours, theirs = socket.socketpair()
+    session = ClientSession(server, ours)
+    server.sessions.add(session)
+    thread = threading.Thread(target=session.serve)
+    thread.start()
+    client.write_frame(theirs, client.HELLO, hello(tmp_path))
+    client.write_frame(theirs, client.RUN, b"echo hi")
+    frames = []
+    while not frames or frames[-1][0] != client.STATUS:
+        frames.append(client.read_frame(theirs))
+    assert frames == [(client.OUTPUT, b"hi\n"), (client.STATUS, b"0")]
+    theirs.close()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not server.sessions
+
+
+def test_idle_is_timed_from_the_last_command(tmp_path):
+    server = CommandServer(str(tmp_path / "sock"), idle_timeout=60)
+    server.sessions.add(object())  # a client that stays connected without running anything
+    server._last_active = time.monotonic() - 61
+    assert server.idle()
+    server.begin()
+    assert not server.idle()  # a long command keeps the server up
+    server.end()
+    assert not server.idle()
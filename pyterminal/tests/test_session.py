@@ -0,0 +1,25 @@
+import os
+
+from script import ScriptRunner
+
+
+def test_background_script_lines_keep_cwd_and_env(tmp_path, monkeypatch, capfd):
+    monkeypatch.chdir(tmp_path)
+    runner = ScriptRunner()
+    status = runner.run(ScriptRunner.compile(["mkdir sub", "cd sub", "pwd &", "export FOO=bar", "env | grep FOO= &", "wait"]))
+    output = capfd.readouterr().out
+    assert status == 0
+    assert os.path.join(str(tmp_path), "sub") + "\n" in output
+    assert "FOO=bar\n" in output
+
+
+def test_env_runs_a_command_with_assignments(shell):
+    status, output = shell("env FOO=1 sh -c 'echo $FOO'")
+    assert (status, output) == (0, "1\n")
+
+
+def test_env_lists_with_assignments(shell):
+    status, output = shell("env FOO=2")
+    assert status == 0
+    assert "FOO=2\n" in output
+    assert "FOO" not in shell.executor.env
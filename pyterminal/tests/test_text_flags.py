@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.fixture
+def lines(tmp_path):
+    (tmp_path / "f").write_text("alpha\nbeta\ngamma\n")
+
+
+def test_native_flags_stay_builtin(shell):
+    executor = shell.executor
+    for argv, func in ((["grep", "-ic", "a", "f"], executor.grep), (["tail", "-n", "2", "f"], executor.tail),
+                       (["head", "-5", "f"], executor.head), (["wc", "-lw", "f"], executor.word_count)):
+        assert executor._plan([argv])[0][0] == func
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("grep -E 'alpha|gamma' f", "alpha\ngamma\n"),
+    ("grep -o lph f", "lph\n"),
+    ("grep -w beta f", "beta\n"),
+    ("grep -e gamma f", "gamma\n"),
+    ("cat -n f", "     1\talpha\n     2\tbeta\n     3\tgamma\n"),
+    ("head -q -n 1 f", "alpha\n"),
+    ("wc -m < f", "17\n"),
+    ("tail -n +2 f", "beta\ngamma\n"),
+])
+def test_other_flags_go_to_the_system_tool(shell, lines, line, expected):
+    status, output = shell(line)
+    assert (status, output) == (0, expected)
+
+
+def test_other_flags_are_rejected_without_a_system_tool(shell, lines):
+    shell.executor.env["PATH"] = ""
+    status, output = shell("cat -n f")
+    assert status == 1
+    assert output.startswith("cat: unsupported option '-n'\nUsage: cat")
+    status, output = shell("tail -n +2 f")
+    assert status == 1
+    assert output.startswith("tail: unsupported option '-n +2'")
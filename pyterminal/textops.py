@@ -0,0 +1,405 @@
+import os
+import re
+import mmap
+import stat
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# Bytes per output chunk handed to the pipeline
+CHUNK_SIZE = 256 * 1024
+
+# Bytes scanned per step when counting through a mapped file
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# First step of head/tail, which usually need only the first or last few KiB;
+# each step doubles up to BLOCK_SIZE
+FIRST_BLOCK = 64 * 1024
+
+# grep spreads files over worker processes only when they add up to this much
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+# Seconds between size checks while `tail -f` waits for new data
+FOLLOW_INTERVAL = 0.25
+
+# bytes.split() whitespace; wc -w counts words as runs of anything else
+_WORD_TABLE = bytes(32 if b in b" \t\n\r\x0b\x0c" else 120 for b in range(256))
+
+
+@contextmanager
+def mapped(path):
+    """
+    A file's contents as a read-only mmap. Empty files can't be mapped and
+    special files (/proc, pipes) have no size, so those are read instead.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0 or not stat.S_ISREG(st.st_mode):
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+def count(buf, sub, start=0, end=None):
+    """buf.count(sub, start, end) for mmaps too, which have no count()"""
+    end = len(buf) if end is None else end
+    if isinstance(buf, bytes):
+        return buf.count(sub, start, end)
+    total = 0
+    for pos in range(start, end, BLOCK_SIZE):
+        total += buf[pos:min(pos + BLOCK_SIZE, end)].count(sub)
+    return total
+
+
+def chunks(buf, start=0, end=None):
+    """Slices of buf[start:end] sized for the pipeline"""
+    end = len(buf) if end is None else end
+    for pos in range(start, end, CHUNK_SIZE):
+        yield buf[pos:min(pos + CHUNK_SIZE, end)]
+
+
+def terminated(data):
+    """data ending with a newline, as every line of output should"""
+    return data if not data or data.endswith(b"\n") else data + b"\n"
+
+
+# -------- head / tail --------
+def head_end(buf, lines):
+    """Offset just past the first `lines` lines; whole blocks are skipped by counting"""
+    pos, size = 0, len(buf)
+    if lines == 0:
+        return 0
+    step = FIRST_BLOCK
+    while pos < size:
+        block_end = min(pos + step, size)
+        step = min(step * 2, BLOCK_SIZE)
+        found = count(buf, b"\n", pos, block_end)
+        if found < lines:
+            lines -= found
+            pos = block_end
+            continue
+        for _ in range(lines):
+            pos = buf.find(b"\n", pos, block_end) + 1
+        return pos
+    return size
+
+
+def tail_start(buf, lines):
+    """Offset of the last `lines` lines, searching back from the end"""
+    end = len(buf)
+    if lines == 0:
+        return end
+    if end and buf[end - 1:end] == b"\n":
+        end -= 1  # the final newline ends the last line, it doesn't start one
+    step = FIRST_BLOCK
+    while end > 0:
+        block_start = max(0, end - step)
+        step = min(step * 2, BLOCK_SIZE)
+        found = count(buf, b"\n", block_start, end)
+        if found < lines:
+            lines -= found
+            end = block_start
+            continue
+        for _ in range(lines):
+            end = buf.rfind(b"\n", block_start, end)
+        return end + 1
+    return 0
+
+
+def head_stream(stdin, lines=None, size=None):
+    """First `lines` lines (or `size` bytes) of a chunk stream; stops reading as soon as they are out"""
+    try:
+        for chunk in stdin:
+            if size is not None:
+                yield chunk[:size]
+                size -= len(chunk)
+                if size <= 0:
+                    return
+                continue
+            found = chunk.count(b"\n")
+            if found >= lines:
+                yield chunk[:head_end(chunk, lines)]
+                return
+            lines -= found
+            yield chunk
+    finally:
+        # The writer gets EPIPE now instead of running to the end (`yes | head`)
+        close = getattr(stdin, "close", None)
+        if close is not None:
+            close()
+
+
+def tail_stream(stdin, lines=None, size=None):
+    """Last `lines` lines (or `size` bytes) of a chunk stream, holding only about that much"""
+    kept = deque()
+    kept_bytes = kept_lines = 0
+    for chunk in stdin:
+        kept.append(chunk)
+        kept_bytes += len(chunk)
+        kept_lines += chunk.count(b"\n")
+        # Drop the oldest chunk while the rest still hold everything needed
+        while len(kept) > 1:
+            first = kept[0]
+            if size is not None and kept_bytes - len(first) < size:
+                break
+            if size is None and kept_lines - first.count(b"\n") <= lines:
+                break
+            kept.popleft()
+            kept_bytes -= len(first)
+            kept_lines -= first.count(b"\n")
+    data = b"".join(kept)
+    if size is not None:
+        return data[-size:] if size else b""
+    return data[tail_start(data, lines):]
+
+
+def follow(path, offset, cancelled):
+    """
+    Bytes appended to path after `offset`, until the threading.Event
+    `cancelled` is set. The size is polled every FOLLOW_INTERVAL seconds;
+    a file truncated in place (log rotation with copytruncate) is read
+    again from the start.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while not cancelled.is_set():
+            chunk = f.read(CHUNK_SIZE)
+            if chunk:
+                yield chunk
+                continue
+            if os.fstat(f.fileno()).st_size < f.tell():
+                f.seek(0)
+                continue
+            cancelled.wait(FOLLOW_INTERVAL)
+
+
+# -------- wc --------
+class Counts:
+    """Line, word and byte totals, filled in only for what was asked"""
+
+    def __init__(self):
+        self.lines = self.words = self.bytes = 0
+
+    def add(self, other):
+        self.lines += other.lines
+        self.words += other.words
+        self.bytes += other.bytes
+
+
+def _words(block, in_word):
+    """Word starts in block, given whether the previous block ended inside a word"""
+    shape = block.translate(_WORD_TABLE)
+    starts = shape.count(b" x")
+    if shape[:1] == b"x" and not in_word:
+        starts += 1
+    return starts, shape[-1:] == b"x"
+
+
+def count_buffer(buf, lines=True, words=True):
+    counts = Counts()
+    counts.bytes = len(buf)
+    if lines:
+        counts.lines = count(buf, b"\n")
+    if words:
+        in_word = False
+        for pos in range(0, len(buf), BLOCK_SIZE):
+            starts, in_word = _words(buf[pos:pos + BLOCK_SIZE], in_word)
+            counts.words += starts
+    return counts
+
+
+def count_stream(stdin, lines=True, words=True):
+    counts = Counts()
+    in_word = False
+    for chunk in stdin:
+        counts.bytes += len(chunk)
+        if lines:
+            counts.lines += chunk.count(b"\n")
+        if words:
+            starts, in_word = _words(chunk, in_word)
+            counts.words += starts
+    return counts
+
+
+# -------- grep --------
+class Grep:
+    """
+    A regex compiled once and run over whole buffers (mmaps included):
+    the regex engine jumps from match to match, and only the lines around
+    a match are ever looked at. With -v, the runs between matching lines
+    are copied out in bulk.
+    """
+
+    def __init__(self, pattern, ignore_case=False, fixed=False, invert=False, numbers=False):
+        if fixed:
+            pattern = re.escape(pattern)
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        self.regex = re.compile(pattern.encode(), flags)
+        self.invert = invert
+        self.numbers = numbers
+
+    def _matches(self, buf, end):
+        """(start, stop) of each line holding a match; stop is past its newline"""
+        pos = 0
+        while pos < end:
+            match = self.regex.search(buf, pos, end)
+            if match is None:
+                return
+            newline = buf.rfind(b"\n", pos, match.start())
+            start = newline + 1 if newline != -1 else pos
+            newline = buf.find(b"\n", match.start(), end)
+            stop = newline + 1 if newline != -1 else end
+            yield start, stop
+            pos = stop
+
+    def _lines(self, buf, start, stop):
+        """(start, stop) of every line in buf[start:stop]"""
+        while start < stop:
+            newline = buf.find(b"\n", start, stop)
+            end = newline + 1 if newline != -1 else stop
+            yield start, end
+            start = end
+
+    def selected(self, buf, end=None, per_line=False):
+        """
+        (start, stop) spans of the selected lines in buf[:end]. Without
+        per_line, -v may return one span for a run of several lines.
+        """
+        end = len(buf) if end is None else end
+        if not self.invert:
+            yield from self._matches(buf, end)
+            return
+        pos = 0
+        for start, stop in self._matches(buf, end):
+            if start > pos:
+                yield from self._lines(buf, pos, start) if per_line else ((pos, start),)
+            pos = stop
+        if pos < end:
+            yield from self._lines(buf, pos, end) if per_line else ((pos, end),)
+
+    def count(self, buf, end=None):
+        """Number of selected lines in buf[:end]"""
+        end = len(buf) if end is None else end
+        matched = sum(1 for _ in self._matches(buf, end))
+        if not self.invert:
+            return matched
+        total = count(buf, b"\n", 0, end) + (1 if end and buf[end - 1:end] != b"\n" else 0)
+        return total - matched
+
+    def output(self, buf, end=None, prefix=b"", first_line=1):
+        """Selected lines of buf[:end] as output chunks, prefixed with `prefix` and -n numbers"""
+        per_line = bool(prefix) or self.numbers
+        pending = []
+        pending_bytes = 0
+        line, counted = first_line, 0
+        for start, stop in self.selected(buf, end, per_line):
+            if self.numbers:
+                line += count(buf, b"\n", counted, start)
+                counted = start
+                piece = b"%s%d:%s" % (prefix, line, terminated(buf[start:stop]))
+            else:
+                piece = prefix + terminated(buf[start:stop])
+            pending.append(piece)
+            pending_bytes += len(piece)
+            if pending_bytes >= CHUNK_SIZE:
+                yield b"".join(pending)
+                pending, pending_bytes = [], 0
+        if pending:
+            yield b"".join(pending)
+
+    def any(self, buf, end=None):
+        return next(iter(self.selected(buf, end)), None) is not None
+
+    def blocks(self, stdin):
+        """
+        Cut a chunk stream at line ends so the buffer methods can scan it
+        as it arrives; yields (block, number of its first line).
+        """
+        carry = b""
+        line = 1
+        for chunk in stdin:
+            data = carry + chunk
+            cut = data.rfind(b"\n") + 1
+            if not cut:
+                if len(data) < BLOCK_SIZE:
+                    carry = data  # wait for the end of the line
+                    continue
+                cut = len(data)  # a line longer than a block is scanned in pieces
+            block, carry = data[:cut], data[cut:]
+            yield block, line
+            line += block.count(b"\n")
+        if carry:
+            yield carry, line
+
+
+def grep_buffer(grep, buf, mode="lines", name=b"", prefix=b""):
+    """
+    One grep over a buffer as output chunks; returns whether any line was
+    selected. mode is "lines", "count" (-c) or "files" (-l, prints name).
+    """
+    if mode == "count":
+        selected = grep.count(buf)
+        yield b"%s%d\n" % (prefix, selected)
+        return selected > 0
+    if mode == "files":
+        if not grep.any(buf):
+            return False
+        yield name + b"\n"
+        return True
+    selected = False
+    for chunk in grep.output(buf, prefix=prefix):
+        selected = True
+        yield chunk
+    return selected
+
+
+def grep_stream(grep, stdin, mode="lines", name=b"", prefix=b""):
+    """grep_buffer for a chunk stream, scanned block by block as it arrives"""
+    selected = 0
+    try:
+        for block, line in grep.blocks(stdin):
+            if mode == "count":
+                selected += grep.count(block)
+            elif mode == "files":
+                if grep.any(block):
+                    yield name + b"\n"
+                    return True
+            else:
+                for chunk in grep.output(block, prefix=prefix, first_line=line):
+                    selected = 1
+                    yield chunk
+    finally:
+        close = getattr(stdin, "close", None)
+        if close is not None:
+            close()
+    if mode == "count":
+        yield b"%s%d\n" % (prefix, selected)
+    return selected > 0
+
+
+def _grep_file(grep, path, mode, name, prefix):
+    """Worker process: grep one file; returns (output, whether anything was selected, error)"""
+    try:
+        with mapped(path) as buf:
+            output = []
+            search = grep_buffer(grep, buf, mode, name, prefix)
+            while True:
+                try:
+                    output.append(next(search))
+                except StopIteration as done:
+                    return b"".join(output), done.value, None
+    except OSError as e:
+        return b"", False, e.strerror
+
+
+def grep_files(grep, files, mode, workers):
+    """
+    Grep (path, name, prefix) triples on a process pool, one file per
+    task; yields (output, selected, error) in file order. Each file's
+    output is collected in its worker and sent back whole.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_grep_file, grep, path, mode, name, prefix) for path, name, prefix in files]
+        for future in futures:
+            yield future.result()